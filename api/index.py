@@ -1,9 +1,13 @@
-from fastapi import FastAPI
-from fastapi.responses import HTMLResponse, FileResponse, Response, JSONResponse
-from fastapi.staticfiles import StaticFiles
+from fastapi import FastAPI, Request
+from fastapi.responses import Response, JSONResponse, StreamingResponse
+from contextlib import asynccontextmanager
 from pydantic import BaseModel
+from types import SimpleNamespace
+import asyncio
 import sys
 import os
+import threading
+import time
 
 # Add parent directory to path to import modules
 parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -13,6 +17,31 @@ sys.path.insert(0, parent_dir)
 def fallback_response(user_input: str, user_id: str = "guest") -> str:
     return "Hello! I'm Manna AI, created by Tammanna and Mairaj. I'm currently initializing. Please try again in a moment."
 
+async def fallback_response_details(user_input: str, user_id: str = "guest"):
+    """Structured fallback used when the chatbot module is unavailable"""
+    if not _sentiment_loaded:
+        await asyncio.to_thread(_load_sentiment)
+    try:
+        mood = get_mood(user_input)
+        mood_emoji = get_mood_emoji(mood)
+    except Exception as e:
+        print(f"Mood detection error: {e}")
+        mood = "neutral"
+        mood_emoji = "😐"
+    return SimpleNamespace(
+        response=fallback_response(user_input, user_id),
+        mood=mood,
+        mood_emoji=mood_emoji,
+        language="en",
+        intent="fallback",
+    )
+
+async def fallback_stream_response_details(user_input: str, user_id: str = "guest"):
+    """Streaming fallback: the whole fallback reply as a single event"""
+    result = await fallback_response_details(user_input, user_id)
+    yield result.response
+    yield result
+
 def fallback_mood(text: str) -> str:
     return "neutral"
 
@@ -22,26 +51,51 @@ def fallback_mood_emoji(mood: str) -> str:
 # Import with comprehensive error handling - delay imports until needed
 _chatbot_loaded = False
 _sentiment_loaded = False
+# Last import error and when it happened; a failed import is retried after IMPORT_RETRY_SECONDS
+_chatbot_error = None
+_chatbot_failed_at = None
+_sentiment_failed_at = None
+IMPORT_RETRY_SECONDS = float(os.getenv("MANNA_IMPORT_RETRY_SECONDS", "10"))
+_chatbot_lock = threading.Lock()
+_sentiment_lock = threading.Lock()
+
+def _retry_due(failed_at) -> bool:
+    return failed_at is None or time.monotonic() - failed_at >= IMPORT_RETRY_SECONDS
 
 def _load_chatbot():
     """Lazy load chatbot module"""
-    global get_response, _chatbot_loaded
-    if not _chatbot_loaded:
+    global get_response, get_response_details, stream_response_details, _chatbot_loaded
+    global _chatbot_error, _chatbot_failed_at
+    if _chatbot_loaded:
+        return
+    with _chatbot_lock:
+        if _chatbot_loaded or not _retry_due(_chatbot_failed_at):
+            return
         try:
             from chatbot import get_response as cb_get_response
+            from chatbot import get_response_details_async as cb_get_response_details
+            from chatbot import stream_response_details as cb_stream_response_details
             get_response = cb_get_response
+            get_response_details = cb_get_response_details
+            stream_response_details = cb_stream_response_details
             _chatbot_loaded = True
+            _chatbot_error = None
             print("✓ chatbot imported successfully")
         except Exception as e:
             print(f"✗ chatbot import error: {e}")
             import traceback
             traceback.print_exc()
-            _chatbot_loaded = True  # Mark as attempted to avoid retrying
+            _chatbot_error = f"{type(e).__name__}: {e}"
+            _chatbot_failed_at = time.monotonic()
 
 def _load_sentiment():
     """Lazy load sentiment module"""
-    global get_mood, get_mood_emoji, _sentiment_loaded
-    if not _sentiment_loaded:
+    global get_mood, get_mood_emoji, _sentiment_loaded, _sentiment_failed_at
+    if _sentiment_loaded:
+        return
+    with _sentiment_lock:
+        if _sentiment_loaded or not _retry_due(_sentiment_failed_at):
+            return
         try:
             from sentiment import get_mood as sg_get_mood, get_mood_emoji as sg_get_mood_emoji
             get_mood = sg_get_mood
@@ -52,15 +106,111 @@ def _load_sentiment():
             print(f"✗ sentiment import error: {e}")
             import traceback
             traceback.print_exc()
-            _sentiment_loaded = True  # Mark as attempted
+            _sentiment_failed_at = time.monotonic()
 
 # Set initial fallbacks
 get_response = fallback_response
+get_response_details = fallback_response_details
+stream_response_details = fallback_stream_response_details
 get_mood = fallback_mood
 get_mood_emoji = fallback_mood_emoji
 
+# Background warm-up: MANNA_PREWARM=0 leaves everything to the first request
+PREWARM = os.getenv("MANNA_PREWARM", "1") != "0"
+# Progress reported by /ready: state is "pending", "warming", "ready" or "failed"
+WARMUP = {"state": "pending", "steps": {}, "total_ms": None}
+_warmup_task = None
+
+def _warm_sentiment() -> None:
+    _load_sentiment()
+    if not _sentiment_loaded:
+        raise RuntimeError("sentiment import failed")
+
+def _warm_openai() -> None:
+    import openai  # the largest import, left to the OpenAI fallback tier by chatbot
+
+def _warm_chatbot() -> None:
+    _load_chatbot()
+    if not _chatbot_loaded:
+        raise RuntimeError(_chatbot_error)
+
+def _warm_knowledge_base() -> None:
+    from knowledge_base import KNOWLEDGE_STORE
+    KNOWLEDGE_STORE.current()
+
+def _warm_openai_client() -> None:
+    import llm_client
+    llm_client.warm_up()
+
+def _warm_semantic_cache() -> None:
+    import chatbot
+    import llm_client
+    if llm_client.api_key():  # only the OpenAI fallback uses it
+        chatbot.get_semantic_cache()
+
+def _warm_code_executor() -> None:
+    import code_executor
+
+def _warm_first_message() -> None:
+    """Analyze a message once so lazily built matchers and the Q&A index pages are ready"""
+    import chatbot
+    from knowledge_base import get_qa_response
+    chatbot.analyze_message("hello, what is python?")
+    get_qa_response("what is python")
+
+# (name, step) in order; each step's time is recorded separately
+_WARMUP_STEPS = [
+    ("sentiment", _warm_sentiment),
+    ("openai", _warm_openai),
+    ("chatbot", _warm_chatbot),
+    ("knowledge_base", _warm_knowledge_base),
+    ("openai_client", _warm_openai_client),
+    ("semantic_cache", _warm_semantic_cache),
+    ("code_executor", _warm_code_executor),
+    ("first_message", _warm_first_message),
+]
+
+def _warm_up() -> None:
+    """Load modules, build indexes and create clients; runs in a worker thread"""
+    WARMUP["state"] = "warming"
+    started = time.perf_counter()
+    for name, step in _WARMUP_STEPS:
+        step_started = time.perf_counter()
+        try:
+            step()
+            WARMUP["steps"][name] = {"ok": True, "ms": round((time.perf_counter() - step_started) * 1000, 1)}
+        except Exception as e:
+            print(f"Warning: warm-up step {name} failed: {e}")
+            WARMUP["steps"][name] = {"ok": False, "ms": round((time.perf_counter() - step_started) * 1000, 1),
+                                     "error": f"{type(e).__name__}: {e}"}
+    WARMUP["total_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    WARMUP["state"] = "ready" if _chatbot_loaded else "failed"
+
+def _start_warm_up() -> None:
+    """Start the background warm-up once; also called by requests on hosts that skip the lifespan"""
+    global _warmup_task
+    if PREWARM and _warmup_task is None:
+        _warmup_task = asyncio.create_task(asyncio.to_thread(_warm_up))
+
+async def _ensure_chatbot() -> None:
+    """Load the chatbot without blocking the event loop, joining a warm-up that is loading it"""
+    if _chatbot_loaded:
+        return
+    _start_warm_up()
+    # Returns as soon as the warm-up thread has imported the chatbot, which
+    # holds the import lock; the later warm-up steps are not waited for
+    await asyncio.to_thread(_load_chatbot)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Warm up in the background so /health answers while modules load"""
+    _start_warm_up()
+    yield
+    if "llm_client" in sys.modules:
+        await sys.modules["llm_client"].close_clients()
+
 # Create FastAPI app
-app = FastAPI(title="Manna AI", version="1.0.0")
+app = FastAPI(title="Manna AI", version="1.0.0", lifespan=lifespan)
 
 # Simple HTML template
 SIMPLE_HTML = """<!DOCTYPE html>
@@ -230,6 +380,12 @@ SIMPLE_HTML = """<!DOCTYPE html>
     <script>
         const chatBox = document.getElementById('chatBox');
         const userInput = document.getElementById('userInput');
+        // One id per browser, so the server keeps a separate conversation for each visitor
+        const userId = localStorage.getItem('mannaUserId') || (() => {
+            const id = 'web-' + (crypto.randomUUID ? crypto.randomUUID() : Date.now().toString(36) + Math.random().toString(36).slice(2));
+            localStorage.setItem('mannaUserId', id);
+            return id;
+        })();
         
         function hideEmptyState() {
             const empty = document.querySelector('.empty-state');
@@ -257,7 +413,7 @@ SIMPLE_HTML = """<!DOCTYPE html>
                 const response = await fetch('/chat', {
                     method: 'POST',
                     headers: { 'Content-Type': 'application/json' },
-                    body: JSON.stringify({ user_id: "user1", message: message })
+                    body: JSON.stringify({ user_id: userId, message: message })
                 });
                 const result = await response.json();
                 addMessage(result.response, false);
@@ -283,29 +439,49 @@ async def favicon():
 # Health check endpoint
 @app.get("/health")
 async def health():
+    _start_warm_up()
     return JSONResponse({"status": "ok", "message": "Manna AI is running"})
 
-# Root route - serve embedded HTML to avoid file system issues
-@app.get("/", response_class=HTMLResponse)
-async def serve_home():
-    try:
-        # Try to load from file first
-        html_path = os.path.join(parent_dir, "static", "Manna.html")
-        if os.path.exists(html_path):
-            return FileResponse(html_path)
-    except:
-        pass
-    
-    # Fallback to embedded HTML
-    return HTMLResponse(SIMPLE_HTML)
-
-# Serve static files (optional, with error handling)
+# Readiness: 200 once every warm-up step has run and the chatbot is loaded,
+# 503 while warming up or after a failed import. A chatbot that a later
+# request manages to load makes a failed warm-up ready; with MANNA_PREWARM=0
+# there are no warm-up steps to wait for.
+@app.get("/ready")
+async def ready():
+    _start_warm_up()
+    warmed = not PREWARM or WARMUP["state"] in ("ready", "failed")
+    is_ready = warmed and _chatbot_loaded
+    return JSONResponse({
+        "ready": is_ready,
+        "state": WARMUP["state"],
+        "total_ms": WARMUP["total_ms"],
+        "steps": WARMUP["steps"],
+        "error": _chatbot_error,
+    }, status_code=200 if is_ready else 503)
+
+# The page and static files are read and compressed once, at import; the
+# embedded HTML stands in when static/ was not deployed
+from static_assets import AssetStore, PAGE_CACHE_CONTROL
+
+HOME_PAGE = AssetStore(PAGE_CACHE_CONTROL)
+STATIC_FILES = AssetStore()
 try:
     static_path = os.path.join(parent_dir, "static")
-    if os.path.exists(static_path):
-        app.mount("/static", StaticFiles(directory=static_path), name="static")
+    if os.path.isdir(static_path):
+        STATIC_FILES.load_directory(static_path)
+    HOME_PAGE.add_file("Manna.html", os.path.join(static_path, "Manna.html"))
 except Exception as e:
-    print(f"Warning: Could not mount static files: {e}")
+    print(f"Warning: Could not load static files: {e}")
+    HOME_PAGE.add("Manna.html", SIMPLE_HTML.encode("utf-8"), "text/html; charset=utf-8")
+
+# Root route - served from memory, so no file system access per request
+@app.api_route("/", methods=["GET", "HEAD"])
+async def serve_home(request: Request):
+    return HOME_PAGE.response("Manna.html", request.headers, request.method)
+
+@app.api_route("/static/{name:path}", methods=["GET", "HEAD"])
+async def serve_static(name: str, request: Request):
+    return STATIC_FILES.response(name, request.headers, request.method)
 
 class UserMessage(BaseModel):
     message: str
@@ -313,26 +489,20 @@ class UserMessage(BaseModel):
 
 @app.post("/chat")
 async def chat_endpoint(user_msg: UserMessage):
+    started = time.perf_counter()
     try:
-        # Lazy load modules on first use
-        _load_chatbot()
-        _load_sentiment()
-        
-        response = get_response(user_msg.message, user_msg.user_id)
+        # Lazy load modules on first use, or wait for the warm-up already loading them
+        await _ensure_chatbot()
         
-        # Detect mood
-        try:
-            mood = get_mood(user_msg.message)
-            mood_emoji = get_mood_emoji(mood)
-        except Exception as e:
-            print(f"Mood detection error: {e}")
-            mood = "neutral"
-            mood_emoji = "😐"
+        # Mood is detected once inside the chatbot and reused here
+        result = await get_response_details(user_msg.message, user_msg.user_id)
+        import metrics
+        metrics.REQUEST_SECONDS.observe(("/chat", result.intent), time.perf_counter() - started)
         
         return JSONResponse({
-            "response": response,
-            "mood": mood,
-            "mood_emoji": mood_emoji
+            "response": result.response,
+            "mood": result.mood,
+            "mood_emoji": result.mood_emoji
         })
     except Exception as e:
         print(f"Chat endpoint error: {e}")
@@ -344,6 +514,75 @@ async def chat_endpoint(user_msg: UserMessage):
             "mood_emoji": "😐"
         }, status_code=200)  # Return 200 so frontend can display error
 
+@app.post("/chat/stream")
+async def chat_stream_endpoint(user_msg: UserMessage):
+    # Server-sent events: "token" events as the answer arrives, then "done"
+    started = time.perf_counter()
+    # Lazy load modules on first use, or wait for the warm-up already loading them
+    await _ensure_chatbot()
+    from streaming import chat_event_stream
+    return StreamingResponse(
+        chat_event_stream(stream_response_details, user_msg.message, user_msg.user_id, started),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+class CodeJobRequest(BaseModel):
+    code: str
+    user_id: str = "guest"
+
+@app.post("/code/jobs", status_code=202)
+async def submit_code_job(job_request: CodeJobRequest):
+    """Start a code run in the background and return its job id right away"""
+    if not job_request.code.strip():
+        return JSONResponse({"error": "No code provided"}, status_code=400)
+    try:
+        from code_jobs import JOB_STORE, JobStoreFull
+    except Exception as e:
+        return JSONResponse({"error": f"Code jobs unavailable: {str(e)}"}, status_code=503)
+    try:
+        job = JOB_STORE.submit(job_request.code, job_request.user_id)
+    except JobStoreFull as e:
+        return JSONResponse({"error": str(e)}, status_code=503)
+    return JSONResponse(job.to_dict(), status_code=202)
+
+@app.get("/code/jobs/{job_id}")
+async def code_job_result(job_id: str, wait: float = 0):
+    """Job status and result; wait > 0 long-polls until it finishes"""
+    try:
+        from code_jobs import JOB_STORE
+    except Exception as e:
+        return JSONResponse({"error": f"Code jobs unavailable: {str(e)}"}, status_code=503)
+    job = await JOB_STORE.wait(job_id, wait)
+    if job is None:
+        return JSONResponse({"error": "Unknown or expired job"}, status_code=404)
+    return JSONResponse(job.to_dict())
+
+@app.get("/stats")
+async def stats():
+    """Cache hit/miss counters, streaming time-to-first-byte, code-run load, sessions and knowledge base"""
+    from streaming import ttfb_stats
+    result = {"stream_ttfb": ttfb_stats()}
+    # Only report chatbot caches once loaded; a stats call must not trigger the import
+    if get_response is not fallback_response:
+        from chatbot import cache_stats
+        from code_executor import execution_stats
+        result["cache"] = cache_stats()
+        result["code"] = execution_stats()
+    if "code_jobs" in sys.modules:
+        result["code_jobs"] = sys.modules["code_jobs"].JOB_STORE.stats()
+    if "sessions" in sys.modules:
+        result["sessions"] = sys.modules["sessions"].SESSION_STORE.stats()
+    if "knowledge_base" in sys.modules:
+        result["knowledge_base"] = sys.modules["knowledge_base"].KNOWLEDGE_STORE.stats()
+    return JSONResponse(result)
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Per-stage and per-endpoint latency histograms in the Prometheus text format"""
+    import metrics
+    return Response(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
 # Vercel serverless handler
 # Vercel automatically detects FastAPI apps - no adapter needed
 # Just export the app variable
@@ -0,0 +1,3 @@
+# benchmarks/__init__.py
+# Performance scripts for Manna AI; run from the repository root, e.g.
+#   python -m benchmarks.bench_intents
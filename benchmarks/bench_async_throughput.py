@@ -0,0 +1,54 @@
+# benchmarks/bench_async_throughput.py
+# /chat throughput for LLM fallback requests against the local fake server:
+# blocking get_response_details vs the async path with the pooled client
+
+import argparse
+import asyncio
+import os
+import time
+
+from benchmarks.fake_openai import start_server
+
+PROMPT = "describe black holes"
+
+async def blocking_handler(message: str) -> None:
+    """Previous /chat handler: synchronous call inside an async endpoint"""
+    chatbot.get_response_details(message)
+
+async def async_handler(message: str) -> None:
+    await chatbot.get_response_details_async(message)
+
+async def drive(handler, requests: int, concurrency: int) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one() -> None:
+        async with semaphore:
+            await handler(PROMPT)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    return time.perf_counter() - start
+
+async def main(args) -> None:
+    for label, handler in (("blocking", blocking_handler), ("async", async_handler)):
+        elapsed = await drive(handler, args.requests, args.concurrency)
+        print(f"{label:<9} {args.requests} requests, concurrency {args.concurrency}: "
+              f"{elapsed:6.2f}s  {args.requests / elapsed:7.1f} req/s")
+    await llm_client.close_clients()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Async /chat throughput benchmark")
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.2, help="fake completion latency in seconds")
+    args = parser.parse_args()
+
+    server = start_server(latency=args.latency)
+    os.environ["OPENAI_API_KEY"] = "test"
+    os.environ["OPENAI_BASE_URL"] = server.url
+
+    import chatbot
+    import llm_client
+
+    asyncio.run(main(args))
+    print(f"upstream completions served: {server.requests}")
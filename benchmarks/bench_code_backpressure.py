@@ -0,0 +1,40 @@
+# benchmarks/bench_code_backpressure.py
+# A burst of slow "run ..." jobs from many users: runs beyond the concurrency
+# limit queue up to the queue bound, the rest get an immediate "busy" reply,
+# and a user with a job in flight is refused a second one
+
+import argparse
+import asyncio
+import time
+
+import code_executor
+
+SLOW_JOB = "import time; time.sleep({seconds})"
+
+async def timed(code: str, user_id: str):
+    start = time.perf_counter()
+    answer = await code_executor.run_code_async(code, user_id)
+    return answer, time.perf_counter() - start
+
+async def main(args) -> None:
+    code = SLOW_JOB.format(seconds=args.job_seconds)
+    jobs = [timed(code, f"user-{i}") for i in range(args.users)]
+    jobs.append(timed(code, "user-0"))  # second job from a user already running one
+    results = await asyncio.gather(*jobs)
+    ran = [elapsed for answer, elapsed in results if answer.startswith("Code executed")]
+    busy = [elapsed for answer, elapsed in results if not answer.startswith("Code executed")]
+    print(f"{args.users + 1} requests: {len(ran)} ran, {len(busy)} refused")
+    if ran:
+        print(f"  ran      latency {min(ran) * 1000:8.1f} .. {max(ran) * 1000:8.1f} ms")
+    if busy:
+        print(f"  refused  latency {min(busy) * 1000:8.1f} .. {max(busy) * 1000:8.1f} ms")
+    print(code_executor.execution_stats())
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Code execution backpressure benchmark")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--job-seconds", type=float, default=0.5)
+    args = parser.parse_args()
+    code_executor.warm_up()
+    asyncio.run(main(args))
+    code_executor.close_pool()
@@ -0,0 +1,43 @@
+# benchmarks/bench_code_cache.py
+# Repeated snippets through run_code: cold runs in the sandbox vs answers
+# from the content-addressed result cache, plus the cost of the AST scan
+
+import argparse
+import time
+
+import code_executor
+from code_analysis import is_deterministic
+
+# Typical repeats: help-text samples and one-liners, plus snippets whose
+# output changes between runs and must stay out of the cache
+SNIPPETS = [
+    "print(2+2)",
+    "print('Hello, World!')",
+    "print(sum(range(100)))",
+    "import math; print(math.sqrt(16))",
+    "print([i * i for i in range(10)])",
+    "import random; print(random.randint(1, 6))",
+    "import time; print(time.time())",
+    "print({'apple', 'banana', 'cherry'})",
+    "print(object())",
+]
+
+def mean_ms(run, rounds: int) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for snippet in SNIPPETS:
+            run(snippet)
+    return (time.perf_counter() - start) / (rounds * len(SNIPPETS)) * 1000
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Code result cache benchmark")
+    parser.add_argument("--rounds", type=int, default=30)
+    args = parser.parse_args()
+
+    code_executor.warm_up()
+    print(f"uncached   {mean_ms(code_executor._execute, args.rounds):8.3f} ms/run")
+    print(f"run_code   {mean_ms(code_executor.run_code, args.rounds):8.3f} ms/run "
+          f"({len(code_executor.RESULT_CACHE)}/{len(SNIPPETS)} snippets cached)")
+    print(f"AST scan   {mean_ms(is_deterministic, args.rounds * 10):8.3f} ms/snippet")
+    print(code_executor.RESULT_CACHE.stats())
+    code_executor.close_pool()
@@ -0,0 +1,93 @@
+# benchmarks/bench_cold_start.py
+# Cold start of api/index.py in fresh interpreters: latency of the first
+# /chat with the background warm-up off and on, how long until /ready says
+# 200, and how late /health answers while modules are loading
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+SCENARIOS = {
+    # name: (MANNA_PREWARM, wait for /ready before the first /chat)
+    "no prewarm": ("0", False),
+    "prewarm, chat at once": ("1", False),
+    "prewarm, chat after ready": ("1", True),
+}
+
+async def probe_health(transport, stop: asyncio.Event, latencies: list) -> None:
+    """GET /health every 10 ms until stop is set, timing each from when it was due"""
+    while not stop.is_set():
+        due = time.perf_counter() + 0.01
+        await asyncio.sleep(0.01)
+        await transport.request("GET", "/health")
+        latencies.append(time.perf_counter() - due)  # includes any time the event loop was blocked
+
+async def measure(index, started: float, wait_ready: bool) -> dict:
+    from benchmarks.loadgen import ASGITransport
+    transport = ASGITransport(index.app)
+    result = {}
+    async with index.app.router.lifespan_context(index.app):
+        result["startup_ms"] = (time.perf_counter() - started) * 1000
+        stop, health = asyncio.Event(), []
+        prober = asyncio.create_task(probe_health(transport, stop, health))
+        await asyncio.sleep(0)  # the first probe is due before the first /chat
+        if wait_ready:
+            while (await transport.request("GET", "/ready"))[0] != 200 and index.WARMUP["state"] != "failed":
+                await asyncio.sleep(0.01)
+            result["ready_ms"] = (time.perf_counter() - started) * 1000
+        body = json.dumps({"message": "hello", "user_id": "guest"}).encode()
+        start = time.perf_counter()
+        status, payload = await transport.request("POST", "/chat", body)
+        result["first_chat_ms"] = (time.perf_counter() - start) * 1000
+        stop.set()
+        await prober
+        start = time.perf_counter()
+        await transport.request("POST", "/chat", body)
+        result["second_chat_ms"] = (time.perf_counter() - start) * 1000
+        result["first_reply"] = json.loads(payload)["response"][:40]
+        result["health_max_ms"] = max(health) * 1000
+        result["health_probes"] = len(health)
+        result["warmup"] = index.WARMUP
+    return result
+
+def child(prewarm: str, wait_ready: bool) -> None:
+    """Runs in a fresh interpreter; prints one JSON line"""
+    os.environ["MANNA_PREWARM"] = prewarm
+    started = time.perf_counter()
+    from api import index
+    import_ms = (time.perf_counter() - started) * 1000
+    result = asyncio.run(measure(index, started, wait_ready))
+    print(json.dumps({"import_ms": import_ms, **result}))
+
+def run_child(prewarm: str, wait_ready: bool) -> dict:
+    env = {**os.environ, "OPENAI_API_KEY": os.getenv("OPENAI_API_KEY") or "cold-start"}
+    out = subprocess.run([sys.executable, "-m", "benchmarks.bench_cold_start", "--child", prewarm, str(int(wait_ready))],
+                         check=True, capture_output=True, text=True, env=env).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--child":
+        child(sys.argv[2], sys.argv[3] == "1")
+        sys.exit()
+    parser = argparse.ArgumentParser(description="api/index.py cold start benchmark")
+    parser.add_argument("--runs", type=int, default=3, help="fresh interpreters per scenario; medians are shown")
+    args = parser.parse_args()
+
+    print(f"{'scenario':<26} {'import':>8} {'startup':>8} {'ready':>8} {'1st chat':>9} {'2nd chat':>9} "
+          f"{'health max':>11}   (ms)")
+    for name, (prewarm, wait_ready) in SCENARIOS.items():
+        runs = [run_child(prewarm, wait_ready) for _ in range(args.runs)]
+
+        def median(key: str) -> float:
+            return statistics.median(run.get(key, 0.0) for run in runs)
+        ready = f"{median('ready_ms'):8.0f}" if wait_ready else f"{'-':>8}"
+        print(f"{name:<26} {median('import_ms'):8.1f} {median('startup_ms'):8.1f} {ready} {median('first_chat_ms'):9.1f} "
+              f"{median('second_chat_ms'):9.2f} {median('health_max_ms'):11.1f}")
+    warmup = runs[-1]["warmup"]
+    steps = ", ".join(f"{step} {info['ms']:.0f}" for step, info in warmup["steps"].items())
+    print(f"warm-up {warmup['state']} in {warmup['total_ms']:.0f} ms: {steps}")
@@ -0,0 +1,34 @@
+# benchmarks/bench_intents.py
+# Per-message cost of intent matching: keyword scans vs the compiled matcher
+
+import timeit
+
+from chatbot import INTENT_KEYWORDS, INTENT_MATCHER
+from knowledge_base import CATEGORY_KEYWORDS, CONTEXTUAL_KEYWORDS
+
+TABLES = {**INTENT_KEYWORDS, **CATEGORY_KEYWORDS, **CONTEXTUAL_KEYWORDS}
+
+SHORT_INPUT = "hey, can you tell me a joke?"
+LONG_INPUT = (
+    "I have been trying to write a small program that reads a list of numbers "
+    "from a file and prints the running total, but the loop never stops and I "
+    "keep getting the same error about a missing variable. "
+) * 8
+
+def keyword_scan(text: str) -> set:
+    """Previous approach: one substring scan per keyword per table"""
+    return {intent for intent, words in TABLES.items() if any(word in text for word in words)}
+
+def bench(label: str, text: str, number: int = 20000) -> None:
+    text = text.lower().strip()
+    assert keyword_scan(text) == INTENT_MATCHER.match(text)
+    scan = timeit.timeit(lambda: keyword_scan(text), number=number) / number
+    matcher = timeit.timeit(lambda: INTENT_MATCHER.match(text), number=number) / number
+    print(f"{label:<6} ({len(text):>5} chars)  keyword scan: {scan * 1e6:8.2f} us   "
+          f"matcher: {matcher * 1e6:8.2f} us   speedup: {scan / matcher:5.2f}x")
+
+if __name__ == "__main__":
+    keywords = sum(len(words) for words in TABLES.values())
+    print(f"{len(TABLES)} intents, {keywords} keywords")
+    bench("short", SHORT_INPUT)
+    bench("long", LONG_INPUT, number=2000)
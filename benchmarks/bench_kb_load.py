@@ -0,0 +1,112 @@
+# benchmarks/bench_kb_load.py
+# Knowledge base with a large Q&A set: load time and resident memory of a
+# fresh worker that parses the JSONL and builds the index vs one that maps
+# the compiled index, and lookup latency while a hot reload recompiles
+# in-process vs in a subprocess. Linux only (reads /proc/self/status).
+
+import argparse
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from benchmarks.bench_qa_index import make_table
+from kb_store import KnowledgeStore, compile_index, read_jsonl
+from qa_index import QAIndex
+
+def memory_kib() -> dict:
+    """Resident memory split into anonymous (private) and file-backed (shareable) pages"""
+    values = {}
+    with open("/proc/self/status") as f:
+        for line in f:
+            key, _, rest = line.partition(":")
+            if key in ("VmRSS", "RssAnon", "RssFile"):
+                values[key] = int(rest.split()[0])
+    return values
+
+def child(mode: str, data_dir: str, index_path: str) -> None:
+    """Runs in a fresh interpreter; prints one JSON line"""
+    before = memory_kib()
+    start = time.perf_counter()
+    if mode == "jsonl":
+        index = QAIndex([read_jsonl(os.path.join(data_dir, "qa.jsonl"))])
+    else:
+        index = KnowledgeStore(data_dir, index_path=index_path, reload_interval=0).current().qa
+    load = time.perf_counter() - start
+    rng = random.Random(1)
+    questions = [line for line in open(os.path.join(data_dir, "qa.jsonl"), encoding="utf-8")][:5000]
+    for line in rng.sample(questions, 1000):
+        index.lookup(json.loads(line)["question"])
+    after = memory_kib()
+    print(json.dumps({"load_s": load, **{k: after[k] - before.get(k, 0) for k in after}}))
+
+def write_data(data_dir: str, entries: int) -> None:
+    os.makedirs(data_dir)
+    with open(os.path.join(data_dir, "knowledge_base.json"), "w") as f:
+        json.dump({"greetings": ["Hello!"]}, f)
+    with open(os.path.join(data_dir, "qa.jsonl"), "w", encoding="utf-8") as f:
+        for question, answer in make_table(entries, random.Random(1)).items():
+            f.write(json.dumps({"question": question, "answer": f"{answer}: " + "lorem ipsum " * 10}) + "\n")
+
+def run_child(mode: str, data_dir: str, index_path: str) -> dict:
+    out = subprocess.run([sys.executable, "-m", "benchmarks.bench_kb_load", "--child", mode, data_dir, index_path],
+                         check=True, capture_output=True, text=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+def lookups_during(action, store: KnowledgeStore) -> list:
+    """Run action in a thread while timing lookups on this thread"""
+    timings = []
+    worker = threading.Thread(target=action)
+    worker.start()
+    while worker.is_alive():
+        start = time.perf_counter()
+        store.current().qa.lookup("how do I reset my password")
+        timings.append(time.perf_counter() - start)
+        time.sleep(0.001)
+    return sorted(timings)
+
+def report_stall(label: str, timings: list) -> None:
+    p99 = timings[min(len(timings) - 1, int(len(timings) * 0.99))]
+    print(f"{label:<28} {len(timings):5} lookups  p99 {p99 * 1000:7.2f} ms  max {timings[-1] * 1000:7.2f} ms")
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--child":
+        child(*sys.argv[2:5])
+        sys.exit()
+    parser = argparse.ArgumentParser(description="Knowledge base load and reload benchmark")
+    parser.add_argument("--entries", type=int, default=100000)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    try:
+        data_dir = os.path.join(tmp, "data")
+        index_path = os.path.join(tmp, "qa.idx")
+        write_data(data_dir, args.entries)
+        size = os.path.getsize(os.path.join(data_dir, "qa.jsonl"))
+        store = KnowledgeStore(data_dir, index_path=index_path, reload_interval=0)
+        start = time.perf_counter()
+        store.current()
+        print(f"{args.entries} Q&A entries, {size / 2**20:.1f} MiB JSONL; first compile {time.perf_counter() - start:.2f} s, "
+              f"index {os.path.getsize(index_path) / 2**20:.1f} MiB")
+
+        for mode in ("jsonl", "mapped"):
+            result = run_child(mode, data_dir, index_path)
+            print(f"worker load {mode:<7} {result['load_s'] * 1000:8.1f} ms   RSS +{result['VmRSS'] / 1024:6.1f} MiB "
+                  f"(private {result['RssAnon'] / 1024:6.1f}, shared file pages {result['RssFile'] / 1024:5.1f})")
+
+        qa_path = os.path.join(data_dir, "qa.jsonl")
+        with open(qa_path, "a") as f:
+            f.write(json.dumps({"question": "what is new", "answer": "A reloaded answer."}) + "\n")
+        other = os.path.join(tmp, "other.idx")
+        report_stall("reload compiled in-thread", lookups_during(
+            lambda: compile_index(data_dir, other, store.fingerprint()), store))
+        report_stall("reload compiled subprocess", lookups_during(store.reload, store))
+        assert store.current().qa.lookup("what is new") == "A reloaded answer."
+        print(f"swapped in {store.stats()['last_load_ms']:.0f} ms: {store.stats()}")
+    finally:
+        shutil.rmtree(tmp)
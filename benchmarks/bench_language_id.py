@@ -0,0 +1,116 @@
+# benchmarks/bench_language_id.py
+# Accuracy and per-call latency of language detection on a small
+# multilingual chat corpus: the offline detector vs googletrans (if installed)
+
+import argparse
+import time
+from collections import Counter
+
+import language_id
+
+CORPUS = [
+    ("en", "what is the capital of france"),
+    ("en", "write python code to reverse a string"),
+    ("en", "i feel sad today"),
+    ("en", "tell me a joke"),
+    ("en", "thanks a lot, you are awesome"),
+    ("en", "describe black holes"),
+    ("en", "run print(2+2)"),
+    ("en", "good morning"),
+    ("en", "why is the sky blue?"),
+    ("en", "recommend some books on machine learning"),
+    ("es", "¿qué tiempo hace en madrid mañana?"),
+    ("es", "necesito ayuda con mi tarea de matemáticas"),
+    ("es", "me siento muy triste hoy"),
+    ("es", "cuéntame algo interesante sobre los planetas"),
+    ("es", "hola, ¿cómo te llamas?"),
+    ("es", "quiero aprender a programar en python"),
+    ("fr", "je suis très fatigué aujourd'hui"),
+    ("fr", "peux-tu m'expliquer la photosynthèse ?"),
+    ("fr", "quelle est la capitale de l'allemagne"),
+    ("fr", "merci beaucoup pour ton aide"),
+    ("fr", "j'ai besoin d'un conseil pour mon travail"),
+    ("fr", "raconte-moi une histoire drôle"),
+    ("de", "ich habe heute keine zeit"),
+    ("de", "kannst du mir ein rezept für kuchen geben"),
+    ("de", "was ist die hauptstadt von spanien"),
+    ("de", "ich bin so müde und traurig"),
+    ("de", "erkläre mir bitte schwarze löcher"),
+    ("de", "guten morgen, wie geht's?"),
+    ("it", "qual è la capitale della germania"),
+    ("it", "mi sento molto stanco oggi"),
+    ("it", "puoi spiegarmi come funziona internet?"),
+    ("it", "ho bisogno di aiuto con i compiti"),
+    ("it", "buonasera, come va?"),
+    ("pt", "qual é a capital da alemanha"),
+    ("pt", "estou muito cansado hoje"),
+    ("pt", "você pode me explicar buracos negros?"),
+    ("pt", "preciso de ajuda com o meu trabalho"),
+    ("pt", "bom dia, tudo bem?"),
+    ("nl", "wat is de hoofdstad van duitsland"),
+    ("nl", "ik ben vandaag erg moe"),
+    ("nl", "kun je me helpen met mijn huiswerk"),
+    ("nl", "goedemorgen, hoe gaat het?"),
+    ("tr", "almanya'nın başkenti neresi"),
+    ("tr", "bugün çok yorgunum"),
+    ("tr", "ödevime yardım eder misin"),
+    ("id", "apa ibu kota jerman"),
+    ("id", "saya sangat lelah hari ini"),
+    ("id", "bisakah kamu membantu pekerjaan rumah saya"),
+    ("pl", "jaka jest stolica niemiec"),
+    ("pl", "jestem dzisiaj bardzo zmęczony"),
+    ("pl", "czy możesz mi pomóc w pracy domowej"),
+    ("sv", "vad är huvudstaden i tyskland"),
+    ("sv", "jag är väldigt trött idag"),
+    ("sv", "kan du hjälpa mig med läxan"),
+    ("hi", "आज मौसम कैसा है?"),
+    ("hi", "मुझे एक चुटकुला सुनाओ"),
+    ("ur", "آج موسم کیسا ہے؟"),
+    ("ar", "ما هي عاصمة ألمانيا؟"),
+    ("ru", "какая сегодня погода?"),
+    ("uk", "яка сьогодні погода?"),
+    ("zh-CN", "今天天气怎么样？"),
+    ("ja", "今日の天気はどうですか？"),
+    ("ko", "오늘 날씨 어때요?"),
+    ("el", "τι καιρό κάνει σήμερα;"),
+    ("iw", "מה מזג האוויר היום?"),
+    ("th", "วันนี้อากาศเป็นอย่างไร"),
+    ("ta", "இன்று வானிலை எப்படி இருக்கிறது?"),
+    ("bn", "আজ আবহাওয়া কেমন?"),
+]
+
+def per_call_us(detect, texts: list, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for text in texts:
+            detect(text)
+    return (time.perf_counter() - start) / (repeat * len(texts)) * 1e6
+
+def measure(label: str, detect, repeat: int) -> None:
+    wrong = Counter()
+    for expected, text in CORPUS:
+        got = detect(text)
+        if got.lower() != expected.lower():
+            wrong[(expected, got)] += 1
+    english = [text for lang, text in CORPUS if lang == "en"]
+    correct = len(CORPUS) - sum(wrong.values())
+    print(f"{label:<11} accuracy {correct}/{len(CORPUS)} ({correct / len(CORPUS):.1%})  "
+          f"{per_call_us(detect, [text for _, text in CORPUS], repeat):9.1f} us/call, "
+          f"English only {per_call_us(detect, english, repeat):9.1f} us/call")
+    for (expected, got), count in sorted(wrong.items()):
+        print(f"  {expected} -> {got}: {count}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Language detection benchmark")
+    parser.add_argument("--repeat", type=int, default=200, help="timing passes over the corpus")
+    args = parser.parse_args()
+
+    language_id.detect("hola, ¿qué tal?")  # build the trigram profiles outside the timing
+    measure("offline", language_id.detect, args.repeat)
+    try:
+        from googletrans import Translator
+    except ImportError:
+        print("googletrans  not installed, skipped")
+    else:
+        translator = Translator()
+        measure("googletrans", lambda text: translator.detect(text).lang, 1)
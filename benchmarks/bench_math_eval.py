@@ -0,0 +1,115 @@
+# benchmarks/bench_math_eval.py
+# Fuzzes math_eval.evaluate: random expressions must agree with Python's
+# eval(), hostile inputs (huge powers, factorials, code) must be refused
+# quickly, and valid inputs at the limits must stay fast. Prints latency
+# percentiles and the worst case per group.
+
+import argparse
+import math
+import random
+import time
+
+import math_eval
+
+HOSTILE = [
+    "9**9**9 + 1",
+    "10**10**10",
+    "2**100000",
+    "(10**1000)**1000",
+    "pow(7, 10**9)",
+    "pow(7, 10**9, 13)",
+    "factorial(10**6)",
+    "factorial(factorial(10))",
+    "round(10, -10**9)",
+    "1.0000001**10**9",
+    "2**4000 * 2**4000",
+    "9" * 500,
+    "1+" * 150 + "1",
+    "__import__('os').system('true')",
+    "().__class__.__bases__",
+    "open('/etc/passwd')",
+    "[1] * 10**9",
+    "'a' * 10**9",
+    "lambda: 1",
+]
+
+# Valid, but at the length and nesting limits
+STRESS = [
+    "-" * 190 + "1",
+    "(" * 90 + "1" + ")" * 90,
+    "1+" * 99 + "1",
+    "2**4095 - 1",
+    "factorial(400) // factorial(399)",
+]
+
+OPERATORS = ["+", "-", "*", "/", "//", "%", "**"]
+
+def random_expression(rng: random.Random, depth: int) -> str:
+    if depth == 0 or rng.random() < 0.3:
+        value = rng.choice([rng.randint(0, 10**rng.randint(1, 30)), round(rng.uniform(-1e6, 1e6), 3)])
+        return str(value) if value >= 0 else f"({value})"
+    op = rng.choice(OPERATORS)
+    if op == "**":
+        # Keep valid exponents small, so results stay comparable with eval()
+        return f"({random_expression(rng, depth - 1)}) ** {rng.randint(0, 12)}"
+    return f"({random_expression(rng, depth - 1)} {op} {random_expression(rng, depth - 1)})"
+
+def timed(expression: str):
+    start = time.perf_counter()
+    try:
+        result = math_eval.evaluate(expression)
+    except math_eval.MathError as e:
+        result = e
+    return result, time.perf_counter() - start
+
+def same(a, b) -> bool:
+    if isinstance(a, float) or isinstance(b, float):
+        return math.isclose(a, b, rel_tol=1e-9, abs_tol=1e-12)
+    return a == b
+
+def report(label: str, timings: list) -> None:
+    timings = sorted(timings)
+    pick = lambda q: timings[min(len(timings) - 1, int(len(timings) * q))] * 1e6
+    print(f"{label:<9} {len(timings):6} exprs  p50 {pick(0.5):7.1f} us  p99 {pick(0.99):7.1f} us  "
+          f"max {timings[-1] * 1e6:8.1f} us")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Math evaluator fuzz benchmark")
+    parser.add_argument("--count", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    timings, checked, refused, mismatches = [], 0, 0, 0
+    for _ in range(args.count):
+        expression = random_expression(rng, rng.randint(1, 4))
+        result, elapsed = timed(expression)
+        timings.append(elapsed)
+        if isinstance(result, math_eval.MathError):
+            refused += 1
+            continue
+        checked += 1
+        if not same(result, eval(expression)):
+            mismatches += 1
+            print(f"mismatch: {expression} -> {result}")
+    report("random", timings)
+    print(f"          {checked} agreed with eval: {checked - mismatches}, refused: {refused}")
+
+    hostile_timings = []
+    for expression in HOSTILE:
+        math_eval._evaluate.cache_clear()
+        result, elapsed = timed(expression)
+        hostile_timings.append(elapsed)
+        if not isinstance(result, math_eval.MathError):
+            print(f"accepted hostile input: {expression[:40]} -> {str(result)[:40]}")
+    report("hostile", hostile_timings)
+
+    stress_timings = []
+    for expression in STRESS:
+        math_eval._evaluate.cache_clear()
+        stress_timings.append(timed(expression)[1])
+    report("stress", stress_timings)
+
+    _, elapsed = timed("2 + 2")
+    _, elapsed = timed("2 + 2")
+    print(f"memoized  {elapsed * 1e6:7.2f} us  {math_eval.cache_stats()}")
@@ -0,0 +1,60 @@
+# benchmarks/bench_metrics.py
+# Cost of the latency instrumentation: one histogram observation, a
+# request's worth of stage timings, get_response_details per local tier
+# with recording on and off, and rendering /metrics
+
+import argparse
+import statistics
+import time
+
+import chatbot
+import metrics
+from benchmarks.tier_corpus import CORPUS
+
+STAGES = {"language": 2e-5, "intents": 1e-5, "sentiment": 3e-5, "local": 4e-5, "total": 1e-4}
+
+def per_call_ns(function, calls: int) -> float:
+    start = time.perf_counter()
+    for _ in range(calls):
+        function()
+    return (time.perf_counter() - start) / calls * 1e9
+
+def time_messages(messages: list, rounds: int) -> float:
+    """Mean seconds per get_response_details call"""
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for message in messages:
+            chatbot.get_response_details(message)
+    return (time.perf_counter() - start) / (rounds * len(messages))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Metrics instrumentation overhead")
+    parser.add_argument("--calls", type=int, default=200000)
+    parser.add_argument("--rounds", type=int, default=200, help="passes over each tier's messages")
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    histogram = metrics.Histogram("bench_seconds", "benchmark", ("stage", "tier"))
+    timings = {}
+    print(f"perf_counter()           {per_call_ns(time.perf_counter, args.calls):8.0f} ns")
+    print(f"stage lap                {per_call_ns(lambda: chatbot._lap(timings, 'local', 0.0), args.calls):8.0f} ns")
+    print(f"observe()                {per_call_ns(lambda: histogram.observe(('local', 'qa'), 4e-5), args.calls):8.0f} ns")
+    print(f"observe_many({len(STAGES)} stages)   {per_call_ns(lambda: histogram.observe_many('qa', STAGES), args.calls):8.0f} ns")
+
+    # Recording on and off in alternating runs, so drift hits both alike
+    tiers = [tier for tier in CORPUS if not tier.startswith("openai")]
+    print(f"\n{'tier':<15} {'off us':>8} {'on us':>8} {'overhead':>9}")
+    for tier in tiers:
+        off, on = [], []
+        for _ in range(args.repeats):
+            for enabled, samples in ((False, off), (True, on)):
+                metrics.ENABLED = enabled
+                samples.append(time_messages(CORPUS[tier], args.rounds))
+        off_us, on_us = statistics.median(off) * 1e6, statistics.median(on) * 1e6
+        print(f"{tier:<15} {off_us:8.2f} {on_us:8.2f} {on_us - off_us:+7.2f}us ({(on_us / off_us - 1) * 100:+.1f}%)")
+    metrics.ENABLED = True
+
+    start = time.perf_counter()
+    text = metrics.render()
+    print(f"\nrender /metrics: {len(text.splitlines())} lines, {len(text) / 1024:.1f} KiB in "
+          f"{(time.perf_counter() - start) * 1000:.2f} ms")
@@ -0,0 +1,100 @@
+# benchmarks/bench_qa_index.py
+# Q&A lookup with a large synthetic table: build time, memory and lookup
+# latency of qa_index.QAIndex vs the former linear `key in text` scan, for
+# messages that contain a question, contain it with a typo, or miss
+
+import argparse
+import random
+import time
+import tracemalloc
+
+from qa_index import QAIndex
+
+WORDS = """
+what how why when where who which can could does do is are my your the a to in on for of with
+python javascript code program function class list string loop error install run server data file
+network cloud model train deploy test debug memory speed cache index query table user account
+password email reset change delete create update price plan order refund ship track invoice
+""".split()
+
+def make_vocabulary(size: int, rng: random.Random) -> list:
+    """Pronounceable made-up words standing in for a real table's vocabulary"""
+    syllables = [c + v for c in "bcdfghjklmnprstvz" for v in "aeiou"]
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choice(syllables) for _ in range(rng.randint(2, 4))))
+    return sorted(words)
+
+def make_table(entries: int, rng: random.Random) -> dict:
+    vocabulary = make_vocabulary(20000, rng)
+    table = {}
+    while len(table) < entries:
+        words = [rng.choice(WORDS) for _ in range(rng.randint(2, 4))]
+        words += [rng.choice(vocabulary) for _ in range(rng.randint(1, 3))]
+        rng.shuffle(words)
+        table[" ".join(words)] = f"answer {len(table)}"
+    return table
+
+def add_typo(word: str, rng: random.Random) -> str:
+    i = rng.randrange(len(word) - 1)
+    return word[:i] + word[i + 1] + word[i] + word[i + 2:]  # swap two letters
+
+def linear_lookup(table: dict, text: str):
+    """The previous get_qa_response strategy"""
+    text = text.lower().strip()
+    if text in table:
+        return table[text]
+    for key, value in table.items():
+        if key in text:
+            return value
+    return None
+
+def percentile(samples: list, fraction: float) -> float:
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))]
+
+def measure(label: str, lookup, messages: list) -> None:
+    timings, found = [], 0
+    for message in messages:
+        start = time.perf_counter()
+        found += lookup(message) is not None
+        timings.append(time.perf_counter() - start)
+    print(f"{label:<20} p50 {percentile(timings, 0.5) * 1e6:9.1f} us  p99 {percentile(timings, 0.99) * 1e6:9.1f} us  "
+          f"answered {found}/{len(messages)}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Q&A index benchmark")
+    parser.add_argument("--entries", type=int, default=100000)
+    parser.add_argument("--lookups", type=int, default=2000)
+    parser.add_argument("--linear-lookups", type=int, default=50)
+    args = parser.parse_args()
+    rng = random.Random(1)
+
+    table = make_table(args.entries, rng)
+    questions = list(table)
+    tracemalloc.start()
+    start = time.perf_counter()
+    index = QAIndex([table])
+    build = time.perf_counter() - start
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print(f"{len(index)} entries indexed in {build:.2f} s, {memory / 2**20:.1f} MiB")
+
+    contained = [f"hi there, {q}? thanks" for q in rng.sample(questions, args.lookups)]
+    typos = []
+    for question in rng.sample(questions, args.lookups):
+        words = question.split()
+        long_words = [i for i, word in enumerate(words) if len(word) >= 5]
+        if long_words:
+            i = rng.choice(long_words)
+            words[i] = add_typo(words[i], rng)
+        typos.append(" ".join(words))
+    misses = [" ".join(rng.choice(WORDS) for _ in range(8)) for _ in range(args.lookups)]
+
+    measure("index contained", index.lookup, contained)
+    measure("index with typo", index.lookup, typos)
+    measure("index miss", index.lookup, misses)
+    n = args.linear_lookups
+    measure("linear contained", lambda text: linear_lookup(table, text), contained[:n])
+    measure("linear with typo", lambda text: linear_lookup(table, text), typos[:n])
+    measure("linear miss", lambda text: linear_lookup(table, text), misses[:n])
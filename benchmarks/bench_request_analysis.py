@@ -0,0 +1,45 @@
+# benchmarks/bench_request_analysis.py
+# Per-request CPU spent on analysis: repeated sentiment passes vs one shared context
+
+import time
+
+from chatbot import INTENT_MATCHER, analyze_message
+from nlp_utils import clean_text, detect_language
+from sentiment import analyze_sentiment, get_mood
+
+MESSAGES = [
+    "I am so happy today, this is awesome!",
+    "This is not good at all, I hate this bug",
+    "tell me about black holes",
+    "I feel really sad and lonely",
+    "write python code for fibonacci",
+]
+
+def previous_flow(message: str, backend: str) -> None:
+    """get_response ran sentiment twice, then /chat ran get_mood again"""
+    detect_language(clean_text(message))
+    INTENT_MATCHER.match(message.lower().strip())
+    analyze_sentiment(message, backend)
+    get_mood(message, backend)
+    get_mood(message, backend)
+
+def shared_context(message: str, backend: str) -> None:
+    analyze_message(message)
+
+def cpu_per_request(func, backend: str, rounds: int) -> float:
+    func(MESSAGES[0], backend)  # warm up lazy imports
+    start = time.process_time()
+    for _ in range(rounds):
+        for message in MESSAGES:
+            func(message, backend)
+    return (time.process_time() - start) / (rounds * len(MESSAGES))
+
+if __name__ == "__main__":
+    import sentiment
+
+    for backend, rounds in (("lexicon", 2000), ("textblob", 100)):
+        sentiment.SENTIMENT_BACKEND = backend
+        before = cpu_per_request(previous_flow, backend, rounds)
+        after = cpu_per_request(shared_context, backend, rounds)
+        print(f"{backend:<9} previous: {before * 1e6:8.1f} us   shared context: {after * 1e6:8.1f} us   "
+              f"saved: {(before - after) * 1e6:8.1f} us/request")
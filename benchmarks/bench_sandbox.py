@@ -0,0 +1,43 @@
+# benchmarks/bench_sandbox.py
+# Per-run latency of code_executor.run_code: a fresh interpreter per call
+# vs the warm sandbox worker pool
+
+import argparse
+import time
+
+import code_executor
+from sandbox_pool import SandboxPool
+
+SNIPPETS = [
+    "print(2+2)",
+    "print(sum(range(1000)))",
+    "print('hello'[::-1])",
+    "import math; print(math.factorial(20))",
+    "print([x * x for x in range(10)])",
+]
+
+def percentile(samples: list, fraction: float) -> float:
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))]
+
+def measure(label: str, run, runs: int) -> None:
+    timings = []
+    for i in range(runs):
+        start = time.perf_counter()
+        run(SNIPPETS[i % len(SNIPPETS)])
+        timings.append(time.perf_counter() - start)
+    print(f"{label:<12} {runs} runs  mean {sum(timings) / runs * 1000:7.2f} ms  "
+          f"p50 {percentile(timings, 0.5) * 1000:7.2f} ms  p95 {percentile(timings, 0.95) * 1000:7.2f} ms")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Code sandbox latency benchmark")
+    parser.add_argument("--runs", type=int, default=200)
+    parser.add_argument("--max-jobs", type=int, default=50, help="jobs before a worker is recycled")
+    args = parser.parse_args()
+
+    measure("subprocess", code_executor._run_subprocess, args.runs)
+    pool = SandboxPool(size=1, max_jobs=args.max_jobs, timeout=code_executor.RUN_TIMEOUT)
+    pool.warm_up()
+    measure("warm pool", pool.run, args.runs)
+    print(f"workers recycled: {pool.stats()['recycled']}")
+    pool.close()
@@ -0,0 +1,97 @@
+# benchmarks/bench_semantic_cache.py
+# Lookup latency and hit quality of the semantic cache at tens of thousands
+# of prompts. Exits 1 if any of the NEAR_MISSES pairs share an answer.
+
+import argparse
+import random
+import sys
+import time
+
+from semantic_cache import SemanticCache
+
+SYLLABLES = ["ka", "lo", "mi", "zen", "tor", "bri", "val", "qu", "dex", "ran", "sol", "fi", "gar", "nu", "pex"]
+OBJECTS = ["string", "list", "dictionary", "file", "matrix", "tree", "graph", "date", "queue", "url"]
+
+# (cached prompt, lookup) pairs that ask for different answers and must never match
+NEAR_MISSES = [
+    ("convert celsius to fahrenheit", "convert fahrenheit to celsius"),
+    ("is it safe to take ibuprofen", "is it not safe to take ibuprofen"),
+    ("is it safe to take ibuprofen", "isn't it safe to take ibuprofen"),
+    ("translate english to french", "translate french to english"),
+    ("why is python faster than java", "why is java faster than python"),
+    ("write a loop with a break", "write a loop without a break"),
+    ("write a python function that takes a list of integers and returns the sum of all even numbers in the list",
+     "write a python function that takes a list of integers and returns the sum of all odd numbers in the list"),
+    ("create a bank account class in python that can deposit money and withdraw money and show the balance",
+     "create a bank account class in python that can deposit money and transfer money and show the balance"),
+]
+
+def near_miss_failures() -> list:
+    failures = []
+    for cached, query in NEAR_MISSES:
+        cache = SemanticCache(maxsize=16)
+        cache.set(cached, cached)
+        if cache.get(query) is not None:
+            vectors = cache.embed(cached), cache.embed(query)
+            failures.append(f"{query!r} matched {cached!r} (cosine {float(vectors[0] @ vectors[1]):.3f})")
+    return failures
+
+def pseudo_word(rng: random.Random) -> str:
+    return "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(3, 4)))
+
+def make_prompts(count: int, rng: random.Random) -> list:
+    """Distinct prompts built around invented names, half of them code requests"""
+    prompts = set()
+    while len(prompts) < count:
+        if rng.random() < 0.5:
+            prompts.add(f"write python code to {pseudo_word(rng)} a {rng.choice(OBJECTS)}")
+        else:
+            prompts.add(f"tell me about the {pseudo_word(rng)} {pseudo_word(rng)}")
+    return list(prompts)
+
+def paraphrase(prompt: str) -> str:
+    if prompt.startswith("write "):
+        words = prompt.split()
+        return f"give me python code that can {words[4]} {words[6]}s"
+    return "what do you know about " + prompt[len("tell me about the "):]
+
+def percentile(samples: list, fraction: float) -> float:
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Semantic cache benchmark")
+    parser.add_argument("--entries", type=int, default=50000)
+    parser.add_argument("--queries", type=int, default=2000)
+    args = parser.parse_args()
+
+    failures = near_miss_failures()
+    for failure in failures:
+        print(f"WRONG HIT {failure}")
+    print(f"near misses: {len(NEAR_MISSES) - len(failures)}/{len(NEAR_MISSES)} kept apart")
+
+    rng = random.Random(7)
+    cache = SemanticCache(maxsize=args.entries)
+    prompts = make_prompts(args.entries, rng)
+    indexed = set(prompts)
+    start = time.perf_counter()
+    for prompt in prompts:
+        cache.set(prompt, prompt)
+    print(f"indexed {len(cache)} prompts in {time.perf_counter() - start:.2f}s")
+
+    for label, queries in (
+        ("paraphrase", [(paraphrase(p), p) for p in rng.sample(prompts, args.queries)]),
+        ("unseen", [(p, None) for p in make_prompts(args.queries * 2, random.Random(99))
+                    if p not in indexed][:args.queries]),
+    ):
+        timings, correct, hits = [], 0, 0
+        for query, expected in queries:
+            start = time.perf_counter()
+            answer = cache.get(query)
+            timings.append(time.perf_counter() - start)
+            hits += answer is not None
+            correct += answer == expected
+        print(f"{label:<10} hit rate {hits / len(queries):6.1%}  correct {correct}/{len(queries)}  "
+              f"p50 {percentile(timings, 0.5) * 1e6:7.1f} us  p99 {percentile(timings, 0.99) * 1e6:7.1f} us")
+    if failures:
+        sys.exit(1)
@@ -0,0 +1,37 @@
+# benchmarks/bench_sentiment.py
+# Per-message cost of sentiment analysis: TextBlob vs the built-in lexicon
+
+import timeit
+
+from sentiment import analyze_sentiment, analyze_sentiment_batch
+
+MESSAGES = [
+    "I am so happy today, this is awesome!",
+    "This is not good at all, I hate this bug",
+    "what is python",
+    "I feel really sad and lonely",
+    "can you tell me a joke?",
+    "the code works great, thanks a lot",
+    "I'm frustrated, nothing works and the error keeps coming back",
+    "hello there",
+]
+
+def bench(label: str, func, number: int) -> float:
+    func()  # warm up imports and caches
+    per_call = timeit.timeit(func, number=number) / number / len(MESSAGES)
+    print(f"{label:<22} {per_call * 1e6:9.2f} us/message")
+    return per_call
+
+if __name__ == "__main__":
+    textblob = bench("textblob", lambda: [analyze_sentiment(m, "textblob") for m in MESSAGES], 200)
+    lexicon = bench("lexicon", lambda: [analyze_sentiment(m, "lexicon") for m in MESSAGES], 5000)
+    batch = bench("lexicon batch", lambda: analyze_sentiment_batch(MESSAGES), 5000)
+    print(f"lexicon speedup vs textblob: {textblob / lexicon:.0f}x (batch {textblob / batch:.0f}x)")
+
+    # The batch pass saves per-message calls, so it pays off on larger batches
+    large = MESSAGES * 125
+    assert analyze_sentiment_batch(large) == [analyze_sentiment(m, "lexicon") for m in large]
+    per_message = timeit.timeit(lambda: [analyze_sentiment(m, "lexicon") for m in large], number=50) / 50 / len(large)
+    per_batch = timeit.timeit(lambda: analyze_sentiment_batch(large), number=50) / 50 / len(large)
+    print(f"{len(large)} messages: {per_message * 1e6:.2f} us/message one by one, "
+          f"{per_batch * 1e6:.2f} us/message batched ({(1 - per_batch / per_message) * 100:.0f}% less)")
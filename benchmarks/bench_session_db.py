@@ -0,0 +1,95 @@
+# benchmarks/bench_session_db.py
+# SQLite session backend: checks that turns recorded by one process reach
+# another and that old turns are compacted, then measures append() and
+# context() throughput of concurrent writer and reader processes, with
+# one commit per turn vs batched writes.
+
+import argparse
+import multiprocessing
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+from sessions import SQLiteSessionStore
+
+def check(db_path: str) -> None:
+    """Two stores on one file behave like two worker processes"""
+    a = SQLiteSessionStore(db_path, max_turns=4, cache_ttl=0.2, flush_interval=0.05)
+    b = SQLiteSessionStore(db_path, max_turns=4, cache_ttl=0.2, flush_interval=0.05)
+    assert b.context("alice", 1000) == []
+    for i in range(10):
+        a.append("alice", f"question {i}", f"answer {i}")
+    assert a.context("alice", 1000)[-1]["content"] == "answer 9", "own writes are visible at once"
+    time.sleep(0.3)
+    messages = b.context("alice", 1000)
+    assert [m["content"] for m in messages[::2]] == [f"question {i}" for i in range(6, 10)], messages
+    a.flush()
+    rows = sqlite3.connect(db_path).execute("SELECT COUNT(*) FROM turns WHERE user_id = 'alice'").fetchone()[0]
+    assert rows == 4, f"compaction kept {rows} turns"
+    a.forget("alice")
+    time.sleep(0.3)
+    assert b.context("alice", 1000) == []
+    a.close()
+    b.close()
+    print("checks     cross-process visibility, compaction and forget: ok")
+
+def writer(db_path: str, users: int, seconds: float, batched: bool, results) -> None:
+    store = SQLiteSessionStore(db_path, cache_size=users)
+    rng = random.Random(os.getpid())
+    count = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        store.append(f"user-{rng.randrange(users)}", "how do I reverse a list?", "Use my_list[::-1] to get a reversed copy.")
+        if not batched:
+            store.flush()  # one transaction per turn
+        count += 1
+    store.close()
+    results.put(("append", count, store.stats()))
+
+def reader(db_path: str, users: int, seconds: float, results) -> None:
+    store = SQLiteSessionStore(db_path, cache_size=users)
+    rng = random.Random(os.getpid())
+    count = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        store.context(f"user-{rng.randrange(users)}", 1000)
+        count += 1
+    results.put(("context", count, store.stats()))
+
+def run(label: str, db_path: str, writers: int, readers: int, users: int, seconds: float, batched: bool) -> None:
+    results = multiprocessing.Queue()
+    processes = [multiprocessing.Process(target=writer, args=(db_path, users, seconds, batched, results))
+                 for _ in range(writers)]
+    processes += [multiprocessing.Process(target=reader, args=(db_path, users, seconds, results))
+                  for _ in range(readers)]
+    for process in processes:
+        process.start()
+    totals = {"append": 0, "context": 0}
+    hits = misses = 0
+    for _ in processes:
+        kind, count, stats = results.get()
+        totals[kind] += count
+        if kind == "context":
+            hits += stats["cache_hits"]
+            misses += stats["cache_misses"]
+    for process in processes:
+        process.join()
+    print(f"{label:<10} {writers} writers {totals['append'] / seconds:9.0f} appends/s   "
+          f"{readers} readers {totals['context'] / seconds:9.0f} context()/s   "
+          f"reader cache hit rate {hits / max(1, hits + misses):.0%}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="SQLite session backend benchmark")
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--readers", type=int, default=2)
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument("--seconds", type=float, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        check(os.path.join(tmp, "check.db"))
+        for label, batched in (("per-turn", False), ("batched", True)):
+            run(label, os.path.join(tmp, f"{label}.db"), args.writers, args.readers, args.users,
+                args.seconds, batched)
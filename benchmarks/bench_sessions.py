@@ -0,0 +1,72 @@
+# benchmarks/bench_sessions.py
+# Session store at scale: memory per session and the cost of append() and
+# context() with 100k live sessions, plus eviction under a memory cap
+
+import argparse
+import random
+import time
+import tracemalloc
+
+from sessions import SessionStore
+
+USER_LINES = [
+    "how do I reverse a list in python",
+    "what about a string?",
+    "tell me a joke",
+    "why is the sky blue",
+    "can you explain recursion with an example",
+]
+BOT_LINES = [
+    "Use my_list[::-1] or my_list.reverse() to reverse it in place.",
+    "Strings work the same way: 'hello'[::-1] gives 'olleh'.",
+    "Why do programmers prefer dark mode? Because light attracts bugs!",
+    "Sunlight is scattered by the atmosphere, and blue light scatters the most.",
+    "Recursion is when a function calls itself, like factorial(n) = n * factorial(n - 1).",
+]
+
+def percentile(samples: list, fraction: float) -> float:
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))]
+
+def fill(store: SessionStore, sessions: int, turns: int, rng: random.Random) -> None:
+    for user in range(sessions):
+        for _ in range(turns):
+            i = rng.randrange(len(USER_LINES))
+            # Distinct strings per turn, as real messages would be
+            store.append(f"user-{user}", f"{USER_LINES[i]} ({user})", f"{BOT_LINES[i]} ({user})")
+
+def timed(label: str, run, calls: int) -> None:
+    timings = []
+    for i in range(calls):
+        start = time.perf_counter()
+        run(i)
+        timings.append(time.perf_counter() - start)
+    print(f"{label:<10} p50 {percentile(timings, 0.5) * 1e6:6.2f} us  p99 {percentile(timings, 0.99) * 1e6:6.2f} us")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Session store benchmark")
+    parser.add_argument("--sessions", type=int, default=100000)
+    parser.add_argument("--turns", type=int, default=4)
+    parser.add_argument("--calls", type=int, default=50000)
+    args = parser.parse_args()
+    rng = random.Random(1)
+
+    tracemalloc.start()
+    store = SessionStore(maxsize=args.sessions, ttl=3600, max_bytes=1 << 40)
+    start = time.perf_counter()
+    fill(store, args.sessions, args.turns, rng)
+    elapsed = time.perf_counter() - start
+    traced = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    stats = store.stats()
+    print(f"{args.sessions} sessions x {args.turns} turns filled in {elapsed:.2f} s")
+    print(f"memory     {traced / args.sessions:6.0f} B/session traced, "
+          f"{stats['bytes'] / args.sessions:6.0f} B/session estimated by the store")
+
+    timed("context()", lambda i: store.context(f"user-{rng.randrange(args.sessions)}", 1000), args.calls)
+    timed("append()", lambda i: store.append(f"user-{rng.randrange(args.sessions)}", USER_LINES[0], BOT_LINES[0]), args.calls)
+
+    # Memory cap at a quarter of the filled size: the oldest sessions go first
+    capped = SessionStore(maxsize=args.sessions, ttl=3600, max_bytes=stats["bytes"] // 4)
+    fill(capped, args.sessions, args.turns, rng)
+    print(f"capped     {capped.stats()}")
@@ -0,0 +1,72 @@
+# benchmarks/bench_singleflight.py
+# N identical concurrent OpenAI fallback requests against the local fake
+# server should cost one upstream completion, for threads and coroutines
+# alike; a failing upstream call reaches every waiter and is not cached.
+# Exits 1 when any case makes other than exactly one upstream call or the
+# callers get different answers.
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.fake_openai import start_server
+
+def run_threads(prompt: str, requests: int) -> list:
+    with ThreadPoolExecutor(max_workers=requests) as pool:
+        return list(pool.map(lambda _: chatbot.get_response(prompt), range(requests)))
+
+async def run_async(prompt: str, requests: int) -> list:
+    results = await asyncio.gather(*(chatbot.get_response_details_async(prompt) for _ in range(requests)))
+    await llm_client.close_clients()
+    return [result.response for result in results]
+
+def report(label: str, server, before: int, answers: list, elapsed: float) -> list:
+    """Print a case; returns what went wrong in it"""
+    calls, distinct = server.requests - before, len(set(answers))
+    print(f"{label:<14} {len(answers)} requests -> {calls} upstream call(s), "
+          f"{distinct} distinct answer(s), {elapsed:.2f}s")
+    problems = []
+    if calls != 1:
+        problems.append(f"{label}: {calls} upstream calls, expected 1")
+    if distinct != 1:
+        problems.append(f"{label}: {distinct} distinct answers, expected 1")
+    return problems
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Single-flight coalescing demo")
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.3, help="fake completion latency in seconds")
+    args = parser.parse_args()
+
+    server = start_server(latency=args.latency)
+    os.environ["OPENAI_API_KEY"] = "test"
+    os.environ["OPENAI_BASE_URL"] = server.url
+
+    import chatbot
+    import llm_client
+
+    cases = (
+        ("threads", "describe black holes", lambda p: run_threads(p, args.requests)),
+        ("async", "describe neutron stars", lambda p: asyncio.run(run_async(p, args.requests))),
+    )
+    problems = []
+    for label, prompt, run in cases:
+        before, start = server.requests, time.perf_counter()
+        problems += report(label, server, before, run(prompt), time.perf_counter() - start)
+
+    # The failure reaches every waiter; once upstream recovers the prompt is
+    # fetched again because the error was never cached
+    prompt = "describe quasars"
+    for label, status in (("failing", 400), ("recovered", 0)):
+        server.error_status = status
+        before, start = server.requests, time.perf_counter()
+        problems += report(label, server, before, run_threads(prompt, args.requests), time.perf_counter() - start)
+    print(chatbot.cache_stats()["single_flight"])
+    for problem in problems:
+        print(f"FAILED {problem}")
+    if problems:
+        sys.exit(1)
+    print("every case reached upstream exactly once")
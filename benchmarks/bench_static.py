@@ -0,0 +1,84 @@
+# benchmarks/bench_static.py
+# Home page and /static delivery, in process: requests per second and bytes
+# on the wire for a first visit and for a repeat visitor revalidating its
+# cached copy. "before" serves the files the way the apps used to, with
+# FileResponse and StaticFiles; the apps now serve them from static_assets.
+#
+#   python -m benchmarks.bench_static
+#
+# Bytes on the wire are the HTTP/1.1 status line, headers and body, without
+# TCP/TLS framing.
+
+import argparse
+import asyncio
+import os
+import time
+
+from benchmarks.loadgen import ASGITransport
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "static")
+ACCEPT = (("accept-encoding", "gzip, deflate, br"),)
+PATHS = ("/", "/static/Manna.html")
+
+def before_app():
+    """The old handlers: the page and static files read from disk on every request"""
+    from fastapi import FastAPI
+    from fastapi.responses import FileResponse
+    from fastapi.staticfiles import StaticFiles
+    app = FastAPI()
+
+    @app.get("/")
+    async def serve_home():
+        return FileResponse(os.path.join(STATIC_DIR, "Manna.html"))
+
+    app.mount("/static", StaticFiles(directory=STATIC_DIR), name="static")
+    return app
+
+def wire_bytes(status: int, headers: list, body: bytes) -> int:
+    status_line = len(f"HTTP/1.1 {status} XX\r\n")
+    return status_line + sum(len(name) + len(value) + 4 for name, value in headers) + 2 + len(body)
+
+def validators(headers: list) -> tuple:
+    """Conditional request headers a browser sends for the copy it cached"""
+    found = {name.decode().lower(): value.decode() for name, value in headers}
+    conditional = []
+    if "etag" in found:
+        conditional.append(("if-none-match", found["etag"]))
+    if "last-modified" in found:
+        conditional.append(("if-modified-since", found["last-modified"]))
+    return tuple(conditional)
+
+async def visit(transport, path: str, requests: int) -> dict:
+    status, headers, body = await transport.exchange("GET", path, headers=ACCEPT)
+    first = {"status": status, "bytes": wire_bytes(status, headers, body)}
+    repeat_headers = ACCEPT + validators(headers)
+    repeat_status, repeat_response, repeat_body = await transport.exchange("GET", path, headers=repeat_headers)
+    repeat = {"status": repeat_status, "bytes": wire_bytes(repeat_status, repeat_response, repeat_body)}
+
+    for row, request_headers in ((first, ACCEPT), (repeat, repeat_headers)):
+        start = time.perf_counter()
+        for _ in range(requests):
+            await transport.exchange("GET", path, headers=request_headers)
+        row["rps"] = requests / (time.perf_counter() - start)
+    return {"first": first, "repeat": repeat}
+
+async def run(requests: int) -> None:
+    import main
+    apps = {"before": before_app(), "main.py": main.app}
+    from api import index
+    apps["api/index.py"] = index.app
+
+    print(f"{'app':<14} {'path':<20} {'first req/s':>12} {'bytes':>7} {'repeat req/s':>13} {'status':>7} {'bytes':>7}")
+    for name, app in apps.items():
+        transport = ASGITransport(app)
+        for path in PATHS:
+            result = await visit(transport, path, requests)
+            first, repeat = result["first"], result["repeat"]
+            print(f"{name:<14} {path:<20} {first['rps']:12.0f} {first['bytes']:7d} {repeat['rps']:13.0f} "
+                  f"{repeat['status']:7d} {repeat['bytes']:7d}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Static asset delivery benchmark")
+    parser.add_argument("--requests", type=int, default=2000, help="timed requests per path and visit")
+    args = parser.parse_args()
+    asyncio.run(run(args.requests))
@@ -0,0 +1,190 @@
+# benchmarks/bench_tiers.py
+# Cost of every get_response tier: p50/p95/p99 latency and allocations per
+# call for the messages in tier_corpus, with the OpenAI fallback answered
+# by a local fake server in a separate process. Results can be saved as
+# JSON and compared against an earlier run to flag regressions.
+#
+#   python -m benchmarks.bench_tiers --output before.json
+#   python -m benchmarks.bench_tiers --baseline before.json
+#
+# "openai" clears the answer caches before every call so each one reaches
+# the server; --cold does the same for the code and math caches in every
+# tier. Allocations are traced in this process only, so code run in the
+# sandbox workers is not counted.
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from collections import Counter
+
+from benchmarks.fake_openai import spawn_server
+from benchmarks.tier_corpus import CORPUS, EXPECTED_INTENT
+
+def percentile(samples: list, fraction: float) -> float:
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))]
+
+def clear_answer_caches() -> None:
+    chatbot.RESPONSE_CACHE.clear()
+    if chatbot.SEMANTIC_CACHE is not None:
+        chatbot.SEMANTIC_CACHE.clear()
+
+def clear_local_caches() -> None:
+    code_executor.RESULT_CACHE.clear()
+    math_eval.cache_clear()
+
+def reset_for(tier: str, cold: bool):
+    """What to clear before each call of a tier, or None"""
+    steps = ([clear_answer_caches] if tier == "openai" else []) + ([clear_local_caches] if cold else [])
+    if not steps:
+        return None
+
+    def reset() -> None:
+        for step in steps:
+            step()
+    return reset
+
+def measure_tier(messages: list, expected: str, iterations: int, warmup: int, alloc_iterations: int, reset) -> dict:
+    for i in range(warmup):
+        if reset:
+            reset()
+        chatbot.get_response_details(messages[i % len(messages)])
+
+    timings, misrouted = [], Counter()
+    for i in range(iterations):
+        message = messages[i % len(messages)]
+        if reset:
+            reset()
+        start = time.perf_counter()
+        intent = chatbot.get_response_details(message).intent
+        timings.append(time.perf_counter() - start)
+        if intent != expected:
+            misrouted[f"{message!r} -> {intent}"] += 1
+
+    # Traced separately; tracemalloc slows every allocation down
+    peaks, retained = [], []
+    tracemalloc.start()
+    for i in range(alloc_iterations):
+        message = messages[i % len(messages)]
+        if reset:
+            reset()
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        chatbot.get_response_details(message)
+        current, peak = tracemalloc.get_traced_memory()
+        peaks.append(peak - before)
+        retained.append(current - before)
+    tracemalloc.stop()
+
+    timings.sort()
+    return {
+        "calls": iterations,
+        "mean_ms": sum(timings) / len(timings) * 1000,
+        "p50_ms": percentile(timings, 0.50) * 1000,
+        "p95_ms": percentile(timings, 0.95) * 1000,
+        "p99_ms": percentile(timings, 0.99) * 1000,
+        "alloc_peak_kib": sum(peaks) / max(1, len(peaks)) / 1024,
+        "alloc_retained_kib": sum(retained) / max(1, len(retained)) / 1024,
+        "misrouted": dict(misrouted),
+    }
+
+def compare(results: dict, baseline: dict, tolerance: float, min_delta_ms: float, min_delta_kib: float) -> list:
+    """Regressions of p95 latency or peak allocations beyond tolerance and the noise floor"""
+    regressions = []
+    for tier, current in results["tiers"].items():
+        old = baseline["tiers"].get(tier)
+        if old is None:
+            continue
+        for key, floor in (("p95_ms", min_delta_ms), ("alloc_peak_kib", min_delta_kib)):
+            if current[key] > old[key] * (1 + tolerance) and current[key] - old[key] > floor:
+                regressions.append(f"{tier}: {key} {old[key]:.3f} -> {current[key]:.3f} "
+                                   f"(+{(current[key] / old[key] - 1) * 100 if old[key] else float('inf'):.0f}%)")
+    return regressions
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+def report(results: dict, baseline: dict) -> None:
+    print(f"{'tier':<15} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'peak KiB':>9} {'kept KiB':>9}"
+          + ("   p95 vs baseline" if baseline else ""))
+    for tier, row in results["tiers"].items():
+        line = (f"{tier:<15} {row['p50_ms']:9.3f} {row['p95_ms']:9.3f} {row['p99_ms']:9.3f} "
+                f"{row['alloc_peak_kib']:9.1f} {row['alloc_retained_kib']:9.1f}")
+        old = baseline["tiers"].get(tier) if baseline else None
+        if old and old["p95_ms"]:
+            line += f"   {(row['p95_ms'] / old['p95_ms'] - 1) * 100:+6.1f}%"
+        print(line)
+        for case, count in row["misrouted"].items():
+            print(f"  misrouted x{count}: {case}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-tier get_response benchmark")
+    parser.add_argument("--iterations", type=int, default=200, help="timed calls per tier")
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--alloc-iterations", type=int, default=50, help="traced calls per tier")
+    parser.add_argument("--latency", type=float, default=0.05, help="fake completion latency in seconds")
+    parser.add_argument("--tiers", nargs="*", choices=sorted(CORPUS), help="default: all")
+    parser.add_argument("--cold", action="store_true", help="clear the code and math caches before every call")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative increase")
+    parser.add_argument("--min-delta-ms", type=float, default=0.1, help="ignore smaller p95 increases")
+    parser.add_argument("--min-delta-kib", type=float, default=4.0, help="ignore smaller allocation increases")
+    args = parser.parse_args()
+
+    server, url = spawn_server(args.latency)
+    os.environ["OPENAI_API_KEY"] = "bench"
+    os.environ["OPENAI_BASE_URL"] = url
+
+    import chatbot
+    import code_executor
+    import math_eval
+
+    try:
+        results = {
+            "meta": {
+                "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "revision": git_revision(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "iterations": args.iterations,
+                "alloc_iterations": args.alloc_iterations,
+                "latency": args.latency,
+                "cold": args.cold,
+            },
+            "tiers": {},
+        }
+        for tier in args.tiers or list(CORPUS):
+            results["tiers"][tier] = measure_tier(CORPUS[tier], EXPECTED_INTENT.get(tier, tier), args.iterations,
+                                                  args.warmup, args.alloc_iterations, reset_for(tier, args.cold))
+    finally:
+        code_executor.close_pool()
+        server.terminate()
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        for key in ("latency", "cold"):
+            if baseline["meta"].get(key) != results["meta"][key]:
+                print(f"warning: baseline {key}={baseline['meta'].get(key)} differs from this run ({results['meta'][key]})")
+    report(results, baseline)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"results written to {args.output}")
+    if baseline:
+        regressions = compare(results, baseline, args.tolerance, args.min_delta_ms, args.min_delta_kib)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+        print(f"no regressions against {args.baseline}")
@@ -0,0 +1,62 @@
+# benchmarks/bench_translation.py
+# Translator round-trips and time for a Spanish-speaking session: canned
+# answers come from the translation cache and detection stops once the
+# user's language is settled. A stand-in translator with fixed latency
+# replaces googletrans so the numbers do not depend on the network.
+
+import argparse
+import time
+from types import SimpleNamespace
+
+import nlp_utils
+from chatbot import get_response_details
+
+MESSAGES = ["hola", "¿qué es python?", "cuéntame un chiste", "gracias", "¿cómo estás?"]
+
+class SlowTranslator:
+    """googletrans-like translator that sleeps per request and counts them"""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.requests = 0
+
+    def _call(self):
+        self.requests += 1
+        time.sleep(self.latency)
+
+    def detect(self, text):
+        self._call()
+        return SimpleNamespace(lang="es")
+
+    def translate(self, text, dest="en"):
+        self._call()
+        if isinstance(text, list):
+            return [SimpleNamespace(text=f"[{dest}] {item}") for item in text]
+        return SimpleNamespace(text=f"[{dest}] {text}")
+
+def session(rounds: int, user_id: str) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for message in MESSAGES:
+            get_response_details(message, user_id)
+    return time.perf_counter() - start
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Translation cache and sticky language benchmark")
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds per translator request")
+    args = parser.parse_args()
+
+    translator = nlp_utils.translator = SlowTranslator(args.latency)
+    nlp_utils.LANG_BACKEND = "googletrans"
+    requests = args.rounds * len(MESSAGES)
+    for label, clear in (("cold caches", True), ("warm caches", False)):
+        if clear:
+            nlp_utils.TRANSLATION_CACHE.clear()
+        translator.requests = 0
+        elapsed = session(args.rounds, "bench-user")
+        print(f"{label:<12} {requests} messages: {translator.requests} translator requests, "
+              f"{elapsed / requests * 1000:7.2f} ms/message")
+    # Without the caches every message costs a detection plus a translation
+    print(f"{'uncached':<12} {requests} messages: {2 * requests} translator requests, "
+          f"~{2 * args.latency * 1000:7.2f} ms/message")
@@ -0,0 +1,141 @@
+# benchmarks/fake_openai.py
+# Local OpenAI-compatible completion server with configurable latency.
+#
+#   python -m benchmarks.fake_openai --port 8100 --latency 0.3
+#   OPENAI_API_KEY=test OPENAI_BASE_URL=http://127.0.0.1:8100/v1 python main.py
+
+import argparse
+import json
+import socket
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_REPLY = "This is a canned answer from the local fake completion server."
+
+class FakeOpenAIServer(ThreadingHTTPServer):
+    """Threaded HTTP server answering /v1/chat/completions after a fixed delay"""
+
+    daemon_threads = True
+
+    def __init__(self, address, latency: float = 0.2, reply: str = DEFAULT_REPLY, token_delay: float = 0.01):
+        super().__init__(address, _Handler)
+        self.latency = latency
+        # Non-zero: answer completions with this HTTP error status instead
+        self.error_status = 0
+        self.token_delay = token_delay
+        self.reply = reply
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def count_request(self) -> None:
+        with self._lock:
+            self.requests += 1
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; without this the client's
+    # delayed ACK adds ~40 ms to every reply on a kept-alive connection
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length) or b"{}")
+        if not self.path.endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": "not found"}})
+            return
+        self.server.count_request()
+        time.sleep(self.server.latency)
+        if self.server.error_status:
+            self._send_json(self.server.error_status, {"error": {"message": "fake upstream failure"}})
+            return
+        if body.get("stream"):
+            self._send_stream(body)
+            return
+        self._send_json(200, {
+            "id": "chatcmpl-fake",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "fake"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": self.server.reply},
+                "finish_reason": "stop",
+            }],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+        })
+
+    def _send_stream(self, body: dict) -> None:
+        """Send the reply word by word as chat.completion.chunk events"""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        words = self.server.reply.split(" ")
+        for i, word in enumerate(words):
+            token = word if i == 0 else " " + word
+            self._write_chunk(self._stream_event(body, {"content": token}, None))
+            time.sleep(self.server.token_delay)
+        self._write_chunk(self._stream_event(body, {}, "stop"))
+        self._write_chunk(b"data: [DONE]\n\n")
+        self._write_chunk(b"")
+
+    def _stream_event(self, body: dict, delta: dict, finish_reason) -> bytes:
+        chunk = {
+            "id": "chatcmpl-fake",
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": body.get("model", "fake"),
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+        }
+        return f"data: {json.dumps(chunk)}\n\n".encode()
+
+    def _write_chunk(self, data: bytes) -> None:
+        self.wfile.write(f"{len(data):X}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def _send_json(self, status: int, payload: dict) -> None:
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+def start_server(port: int = 0, latency: float = 0.2, reply: str = DEFAULT_REPLY,
+                 token_delay: float = 0.01) -> FakeOpenAIServer:
+    """Start a fake server in a background thread; port 0 picks a free port"""
+    server = FakeOpenAIServer(("127.0.0.1", port), latency=latency, reply=reply, token_delay=token_delay)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def spawn_server(latency: float = 0.2):
+    """Start a fake server in a child process, so it does not share the caller's GIL; returns (process, url)"""
+    process = subprocess.Popen(
+        [sys.executable, "-u", "-m", "benchmarks.fake_openai", "--port", "0", "--latency", str(latency)],
+        stdout=subprocess.PIPE, text=True,
+    )
+    url = process.stdout.readline().split()[4]  # "Fake OpenAI server on <url> ..."
+    host, port = url.split("//")[1].split("/")[0].split(":")
+    socket.create_connection((host, int(port)), timeout=5).close()
+    return process, url
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local OpenAI-compatible completion server")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds before each reply")
+    parser.add_argument("--token-delay", type=float, default=0.01, help="seconds between streamed tokens")
+    args = parser.parse_args()
+    server = FakeOpenAIServer(("127.0.0.1", args.port), latency=args.latency, token_delay=args.token_delay)
+    print(f"Fake OpenAI server on {server.url} (latency {args.latency}s)")
+    server.serve_forever()
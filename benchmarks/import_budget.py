@@ -0,0 +1,149 @@
+# benchmarks/import_budget.py
+# Import cost of the app entry points, read from `python -X importtime`:
+# time and number of modules loaded by importing each target in a fresh
+# interpreter, plus modules a target must leave to the tier that uses them.
+# Exits 1 when a target goes over its budget, so a heavy dependency moved
+# back to module level fails the check.
+#
+#   python -m benchmarks.import_budget
+#   python -m benchmarks.import_budget --budget chatbot=150,120
+#   python -m benchmarks.import_budget --output benchmarks/results/import_time.json --label after
+
+import argparse
+import json
+import os
+import platform
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+from benchmarks.bench_tiers import git_revision
+
+# target: (milliseconds, modules); time is the median cumulative import time
+BUDGETS = {
+    "chatbot": (150.0, 180),
+    "api.index": (700.0, 450),
+}
+
+# Modules a target must not load on import; their tiers import them on first use
+LAZY = {
+    "chatbot": ("openai", "numpy", "code_executor", "voice_io"),
+    "api.index": ("chatbot", "openai", "numpy", "code_executor"),
+}
+
+LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)")
+
+def parse_importtime(stderr: str) -> list:
+    """(module, self us, cumulative us, depth) per line of -X importtime output"""
+    modules = []
+    for line in stderr.splitlines():
+        match = LINE.match(line)
+        if match:
+            own, cumulative, indent, name = match.groups()
+            modules.append((name, int(own), int(cumulative), len(indent) // 2))
+    return modules
+
+def subtree(modules: list, target: str) -> list:
+    """Lines for the modules loaded by importing target, ending with target itself.
+
+    Children are reported before their parent, so they are the lines after
+    the previous top-level import.
+    """
+    end = next(i for i, (name, _, _, depth) in enumerate(modules) if name == target and depth == 0)
+    start = end
+    while start > 0 and modules[start - 1][3] > 0:
+        start -= 1
+    return modules[start:end + 1]
+
+def import_once(target: str) -> list:
+    env = {**os.environ, "PYTHONDONTWRITEBYTECODE": "1"}
+    env.pop("PYTHONPROFILEIMPORTTIME", None)
+    stderr = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {target}"], check=True,
+                            capture_output=True, text=True, env=env).stderr
+    return subtree(parse_importtime(stderr), target)
+
+def measure(target: str, runs: int) -> dict:
+    times, modules = [], []
+    for _ in range(runs):
+        modules = import_once(target)
+        times.append(modules[-1][2])
+    loaded = {name for name, _, _, _ in modules}
+    children = [(name, cumulative) for name, _, cumulative, depth in modules if depth == 1]
+    return {
+        "ms": statistics.median(times) / 1000,
+        "modules": len(modules),
+        "heaviest": {name: round(cumulative / 1000, 1)
+                     for name, cumulative in sorted(children, key=lambda child: -child[1])[:5]},
+        "eager": sorted(name for name in LAZY.get(target, ()) if name in loaded),
+    }
+
+def over_budget(target: str, row: dict, budget: tuple) -> list:
+    max_ms, max_modules = budget
+    problems = []
+    if row["ms"] > max_ms:
+        problems.append(f"{target}: import took {row['ms']:.1f} ms, budget {max_ms:.0f} ms")
+    if row["modules"] > max_modules:
+        problems.append(f"{target}: imported {row['modules']} modules, budget {max_modules}")
+    for name in row["eager"]:
+        problems.append(f"{target}: imports {name} at module level")
+    return problems
+
+def parse_budget(text: str) -> tuple:
+    """'chatbot=150,120' -> ('chatbot', (150.0, 120))"""
+    target, _, values = text.partition("=")
+    max_ms, _, max_modules = values.partition(",")
+    default_ms, default_modules = BUDGETS.get(target, (float("inf"), sys.maxsize))
+    return target, (float(max_ms) if max_ms else default_ms, int(max_modules) if max_modules else default_modules)
+
+def record(path: str, label: str, results: dict) -> None:
+    """Store results under label, keeping the other labels already in the file"""
+    recorded = {}
+    if os.path.exists(path):
+        with open(path) as f:
+            recorded = json.load(f)
+    recorded[label] = results
+    with open(path, "w") as f:
+        json.dump(recorded, f, indent=2)
+        f.write("\n")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import time and module count budget check")
+    parser.add_argument("--targets", nargs="*", help=f"modules to import (default: {' '.join(BUDGETS)})")
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters per target; the median time is used")
+    parser.add_argument("--budget", action="append", default=[], metavar="TARGET=MS,MODULES",
+                        help="override a budget; either value may be left empty")
+    parser.add_argument("--output", help="JSON file to record the results in")
+    parser.add_argument("--label", default="latest", help="key for the results in --output")
+    args = parser.parse_args()
+
+    budgets = dict(BUDGETS)
+    budgets.update(parse_budget(text) for text in args.budget)
+    results = {
+        "meta": {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "runs": args.runs,
+        },
+        "targets": {},
+    }
+    problems = []
+    print(f"{'target':<12} {'ms':>8} {'budget':>8} {'modules':>8} {'budget':>8}   heaviest imports (ms)")
+    for target in args.targets or list(BUDGETS):
+        row = results["targets"][target] = measure(target, args.runs)
+        budget = budgets.get(target, (float("inf"), sys.maxsize))
+        heaviest = ", ".join(f"{name} {ms:.0f}" for name, ms in row["heaviest"].items())
+        print(f"{target:<12} {row['ms']:8.1f} {budget[0]:8.0f} {row['modules']:8d} {budget[1]:8d}   {heaviest}")
+        problems.extend(over_budget(target, row, budget))
+
+    if args.output:
+        record(args.output, args.label, results)
+        print(f"results recorded as {args.label!r} in {args.output}")
+    for problem in problems:
+        print(f"OVER BUDGET {problem}")
+    if problems:
+        sys.exit(1)
+    print("all imports within budget")
@@ -0,0 +1,484 @@
+# benchmarks/loadgen.py
+# Load generator for /chat: a weighted mix of message types sent at a fixed
+# rate (open loop) or by a fixed number of users (closed loop), with LLM
+# fallbacks answered by the local fake OpenAI server. Reports throughput,
+# latency percentiles, error rate and the server's event loop lag, and can
+# save the results as JSON and compare them with an earlier run.
+#
+#   python -m benchmarks.loadgen --rate 50 --duration 20         # main.app in this process
+#   python -m benchmarks.loadgen --spawn --concurrency 64       # one uvicorn worker running main.py
+#   python -m benchmarks.loadgen --url http://127.0.0.1:8000    # an already running server
+#
+# With --url the server must use the fake server itself, e.g.
+#   python -m benchmarks.fake_openai --port 8100 --latency 0.3
+#   OPENAI_API_KEY=test OPENAI_BASE_URL=http://127.0.0.1:8100/v1 uvicorn main:app
+#
+# Latency in --rate mode is measured from when a request was due, so a
+# server that falls behind is not hidden by the generator waiting for it.
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from benchmarks.fake_openai import spawn_server
+from benchmarks.tier_corpus import CORPUS
+
+DEFAULT_MIX = "kb=40,joke=10,code=10,math=20,llm=20"
+
+# Message types a mix can name; "llm" prompts are generated so they miss the answer caches
+CATEGORIES = {
+    "kb": CORPUS["knowledge_base"] + CORPUS["qa"],
+    "joke": CORPUS["joke"],
+    "code": CORPUS["code_run"],
+    "math": CORPUS["math"],
+    **CORPUS,
+}
+
+TOPICS = """black holes|neutron stars|plate tectonics|photosynthesis|the roman empire|the silk road|quantum computing|
+compound interest|the water cycle|volcanoes|coral reefs|the immune system|supply chains|jazz music|the printing press|
+renewable energy|ocean currents|bird migration|the stock market|ancient egypt|climate models|rainforests|glaciers|
+the french revolution|electric cars|honey bees|the human heart|desert ecosystems|cloud formation|chess openings|
+solar flares|the periodic table|coffee farming|earthquakes|the internet backbone|vaccines|tides|the olympic games|
+satellites|sourdough bread|medieval castles|ant colonies|wind turbines|the moon landing|river deltas|origami|
+lighthouses|the human brain|paper money|submarines""".replace("\n", "").split("|")
+ASPECTS = ["origins", "basic science", "biggest open questions", "common myths", "economic impact", "future",
+           "main risks", "key terms", "surprising facts", "practical uses"]
+STYLES = ["in simple terms", "for a ten year old", "in three bullet points", "for an engineer", "in one paragraph",
+          "with an analogy", "for a college student", "as a short story", "with examples", "step by step"]
+
+def parse_mix(text: str) -> List[Tuple[str, float]]:
+    mix = []
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if name != "llm" and name not in CATEGORIES:
+            raise SystemExit(f"unknown message type {name!r}; choose from llm, {', '.join(CATEGORIES)}")
+        mix.append((name, float(weight or 1)))
+    return mix
+
+class MessageSource:
+    """Draws (category, message) pairs according to the mix"""
+
+    def __init__(self, mix: List[Tuple[str, float]], seed: int = 1):
+        self.names = [name for name, _ in mix]
+        self.weights = [weight for _, weight in mix]
+        self.rng = random.Random(seed)
+        self.prompts = [f"describe the {aspect} of {topic} {style}"
+                        for topic in TOPICS for aspect in ASPECTS for style in STYLES]
+        self.rng.shuffle(self.prompts)
+        self.sent_prompts = 0
+
+    def next(self) -> Tuple[str, str]:
+        name = self.rng.choices(self.names, self.weights)[0]
+        if name == "llm":
+            message = self.prompts[self.sent_prompts % len(self.prompts)]
+            self.sent_prompts += 1
+            return name, message
+        return name, self.rng.choice(CATEGORIES[name])
+
+class HTTPConnection:
+    """Minimal keep-alive HTTP/1.1 client; enough for JSON and text responses with Content-Length"""
+
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+
+    async def request(self, method: str, path: str, body: bytes = b"") -> Tuple[int, bytes]:
+        if self._writer is None:
+            self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+        try:
+            self._writer.write(
+                f"{method} {path} HTTP/1.1\r\nHost: {self.host}:{self.port}\r\n"
+                f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body)
+            await self._writer.drain()
+            status_line = await self._reader.readline()
+            if not status_line:
+                raise ConnectionError("connection closed by server")
+            headers = {}
+            while True:
+                line = await self._reader.readline()
+                if line in (b"\r\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+            if "content-length" not in headers:
+                raise ConnectionError("response without Content-Length")
+            payload = await self._reader.readexactly(int(headers["content-length"]))
+            if headers.get("connection", "").lower() == "close":
+                await self.close()
+            return int(status_line.split()[1]), payload
+        except BaseException:
+            await self.close()
+            raise
+
+    async def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+class HTTPTransport:
+    """Requests over TCP to a running server, one keep-alive connection per caller"""
+
+    def __init__(self, url: str):
+        parts = urlsplit(url)
+        self.host = parts.hostname or "127.0.0.1"
+        self.port = parts.port or 80
+        self._idle: List[HTTPConnection] = []
+
+    async def request(self, method: str, path: str, body: bytes = b"") -> Tuple[int, bytes]:
+        connection = self._idle.pop() if self._idle else HTTPConnection(self.host, self.port)
+        result = await connection.request(method, path, body)
+        self._idle.append(connection)
+        return result
+
+    async def close(self) -> None:
+        for connection in self._idle:
+            await connection.close()
+
+class ASGITransport:
+    """Requests handed straight to an ASGI app in this event loop, without sockets"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def request(self, method: str, path: str, body: bytes = b"") -> Tuple[int, bytes]:
+        status, _, payload = await self.exchange(method, path, body)
+        return status, payload
+
+    async def exchange(self, method: str, path: str, body: bytes = b"",
+                       headers: Tuple[Tuple[str, str], ...] = ()) -> Tuple[int, List[Tuple[bytes, bytes]], bytes]:
+        """Like request, with extra request headers; also returns the response headers"""
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+            "method": method, "scheme": "http", "path": path, "raw_path": path.encode(),
+            "query_string": b"", "root_path": "",
+            "headers": [(b"host", b"loadgen"), (b"content-type", b"application/json"),
+                        (b"content-length", str(len(body)).encode())]
+                       + [(name.lower().encode(), value.encode()) for name, value in headers],
+            "client": ("127.0.0.1", 0), "server": ("loadgen", 80),
+        }
+        done = asyncio.Event()
+        request_sent = False
+        status = 500
+        response_headers = []
+        chunks = []
+
+        async def receive() -> dict:
+            nonlocal request_sent
+            if not request_sent:
+                request_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            await done.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message: dict) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                response_headers.extend(message.get("headers", []))
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+                if not message.get("more_body"):
+                    done.set()
+
+        await self.app(scope, receive, send)
+        done.set()
+        return status, response_headers, b"".join(chunks)
+
+    async def close(self) -> None:
+        pass
+
+class Recorder:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.error_kinds: Dict[str, int] = defaultdict(int)
+        self.recording = False
+
+    def add(self, category: str, latency: float, error: Optional[str]) -> None:
+        if not self.recording:
+            return
+        self.latencies[category].append(latency)
+        if error:
+            self.errors[category] += 1
+            self.error_kinds[error] += 1
+
+async def send_chat(transport, recorder: Recorder, category: str, message: str, user_id: str,
+                    due: float, timeout: float) -> None:
+    body = json.dumps({"message": message, "user_id": user_id}).encode()
+    error = None
+    try:
+        status, payload = await asyncio.wait_for(transport.request("POST", "/chat", body), timeout)
+        if status != 200:
+            error = f"HTTP {status}"
+        elif json.loads(payload).get("response", "").startswith("Sorry, I encountered an error"):
+            error = "error reply"
+    except asyncio.TimeoutError:
+        error = "timeout"
+    except (OSError, ConnectionError, asyncio.IncompleteReadError, ValueError) as e:
+        error = type(e).__name__
+    recorder.add(category, time.perf_counter() - due, error)
+
+async def closed_loop(transport, recorder: Recorder, source: MessageSource, concurrency: int,
+                      users: int, until: float, timeout: float) -> None:
+    async def user(index: int) -> None:
+        while time.perf_counter() < until:
+            category, message = source.next()
+            await send_chat(transport, recorder, category, message, f"load-{index % users}",
+                            time.perf_counter(), timeout)
+
+    await asyncio.gather(*(user(i) for i in range(concurrency)))
+
+async def open_loop(transport, recorder: Recorder, source: MessageSource, rate: float, users: int,
+                    until: float, timeout: float, max_in_flight: int) -> int:
+    """Poisson arrivals at rate per second; returns how many were dropped at max_in_flight"""
+    rng = random.Random(2)
+    in_flight = set()
+    dropped = 0
+    due = time.perf_counter()
+    while due < until:
+        due += rng.expovariate(rate)
+        delay = due - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if len(in_flight) >= max_in_flight:
+            if recorder.recording:
+                dropped += 1
+            continue
+        category, message = source.next()
+        task = asyncio.create_task(send_chat(transport, recorder, category, message,
+                                             f"load-{rng.randrange(users)}", due, timeout))
+        in_flight.add(task)
+        task.add_done_callback(in_flight.discard)
+    if in_flight:
+        await asyncio.wait(in_flight)
+    return dropped
+
+async def scrape_loop_lag(transport) -> Optional[Dict[str, float]]:
+    """Cumulative buckets, sum and count of the server's event loop lag histogram"""
+    try:
+        status, payload = await transport.request("GET", "/metrics")
+    except (OSError, ConnectionError, asyncio.IncompleteReadError):
+        return None
+    if status != 200:
+        return None
+    values = {}
+    for line in payload.decode().splitlines():
+        if line.startswith("manna_event_loop_lag_seconds"):
+            name, _, value = line.rpartition(" ")
+            values[name] = float(value)
+    return values or None
+
+def lag_summary(before: Optional[dict], after: Optional[dict]) -> Optional[dict]:
+    """Event loop lag during the run, from the difference of two scrapes"""
+    if after is None:
+        return None
+    before = before or {}
+    delta = {name: value - before.get(name, 0.0) for name, value in after.items()}
+    count = delta.get("manna_event_loop_lag_seconds_count", 0)
+    if not count:
+        return None
+    buckets = sorted(
+        (float("inf") if bound == "+Inf" else float(bound), value)
+        for name, value in delta.items() if "_bucket{" in name
+        for bound in [name.split('le="')[1].rstrip('"}')]
+    )
+
+    def quantile(q: float) -> float:
+        # Linear interpolation inside the bucket, as Prometheus' histogram_quantile does
+        rank, lower, seen = q * count, 0.0, 0.0
+        for bound, cumulative in buckets:
+            if cumulative >= rank:
+                if bound == float("inf"):
+                    return lower
+                return lower + (bound - lower) * (rank - seen) / max(cumulative - seen, 1)
+            lower, seen = bound, cumulative
+        return lower
+
+    return {
+        "samples": int(count),
+        "mean_ms": delta["manna_event_loop_lag_seconds_sum"] / count * 1000,
+        "p50_ms": quantile(0.50) * 1000,
+        "p99_ms": quantile(0.99) * 1000,
+    }
+
+def percentile(samples: list, fraction: float) -> float:
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))] if samples else 0.0
+
+def latency_summary(latencies: List[float], errors: int, seconds: float) -> dict:
+    latencies = sorted(latencies)
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "error_rate": errors / len(latencies) if latencies else 0.0,
+        "throughput_rps": len(latencies) / seconds,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p90_ms": percentile(latencies, 0.90) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "max_ms": latencies[-1] * 1000 if latencies else 0.0,
+    }
+
+async def run(args, transport) -> dict:
+    source = MessageSource(parse_mix(args.mix), args.seed)
+    recorder = Recorder()
+    lag_before = None
+    start = time.perf_counter()
+    measure_from = start + args.warmup
+    until = measure_from + args.duration
+
+    async def start_recording() -> None:
+        nonlocal lag_before
+        await asyncio.sleep(max(0.0, measure_from - time.perf_counter()))
+        lag_before = await scrape_loop_lag(transport)
+        recorder.recording = True
+
+    starter = asyncio.create_task(start_recording())
+    dropped = 0
+    if args.rate:
+        dropped = await open_loop(transport, recorder, source, args.rate, args.users, until,
+                                  args.timeout, args.max_in_flight)
+    else:
+        await closed_loop(transport, recorder, source, args.concurrency, args.users, until, args.timeout)
+    await starter
+    seconds = time.perf_counter() - measure_from
+    lag_after = await scrape_loop_lag(transport)
+
+    all_latencies = [latency for values in recorder.latencies.values() for latency in values]
+    return {
+        "meta": {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "target": args.url or ("spawned uvicorn worker" if args.spawn else "main.app in process"),
+            "mode": f"rate {args.rate}/s" if args.rate else f"concurrency {args.concurrency}",
+            "mix": args.mix,
+            "duration": args.duration,
+            "latency": args.latency,
+        },
+        "summary": {**latency_summary(all_latencies, sum(recorder.errors.values()), seconds), "dropped": dropped},
+        "categories": {name: latency_summary(values, recorder.errors[name], seconds)
+                       for name, values in sorted(recorder.latencies.items())},
+        "error_kinds": dict(recorder.error_kinds),
+        "event_loop_lag": lag_summary(lag_before, lag_after),
+    }
+
+def report(results: dict, baseline: Optional[dict]) -> None:
+    def line(label: str, row: dict, old: Optional[dict]) -> str:
+        text = (f"{label:<10} {row['requests']:7} {row['throughput_rps']:8.1f} {row['p50_ms']:9.1f} "
+                f"{row['p99_ms']:9.1f} {row['error_rate'] * 100:6.2f}%")
+        if old:
+            text += (f"   {(row['throughput_rps'] / max(old['throughput_rps'], 1e-9) - 1) * 100:+6.1f}% req/s, "
+                     f"{(row['p99_ms'] / max(old['p99_ms'], 1e-9) - 1) * 100:+6.1f}% p99")
+        return text
+
+    meta = results["meta"]
+    print(f"{meta['target']}, {meta['mode']}, {meta['duration']}s, mix {meta['mix']}")
+    print(f"{'type':<10} {'requests':>7} {'req/s':>8} {'p50 ms':>9} {'p99 ms':>9} {'errors':>7}"
+          + ("   vs baseline" if baseline else ""))
+    for name, row in results["categories"].items():
+        print(line(name, row, baseline["categories"].get(name) if baseline else None))
+    print(line("all", results["summary"], baseline["summary"] if baseline else None))
+    if results["summary"]["dropped"]:
+        print(f"dropped {results['summary']['dropped']} arrivals at --max-in-flight")
+    for kind, count in results["error_kinds"].items():
+        print(f"  {count} x {kind}")
+    lag = results["event_loop_lag"]
+    if lag:
+        print(f"event loop lag: mean {lag['mean_ms']:.2f} ms, p50 {lag['p50_ms']:.2f} ms, "
+              f"p99 {lag['p99_ms']:.2f} ms ({lag['samples']} samples)")
+    else:
+        print("event loop lag: not reported by the server")
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def spawn_worker(fake_url: str) -> Tuple[subprocess.Popen, str]:
+    """Run main.py's app in one uvicorn worker pointed at the fake server"""
+    port = free_port()
+    env = {**os.environ, "OPENAI_API_KEY": "load", "OPENAI_BASE_URL": fake_url}
+    process = subprocess.Popen([sys.executable, "-m", "uvicorn", "main:app", "--port", str(port),
+                                "--log-level", "warning"], env=env)
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit("uvicorn exited; is it installed?")
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return process, f"http://127.0.0.1:{port}"
+        except OSError:
+            time.sleep(0.1)
+    process.terminate()
+    raise SystemExit("uvicorn did not start within 60 s")
+
+async def run_in_process(args) -> dict:
+    import main
+    async with main.app.router.lifespan_context(main.app):
+        return await run(args, ASGITransport(main.app))
+
+async def run_over_http(args, url: str) -> dict:
+    transport = HTTPTransport(url)
+    try:
+        return await run(args, transport)
+    finally:
+        await transport.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load generator for the /chat API")
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--url", help="base URL of a running server (default: main.app in this process)")
+    target.add_argument("--spawn", action="store_true", help="start one uvicorn worker running main.py")
+    load = parser.add_mutually_exclusive_group()
+    load.add_argument("--rate", type=float, help="requests per second, Poisson arrivals (open loop)")
+    load.add_argument("--concurrency", type=int, default=16, help="users sending back to back (closed loop)")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"weighted message types (default {DEFAULT_MIX})")
+    parser.add_argument("--duration", type=float, default=15, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=3, help="seconds of load before measuring")
+    parser.add_argument("--users", type=int, default=100, help="distinct user ids")
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--max-in-flight", type=int, default=1000, help="--rate arrivals beyond this are dropped")
+    parser.add_argument("--latency", type=float, default=0.3, help="fake completion latency in seconds")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to compare against")
+    args = parser.parse_args()
+
+    processes = []
+    try:
+        if args.url:
+            results = asyncio.run(run_over_http(args, args.url))
+        else:
+            fake, fake_url = spawn_server(args.latency)
+            processes.append(fake)
+            if args.spawn:
+                worker, url = spawn_worker(fake_url)
+                processes.append(worker)
+                results = asyncio.run(run_over_http(args, url))
+            else:
+                os.environ["OPENAI_API_KEY"] = "load"
+                os.environ["OPENAI_BASE_URL"] = fake_url
+                results = asyncio.run(run_in_process(args))
+    finally:
+        for process in reversed(processes):
+            process.terminate()
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    report(results, baseline)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"results written to {args.output}")
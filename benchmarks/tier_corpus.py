@@ -0,0 +1,92 @@
+# benchmarks/tier_corpus.py
+# Representative messages for each branch of chatbot.get_response, keyed by
+# the intent get_response_details reports for them. "openai_cached" asks
+# the fallback questions again, so they are answered from the cache.
+
+CORPUS = {
+    "creator": [
+        "who created you",
+        "who built manna ai",
+        "who is your developer",
+        "who made this bot",
+        "who is the author",
+    ],
+    "knowledge_base": [
+        "hello",
+        "hi there",
+        "how are you",
+        "what can you do",
+        "what are your capabilities",
+        "good morning",
+        "thanks",
+        "bye",
+    ],
+    "qa": [
+        "what is python",
+        "what is javascript",
+        "what is ai",
+        "what is python programming",
+        "what's your name?",
+        "what is manna ai exactly",
+    ],
+    "joke": [
+        "tell me a joke",
+        "make me laugh with a joke",
+        "another joke please",
+    ],
+    "code_run": [
+        "run print(2+2)",
+        "run print(sum(range(10)))",
+        "execute sum([1, 2, 3])",
+    ],
+    "code_debug": [
+        "debug print(1/0)",
+        "debug x = [1, 2",
+        "debug def f(: pass",
+        "debug for i in range(3) print(i)",
+    ],
+    "what_is": [
+        "what is manna",
+        "explain manna",
+        "what's manna ai",
+        "explain manna to me",
+    ],
+    "time": [
+        "what time is it",
+        "what is the time now",
+        "current time please",
+    ],
+    "date": [
+        "what date is it today",
+        "what day is it",
+        "what's the date",
+        "tell me the date",
+    ],
+    "math": [
+        "12 * 7",
+        "2+2",
+        "(15 + 5) / 4",
+        "100 / 8",
+        "3.5 * 2 + 1",
+        "(2 + 3) * (4 - 1)",
+    ],
+    "contextual": [
+        "i have a terrible issue",
+        "my trouble is so sad",
+        "awful trouble with my laptop",
+        "the weather is wonderful",
+        "you are awesome",
+        "i had a great weekend",
+    ],
+    "openai": [
+        "describe black holes",
+        "summarize the french revolution",
+        "recommend three science fiction novels",
+        "outline the causes of inflation",
+        "what is a variable",
+    ],
+}
+CORPUS["openai_cached"] = CORPUS["openai"]
+
+# Intent reported for a tier when it differs from the tier name
+EXPECTED_INTENT = {"openai_cached": "openai"}
@@ -1,258 +1,714 @@
+import asyncio
 import os
 import random
-import openai
 import re
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Dict, Optional, Set, Tuple, Union
 
-from nlp_utils import clean_text, detect_language, translate_text
-from sentiment import analyze_sentiment, get_mood, get_mood_emoji, get_mood_message
+import llm_client
+import math_eval
+import metrics
+import sentiment
+from nlp_utils import clean_text, detect_user_language, detect_language_blocks, translate_text, translate_batch
+from nlp_utils import TRANSLATION_CACHE, LANGUAGE_MEMORY, ANONYMOUS_USER
+from sentiment import analyze_sentiment, mood_from_polarity, get_mood_emoji, get_mood_message
 from joke_manager import get_joke
-from code_executor import run_code, debug_code
-from voice_io import text_to_speech, speech_to_text  # Optional for voice support
 from knowledge_base import get_custom_response, find_response_category, get_qa_response, get_contextual_response
+from knowledge_base import CATEGORY_KEYWORDS, CONTEXTUAL_KEYWORDS
+from intents import IntentMatcher
+from response_cache import ResponseCache, make_cache_key
+from semantic_cache import create_semantic_cache
+from sessions import SESSION_STORE, CONTEXT_TOKENS
+from singleflight import SingleFlight
+from streaming import PrefixChunk
 
 # Set OpenAI API key from environment variable
 # IMPORTANT: Set OPENAI_API_KEY environment variable or add it in deployment platform
+# openai, NumPy and code_executor are imported by the tiers that use them,
+# so answering from the knowledge base never loads them
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-openai.api_key = OPENAI_API_KEY
 
-def get_response(user_input: str, user_id: str = "guest") -> str:
-    """
-    Main chatbot response function, routes queries to relevant modules
-    """
+# Cache for OpenAI fallback answers; set MANNA_RESPONSE_CACHE_DB to persist it
+RESPONSE_CACHE = ResponseCache(
+    maxsize=int(os.getenv("MANNA_RESPONSE_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("MANNA_RESPONSE_CACHE_TTL", "3600")),
+    db_path=os.getenv("MANNA_RESPONSE_CACHE_DB") or None,
+)
+
+# Near-duplicate cache consulted after an exact miss, built by the first
+# OpenAI fallback; stays None when disabled or without NumPy
+SEMANTIC_CACHE = None
+_semantic_cache_pending = os.getenv("MANNA_SEMANTIC_CACHE", "1") != "0"
+_semantic_cache_lock = threading.Lock()
+
+def get_semantic_cache():
+    """Return SEMANTIC_CACHE, creating it on first use"""
+    global SEMANTIC_CACHE, _semantic_cache_pending
+    if _semantic_cache_pending:
+        with _semantic_cache_lock:
+            if _semantic_cache_pending:
+                SEMANTIC_CACHE = create_semantic_cache(
+                    maxsize=int(os.getenv("MANNA_SEMANTIC_CACHE_SIZE", "20000")),
+                    threshold=float(os.getenv("MANNA_SEMANTIC_CACHE_THRESHOLD", "0.85")),
+                    ttl=float(os.getenv("MANNA_RESPONSE_CACHE_TTL", "3600")),
+                )
+                _semantic_cache_pending = False
+    return SEMANTIC_CACHE
+
+# Identical OpenAI fallback requests in flight at the same time share one completion
+COMPLETION_FLIGHTS = SingleFlight()
+
+# Keyword tables for routing; every table is compiled into one matcher below
+CREATOR_WORDS = ["creator", "created", "who made", "who built", "about", "developer", "author", "tammanna", "mairaj"]
+CODE_PHRASES = ["give me", "show me", "write", "create", "generate", "example", "sample", "how to"]
+CODE_WORDS = ["code", "program", "script", "function", "algorithm", "snippet"]
+CODE_VERBS = ["give me", "show me", "write", "create", "how to"]
+PROGRAMMING_TASKS = ["print", "printing", "string", "variable", "list", "dictionary", "loop", "if", "class", "import"]
+MATH_CODE_WORDS = ["sum", "summation", "add", "addition", "calculate", "calculation", "multiply", "divide"]
+CODE_CONNECTORS = ["for", "to", "of", "in"]
+EXPLICIT_CODE_WORDS = ["python code", "java code", "javascript code", "code example"]
+TIME_WORDS = ["time", "date", "day", "what day", "what time"]
+QUESTION_PHRASES = ["tell me", "describe", "define"]
+COMPLIMENT_WORDS = ["good", "great", "awesome", "amazing", "wonderful", "excellent", "love", "like"]
+COMPLAINT_WORDS = ["bad", "terrible", "hate", "dislike", "wrong", "error", "bug", "problem"]
+NO_MOOD_PREFIX_WORDS = ["joke", "creator", "code", "run", "execute", "debug"]
+
+INTENT_KEYWORDS = {
+    "creator": CREATOR_WORDS,
+    "code_phrase": CODE_PHRASES,
+    "code_word": CODE_WORDS,
+    "code_verb": CODE_VERBS,
+    "code_task": PROGRAMMING_TASKS + MATH_CODE_WORDS,
+    "code": ["code"],
+    "code_connector": CODE_CONNECTORS,
+    "code_explicit": EXPLICIT_CODE_WORDS,
+    "joke": ["joke", "funny"],
+    "run_code": ["run code", "execute code"],
+    "what_is": ["what is", "what's"],
+    "explain": ["explain"],
+    "manna": ["manna"],
+    "python": ["python"],
+    "javascript": ["javascript", "js"],
+    "ai": ["ai", "artificial intelligence"],
+    "time_date": TIME_WORDS,
+    "time": ["time"],
+    "date": ["date", "day"],
+    "question_phrase": QUESTION_PHRASES,
+    "ask_name": ["name", "who are you", "what's your name"],
+    "ask_where": ["where", "location"],
+    "ask_why": ["why", "reason"],
+    "compliment": COMPLIMENT_WORDS,
+    "complaint": COMPLAINT_WORDS,
+    "no_mood_prefix": NO_MOOD_PREFIX_WORDS,
+}
 
+# Built once at import: a single scan of the message yields every intent
+INTENT_MATCHER = IntentMatcher({**INTENT_KEYWORDS, **CATEGORY_KEYWORDS, **CONTEXTUAL_KEYWORDS})
+
+def detect_code_request(intents: Set[str]) -> bool:
+    """Decide whether matched intents describe a code generation request"""
+    return (
+        ("code_phrase" in intents and "code_word" in intents)
+        or ("code_verb" in intents and "code_task" in intents)
+        or ("code" in intents and "code_connector" in intents)
+        or "code_explicit" in intents
+    )
+
+@dataclass
+class MessageAnalysis:
+    """Per-request analysis context; every stage runs once and is reused"""
+    user_input: str
+    user_id: str
+    text: str
+    original_text: str
+    language: str
+    intents: Set[str]
+    sentiment: dict
+    mood: str
+    mood_emoji: str
+    is_code_request: bool
+    # Seconds spent in each stage of the request, reported to metrics.STAGE_SECONDS
+    timings: Dict[str, float] = field(default_factory=dict)
+
+@dataclass
+class ChatResult:
+    """Structured chatbot reply returned by get_response_details"""
+    response: str
+    mood: str
+    mood_emoji: str
+    language: str
+    intent: str
+
+# System message context for each detected mood
+MOOD_CONTEXT = {
+    "happy": "The user seems happy and positive. Respond enthusiastically and match their energy. You are Manna AI.",
+    "positive": "The user is in a positive mood. Be friendly and supportive. You are Manna AI.",
+    "neutral": "The user seems neutral. Be helpful and professional. You are Manna AI.",
+    "negative": "The user seems to be in a negative mood. Be empathetic, understanding, and offer support. Consider suggesting something uplifting. You are Manna AI.",
+    "sad": "The user appears sad or upset. Be very empathetic, gentle, and supportive. Offer comfort and maybe suggest a joke or positive activity. You are Manna AI."
+}
+
+CODE_SYSTEM_MESSAGE = """You are Manna AI, an intelligent chatbot.
+            The user is asking for code. Generate clean, well-commented Python code that solves their request.
+            Include:
+            - Clear, working code
+            - Helpful comments explaining the code
+            - Example usage if applicable
+            - Brief explanation if needed
+            Format code in markdown code blocks with python syntax highlighting.
+            Keep responses focused on the code request."""
+
+# Local intents whose answers are canned prose, safe to translate
+TRANSLATED_INTENTS = frozenset([
+    "creator", "knowledge_base", "qa", "joke", "what_is", "contextual",
+    "general_question", "compliment", "complaint", "no_api_key",
+])
+
+NO_API_KEY_MESSAGE = "I can tell jokes, execute code, answer questions, and help with various tasks! For advanced AI conversations, an API key is needed. But I can still help with many things - try asking for a joke, running code, or asking about my capabilities!"
+
+def _lap(timings: Dict[str, float], stage: str, started: float) -> float:
+    """Record the time since started as stage and return the current time"""
+    now = time.perf_counter()
+    timings[stage] = now - started
+    return now
+
+def _record(analysis: MessageAnalysis, intent: str, started: float) -> None:
+    """Report the stage timings and the total time of a request, labelled by tier"""
+    _lap(analysis.timings, "total", started)
+    metrics.STAGE_SECONDS.observe_many(intent, analysis.timings)
+
+def analyze_message(user_input: str, user_id: str = "guest") -> MessageAnalysis:
+    """Run language, intent and sentiment analysis once for a message"""
+    started = time.perf_counter()
+    timings = {}
     # Clean and prepare input text
     text = clean_text(user_input)
     original_text = user_input.lower().strip()
-    lang = detect_language(text)
+    lang = detect_user_language(user_id, user_input)  # before cleaning, which drops non-ASCII letters
+    started = _lap(timings, "language", started)
+    intents = INTENT_MATCHER.match(original_text)
+    started = _lap(timings, "intents", started)
+
+    # Analyze sentiment and detect mood once for the whole request
+    try:
+        sentiment = analyze_sentiment(user_input)
+        mood = mood_from_polarity(sentiment['polarity'])
+        mood_emoji = get_mood_emoji(mood)
+    except Exception:
+        sentiment = {'polarity': 0, 'subjectivity': 0}
+        mood = "neutral"
+        mood_emoji = "😐"
+    _lap(timings, "sentiment", started)
+
+    return MessageAnalysis(
+        user_input=user_input,
+        user_id=user_id,
+        text=text,
+        original_text=original_text,
+        language=lang,
+        intents=intents,
+        sentiment=sentiment,
+        mood=mood,
+        mood_emoji=mood_emoji,
+        is_code_request=detect_code_request(intents),
+        timings=timings,
+    )
+
+def _local_response(analysis: MessageAnalysis) -> Optional[Tuple[str, str]]:
+    """Answer from the local tiers, returning (intent, response) or None.
+
+    For the "code_run" intent the second item is the code to execute, so
+    callers decide how to run it (inline or off the event loop).
+    """
+    user_input = analysis.user_input
+    text = analysis.text
+    intents = analysis.intents
 
     # PRIORITY 1: Handle creator/about questions (custom response)
-    if any(word in original_text for word in ["creator", "created", "who made", "who built", "about", "developer", "author", "tammanna", "mairaj"]):
-        return "Manna AI was created by Tammanna and Mairaj. We're passionate developers who built this intelligent chatbot to help users with various tasks including AI conversations, code execution, jokes, mood detection, and more. Thank you for using Manna AI!"
+    if "creator" in intents:
+        return "creator", "Manna AI was created by Tammanna and Mairaj. We're passionate developers who built this intelligent chatbot to help users with various tasks including AI conversations, code execution, jokes, mood detection, and more. Thank you for using Manna AI!"
 
     # PRIORITY 2: Check knowledge base for custom responses (skip if code generation)
-    # Check for code generation first
-    code_phrases = ["give me", "show me", "write", "create", "generate", "example", "sample", "how to"]
-    code_words = ["code", "program", "script", "function", "algorithm", "snippet"]
-    programming_tasks = ["print", "printing", "string", "variable", "list", "dictionary", "loop", "if", "class", "import"]
-    math_code_words = ["sum", "summation", "add", "addition", "calculate", "calculation", "multiply", "divide"]
-    
-    is_code_generation = (
-        any(phrase in original_text for phrase in code_phrases) and 
-        any(word in original_text for word in code_words)
-    ) or (
-        any(phrase in original_text for phrase in ["give me", "show me", "write", "create", "how to"]) and
-        any(word in original_text for word in programming_tasks + math_code_words)
-    ) or (
-        "code" in original_text and any(word in original_text for word in ["for", "to", "of", "in"])
-    ) or (
-        any(word in original_text for word in ["python code", "java code", "javascript code", "code example"])
-    )
-    
     # Skip knowledge base and Q&A if it's a code generation request
-    if not is_code_generation:
-        category = find_response_category(user_input)
+    if not analysis.is_code_request:
+        category = find_response_category(user_input, intents)
         if category:
             custom_response = get_custom_response(category)
             if custom_response:
-                return custom_response
+                return "knowledge_base", custom_response
         
         # PRIORITY 3: Check common Q&A
         qa_response = get_qa_response(user_input)
         if qa_response:
-            return qa_response
+            return "qa", qa_response
 
     # PRIORITY 4: Respond to joke requests
-    if "joke" in original_text or "funny" in original_text:
-        return get_joke()
+    if "joke" in intents:
+        return "joke", get_joke()
 
-    # PRIORITY 5: Code generation detection already done above
-    # is_code_generation variable is set above and will be used in OpenAI section
+    # PRIORITY 5: Code generation detection already done in analyze_message
+    # analysis.is_code_request is used again in the OpenAI section
     
     # PRIORITY 6: Handle code execution and debugging requests
-    if text.strip().startswith(("run", "execute", "code:", "debug")) or "run code" in original_text or "execute code" in original_text:
+    if text.strip().startswith(("run", "execute", "code:", "debug")) or "run_code" in intents:
         if "debug" in text.lower():
             code_to_debug = text.partition("debug")[2].strip()
-            return debug_code(code_to_debug)
+            from code_executor import debug_code
+            return "code_debug", debug_code(code_to_debug)
         else:
             code_to_run = (
                 text.partition("run")[2].strip()
                 or text.partition("execute")[2].strip()
                 or text.partition("code:")[2].strip()
             )
-            if code_to_run:
-                return run_code(code_to_run)
-            else:
-                return "Please provide the code to execute. Example: 'run print(2+2)'"
+            return "code_run", code_to_run
     
     # PRIORITY 7: Handle specific question patterns with custom responses
     # Only trigger if it's actually a "what is" question, not a code generation request
-    if (("what is" in original_text or "what's" in original_text or "explain" in original_text) and 
-        not is_code_generation):
+    if ("what_is" in intents or "explain" in intents) and not analysis.is_code_request:
         # Try to provide custom explanation first
-        if "manna" in original_text:
-            return "Manna AI is an intelligent chatbot. I can help with conversations, code execution, jokes, mood detection, and various other tasks. I'm designed to be helpful, empathetic, and fun to interact with!"
+        if "manna" in intents:
+            return "what_is", "Manna AI is an intelligent chatbot. I can help with conversations, code execution, jokes, mood detection, and various other tasks. I'm designed to be helpful, empathetic, and fun to interact with!"
         
-        if "python" in original_text and ("what is" in original_text or "what's" in original_text):
-            return "Python is a high-level, interpreted programming language known for its simplicity and readability. It's widely used for web development, data science, AI, automation, and more. I can help you run Python code - just type 'run' followed by your code!"
+        if "python" in intents and "what_is" in intents:
+            return "what_is", "Python is a high-level, interpreted programming language known for its simplicity and readability. It's widely used for web development, data science, AI, automation, and more. I can help you run Python code - just type 'run' followed by your code!"
         
-        if ("javascript" in original_text or "js" in original_text) and ("what is" in original_text or "what's" in original_text):
-            return "JavaScript is a programming language primarily used for web development. It enables interactive web pages and is essential for front-end development. Need help with JavaScript code? I can execute it for you!"
+        if "javascript" in intents and "what_is" in intents:
+            return "what_is", "JavaScript is a programming language primarily used for web development. It enables interactive web pages and is essential for front-end development. Need help with JavaScript code? I can execute it for you!"
         
-        if ("ai" in original_text or "artificial intelligence" in original_text) and ("what is" in original_text or "what's" in original_text):
-            return "AI (Artificial Intelligence) is the simulation of human intelligence by machines. It includes machine learning, natural language processing, and more. I'm an example of AI designed to help and assist users!"
+        if "ai" in intents and "what_is" in intents:
+            return "what_is", "AI (Artificial Intelligence) is the simulation of human intelligence by machines. It includes machine learning, natural language processing, and more. I'm an example of AI designed to help and assist users!"
     
     # PRIORITY 8: Handle time/date questions
-    if any(word in original_text for word in ["time", "date", "day", "what day", "what time"]):
+    if "time_date" in intents:
         from datetime import datetime
         now = datetime.now()
-        if "time" in original_text:
-            return f"The current time is {now.strftime('%I:%M %p')}. How can I help you further?"
-        elif "date" in original_text or "day" in original_text:
-            return f"Today is {now.strftime('%A, %B %d, %Y')}. Is there anything else you'd like to know?"
+        if "time" in intents:
+            return "time", f"The current time is {now.strftime('%I:%M %p')}. How can I help you further?"
+        elif "date" in intents:
+            return "date", f"Today is {now.strftime('%A, %B %d, %Y')}. Is there anything else you'd like to know?"
     
     # PRIORITY 9: Handle math questions (simple calculations)
     if re.search(r'\d+\s*[+\-*/]\s*\d+', user_input):
         try:
-            # Simple math evaluation (safe)
-            result = eval(user_input.replace('=', '').strip())
-            return f"The answer is: {result}. Need help with anything else?"
-        except:
+            # Bounded arithmetic on the parsed expression, never eval()
+            result = math_eval.evaluate(user_input.replace('=', ''))
+            return "math", f"The answer is: {result}. Need help with anything else?"
+        except math_eval.MathError:
             pass
 
-    # Analyze sentiment and detect mood (do this early for mood-aware responses)
-    try:
-        sentiment = analyze_sentiment(user_input)
-        mood = get_mood(user_input)
-        mood_emoji = get_mood_emoji(mood)
-    except Exception:
-        sentiment = {'polarity': 0, 'subjectivity': 0}
-        mood = "neutral"
-        mood_emoji = "😐"
-    
     # PRIORITY 10: Check contextual responses based on mood
-    contextual_response = get_contextual_response(user_input, mood)
+    contextual_response = get_contextual_response(user_input, analysis.mood, intents)
     if contextual_response:
-        return contextual_response
+        return "contextual", contextual_response
     
     # PRIORITY 11: Handle general questions with custom responses
-    if "?" in user_input or any(word in original_text for word in ["tell me", "describe", "define"]):
+    if "?" in user_input or "question_phrase" in intents:
         # Try to provide custom responses for common questions
-        if any(word in original_text for word in ["name", "who are you", "what's your name"]):
-            return "I'm Manna AI, your intelligent assistant ready to help with various tasks!"
+        if "ask_name" in intents:
+            return "general_question", "I'm Manna AI, your intelligent assistant ready to help with various tasks!"
         
-        if any(word in original_text for word in ["where", "location"]):
-            return "I exist in the digital world to assist users like you! Where would you like to go or what would you like to know?"
+        if "ask_where" in intents:
+            return "general_question", "I exist in the digital world to assist users like you! Where would you like to go or what would you like to know?"
         
-        if any(word in original_text for word in ["why", "reason"]):
-            return "I was created to help people with various tasks, make conversations more engaging, and provide assistance whenever needed. How can I help you today?"
+        if "ask_why" in intents:
+            return "general_question", "I was created to help people with various tasks, make conversations more engaging, and provide assistance whenever needed. How can I help you today?"
     
     # PRIORITY 12: Handle compliments and positive feedback
-    if any(word in original_text for word in ["good", "great", "awesome", "amazing", "wonderful", "excellent", "love", "like"]):
-        if mood in ["happy", "positive"]:
-            return "Thank you so much! I'm really glad you're enjoying Manna AI. Is there anything else I can help with?"
+    if "compliment" in intents:
+        if analysis.mood in ["happy", "positive"]:
+            return "compliment", "Thank you so much! I'm really glad you're enjoying Manna AI. Is there anything else I can help with?"
     
     # PRIORITY 13: Handle complaints or negative feedback
-    if any(word in original_text for word in ["bad", "terrible", "hate", "dislike", "wrong", "error", "bug", "problem"]):
-        if mood in ["negative", "sad"]:
-            return "I'm sorry to hear that. I'm here to help improve your experience. Could you tell me more about what's not working?"
+    if "complaint" in intents:
+        if analysis.mood in ["negative", "sad"]:
+            return "complaint", "I'm sorry to hear that. I'm here to help improve your experience. Could you tell me more about what's not working?"
 
-    # If no direct handler, fallback to OpenAI GPT chat completion (LAST RESORT)
-    if not openai.api_key:
-        return "I can tell jokes, execute code, answer questions, and help with various tasks! For advanced AI conversations, an API key is needed. But I can still help with many things - try asking for a joke, running code, or asking about my capabilities!"
+    return None
 
-    try:
-        # Check if this is a code generation request (same logic as above)
-        code_phrases = ["give me", "show me", "write", "create", "generate", "example", "sample", "how to"]
-        code_words = ["code", "program", "script", "function", "algorithm", "snippet"]
-        programming_tasks = ["print", "printing", "string", "variable", "list", "dictionary", "loop", "if", "class", "import"]
-        math_code_words = ["sum", "summation", "add", "addition", "calculate", "calculation", "multiply", "divide"]
-        
-        is_code_request = (
-            any(phrase in original_text for phrase in code_phrases) and 
-            any(word in original_text for word in code_words)
-        ) or (
-            any(phrase in original_text for phrase in ["give me", "show me", "write", "create", "how to"]) and
-            any(word in original_text for word in programming_tasks + math_code_words)
-        ) or (
-            "code" in original_text and any(word in original_text for word in ["for", "to", "of", "in"])
-        ) or (
-            any(word in original_text for word in ["python code", "java code", "javascript code", "code example"])
-        )
-        
-        # Enhanced system message with more context about Manna AI
-        mood_context = {
-            "happy": "The user seems happy and positive. Respond enthusiastically and match their energy. You are Manna AI.",
-            "positive": "The user is in a positive mood. Be friendly and supportive. You are Manna AI.",
-            "neutral": "The user seems neutral. Be helpful and professional. You are Manna AI.",
-            "negative": "The user seems to be in a negative mood. Be empathetic, understanding, and offer support. Consider suggesting something uplifting. You are Manna AI.",
-            "sad": "The user appears sad or upset. Be very empathetic, gentle, and supportive. Offer comfort and maybe suggest a joke or positive activity. You are Manna AI."
-        }
-        
-        # Special handling for code generation requests
-        if is_code_request:
-            system_message = """You are Manna AI, an intelligent chatbot.
-            The user is asking for code. Generate clean, well-commented Python code that solves their request.
-            Include:
-            - Clear, working code
-            - Helpful comments explaining the code
-            - Example usage if applicable
-            - Brief explanation if needed
-            Format code in markdown code blocks with python syntax highlighting.
-            Keep responses focused on the code request."""
-        else:
-            system_message = f"""You are Manna AI, an intelligent chatbot. 
-            {mood_context.get(mood, 'Be helpful and friendly.')} 
+def _system_message(analysis: MessageAnalysis) -> str:
+    """Build the system message for the OpenAI fallback"""
+    # Special handling for code generation requests
+    if analysis.is_code_request:
+        return CODE_SYSTEM_MESSAGE
+    mood = analysis.mood
+    return f"""You are Manna AI, an intelligent chatbot. 
+            {MOOD_CONTEXT.get(mood, 'Be helpful and friendly.')} 
             The user's current mood appears to be {mood}.
             Provide personalized, helpful responses. Keep responses concise (under 200 words) and friendly.
             Only mention creators if specifically asked about them."""
-        
-        # Compose messages for chat completion
-        messages = [
-            {"role": "system", "content": system_message},
-            {"role": "user", "content": user_input},  # Use original input, not cleaned text
-        ]
 
-        # Try new API first, fallback to old API
+EMPTY_CODE_MESSAGE = "Please provide the code to execute. Example: 'run print(2+2)'"
+
+def _execute_code(code: str) -> str:
+    """Run code for the "code_run" intent"""
+    if not code:
+        return EMPTY_CODE_MESSAGE
+    from code_executor import run_code
+    return run_code(code)
+
+async def _execute_code_async(code: str, user_id: str) -> str:
+    """Run code for the "code_run" intent within the shared concurrency limits"""
+    if not code:
+        return EMPTY_CODE_MESSAGE
+    from code_executor import run_code_async
+    # The shared anonymous id only counts against the global limit
+    return await run_code_async(code, None if user_id == ANONYMOUS_USER else user_id)
+
+def _history(analysis: MessageAnalysis) -> list:
+    """Recent turns of the user's conversation; guests share an id, so they get none"""
+    if analysis.user_id == ANONYMOUS_USER:
+        return []
+    return SESSION_STORE.context(analysis.user_id, CONTEXT_TOKENS)
+
+def _remember(analysis: MessageAnalysis, answer: str) -> None:
+    """Add the exchange to the user's conversation"""
+    if analysis.user_id != ANONYMOUS_USER:
+        SESSION_STORE.append(analysis.user_id, analysis.user_input, answer)
+
+def _completion_params(analysis: MessageAnalysis) -> dict:
+    """Build chat completion arguments for the OpenAI fallback"""
+    is_code_request = analysis.is_code_request
+    # Compose messages for chat completion: system message, history, this turn
+    messages = [
+        {"role": "system", "content": _system_message(analysis)},
+        *_history(analysis),
+        {"role": "user", "content": analysis.user_input},  # Use original input, not cleaned text
+    ]
+    return {
+        "model": llm_client.OPENAI_MODEL,
+        "messages": messages,
+        # Increase tokens for code generation requests
+        "max_tokens": 500 if is_code_request else 200,
+        "temperature": 0.7 if is_code_request else 0.8,  # Lower temp for code = more consistent
+    }
+
+async def _completion_params_async(analysis: MessageAnalysis) -> dict:
+    """_completion_params, in a worker thread when the history may be read from SQLite"""
+    if SESSION_STORE.persistent and analysis.user_id != ANONYMOUS_USER:
+        return await asyncio.to_thread(_completion_params, analysis)
+    return _completion_params(analysis)
+
+def _legacy_completion(params: dict) -> str:
+    """Chat completion through the pre-1.0 openai API"""
+    import openai
+    openai.api_key = llm_client.api_key()
+    response = openai.ChatCompletion.create(n=1, **params)
+    return response.choices[0].message['content'].strip()
+
+def _completion_context(params: dict) -> str:
+    """Everything besides the user input that shapes an answer: model, system message and history"""
+    return "\x00".join([params["model"]] + [message["content"] for message in params["messages"][:-1]])
+
+def _completion_cache_key(params: dict) -> str:
+    """Cache key: normalized user input plus model and effective system message"""
+    return make_cache_key(params["messages"][-1]["content"], _completion_context(params))
+
+def _cached_answer(params: dict) -> Optional[str]:
+    """Look up an answer in the exact cache, then among near-duplicate prompts"""
+    answer = RESPONSE_CACHE.get(_completion_cache_key(params))
+    semantic_cache = get_semantic_cache()
+    if answer is None and semantic_cache is not None:
+        answer = semantic_cache.get(params["messages"][-1]["content"], _completion_context(params))
+    return answer
+
+def _store_answer(params: dict, answer: str) -> None:
+    """Remember a fresh OpenAI answer in both caches; an empty answer is not worth reusing"""
+    if not answer:
+        return
+    RESPONSE_CACHE.set(_completion_cache_key(params), answer)
+    semantic_cache = get_semantic_cache()
+    if semantic_cache is not None:
+        semantic_cache.set(params["messages"][-1]["content"], answer, _completion_context(params))
+
+async def _cached_answer_async(params: dict) -> Optional[str]:
+    """_cached_answer, in a worker thread when the cache reads SQLite"""
+    if RESPONSE_CACHE.persistent:
+        return await asyncio.to_thread(_cached_answer, params)
+    return _cached_answer(params)
+
+async def _store_answer_async(params: dict, answer: str) -> None:
+    """_store_answer, in a worker thread when the cache writes SQLite"""
+    if RESPONSE_CACHE.persistent:
+        await asyncio.to_thread(_store_answer, params, answer)
+    else:
+        _store_answer(params, answer)
+
+def _complete(params: dict) -> str:
+    """Run a chat completion on the shared client"""
+    # Try new API first, fallback to old API
+    try:
+        client = llm_client.get_sync_client()
+    except (ImportError, AttributeError):
+        return _legacy_completion(params)
+    response = client.chat.completions.create(**params)
+    return response.choices[0].message.content.strip()
+
+async def _complete_async(params: dict) -> str:
+    """Run a chat completion on the shared async client"""
+    # Try new API first, fallback to old API in a worker thread
+    try:
+        client = llm_client.get_async_client()
+    except (ImportError, AttributeError):
+        return await asyncio.to_thread(_legacy_completion, params)
+    response = await client.chat.completions.create(**params)
+    return response.choices[0].message.content.strip()
+
+def _openai_response(analysis: MessageAnalysis) -> str:
+    """Fallback to OpenAI GPT chat completion, answering repeats from the cache"""
+    params = _completion_params(analysis)
+    answer = _cached_answer(params)
+    if answer is not None:
+        return answer
+
+    def complete() -> str:
+        answer = _complete(params)
+        _store_answer(params, answer)  # only successful answers are cached
+        return answer
+
+    try:
+        return COMPLETION_FLIGHTS.do(_completion_cache_key(params), complete)
+    except Exception as e:
+        return f"Sorry, I encountered an error processing your request: {str(e)}"
+
+async def _openai_response_async(analysis: MessageAnalysis) -> str:
+    """Fallback to OpenAI GPT chat completion without blocking the event loop"""
+    params = await _completion_params_async(analysis)
+    answer = await _cached_answer_async(params)
+    if answer is not None:
+        return answer
+
+    async def complete() -> str:
+        answer = await _complete_async(params)
+        await _store_answer_async(params, answer)  # only successful answers are cached
+        return answer
+
+    try:
+        return await COMPLETION_FLIGHTS.do_async(_completion_cache_key(params), complete)
+    except Exception as e:
+        return f"Sorry, I encountered an error processing your request: {str(e)}"
+
+async def _openai_stream_async(analysis: MessageAnalysis) -> AsyncIterator[str]:
+    """Fallback to OpenAI GPT chat completion, yielding tokens as they arrive"""
+    params = await _completion_params_async(analysis)
+    answer = await _cached_answer_async(params)
+    if answer is not None:
+        yield answer
+        return
+    tokens = []
+    try:
+        # Try new API first; the old API cannot stream, so it yields one chunk
         try:
-            from openai import OpenAI
-            client = OpenAI(api_key=openai.api_key)
-            # Increase tokens for code generation requests
-            max_tokens = 500 if is_code_request else 200
-            temperature = 0.7 if is_code_request else 0.8  # Lower temp for code = more consistent
-            
-            response = client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=messages,
-                max_tokens=max_tokens,
-                temperature=temperature,
-            )
-            answer = response.choices[0].message.content.strip()
+            client = llm_client.get_async_client()
         except (ImportError, AttributeError):
-            # Fallback to old API
-            # Increase tokens for code generation requests
-            max_tokens = 500 if is_code_request else 200
-            temperature = 0.7 if is_code_request else 0.8  # Lower temp for code = more consistent
-            
-            response = openai.ChatCompletion.create(
-                model="gpt-4o-mini",
-                messages=messages,
-                max_tokens=max_tokens,
-                temperature=temperature,
-                n=1,
-            )
-            answer = response.choices[0].message['content'].strip()
+            tokens.append(await asyncio.to_thread(_legacy_completion, params))
+            yield tokens[0]
+        else:
+            stream = await client.chat.completions.create(stream=True, **params)
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    tokens.append(chunk.choices[0].delta.content)
+                    yield tokens[-1]
     except Exception as e:
-        answer = f"Sorry, I encountered an error processing your request: {str(e)}"
+        yield f"Sorry, I encountered an error processing your request: {str(e)}"
+        return
+    answer = "".join(tokens).strip()
+    if answer:  # a stream that sent no content is not an answer
+        await _store_answer_async(params, answer)
 
+def cache_stats() -> dict:
+    """Hit/miss counters of the answer, translation and math caches and request coalescing"""
+    stats = {"response": RESPONSE_CACHE.stats()}
+    if SEMANTIC_CACHE is not None:
+        stats["semantic"] = SEMANTIC_CACHE.stats()
+    stats["single_flight"] = COMPLETION_FLIGHTS.stats()
+    stats["translation"] = TRANSLATION_CACHE.stats()
+    stats["language_memory"] = LANGUAGE_MEMORY.stats()
+    stats["math"] = math_eval.cache_stats()
+    return stats
+
+def _mood_prefix(analysis: MessageAnalysis) -> Optional[str]:
+    """Mood-aware message placed before OpenAI answers for negative/sad moods"""
+    mood = analysis.mood
+    if mood in ["sad", "negative"] and "no_mood_prefix" not in analysis.intents:
+        return get_mood_message(mood) or None
+    return None
+
+def _finish_answer(analysis: MessageAnalysis, answer: str) -> str:
+    """Add the mood message and translate an OpenAI answer"""
     # Add mood-aware response for negative/sad moods
-    if mood in ["sad", "negative"] and not any(word in original_text for word in ["joke", "creator", "code", "run", "execute", "debug"]):
-        mood_msg = get_mood_message(mood)
-        if mood_msg:
-            answer = f"{mood_msg} {answer}"
+    mood_msg = _mood_prefix(analysis)
+    if analysis.language == "en":
+        return f"{mood_msg} {answer}" if mood_msg else answer
 
-    # Translate the answer back to user's language if needed
-    if lang != "en":
-        answer = translate_text(answer, dest=lang)
+    # Translate the answer back to user's language; the canned mood message
+    # comes from the translation cache and the rest goes out in one request
+    if mood_msg:
+        return " ".join(translate_batch([mood_msg, answer], dest=analysis.language))
+    return translate_text(answer, dest=analysis.language)
 
+def _translate_local(analysis: MessageAnalysis, intent: str, answer: str) -> str:
+    """Translate canned local answers (not code output or results) for non-English users"""
+    if analysis.language != "en" and intent in TRANSLATED_INTENTS:
+        return translate_text(answer, dest=analysis.language)
     return answer
 
+def _analysis_blocks() -> bool:
+    """Whether analyze_message may block (network detection or TextBlob)"""
+    return sentiment.SENTIMENT_BACKEND == "textblob" or detect_language_blocks()
+
+def get_response_details(user_input: str, user_id: str = "guest") -> ChatResult:
+    """
+    Main chatbot response function, routes queries to relevant modules
+    and returns the response together with the request analysis
+    """
+    request_started = time.perf_counter()
+    analysis = analyze_message(user_input, user_id)
+    timings = analysis.timings
+
+    started = time.perf_counter()
+    local = _local_response(analysis)
+    started = _lap(timings, "local", started)
+    if local:
+        intent, answer = local
+        if intent == "code_run":
+            answer = _execute_code(answer)
+            started = _lap(timings, "code_run", started)
+    elif not llm_client.api_key():
+        # If no direct handler, fallback to OpenAI GPT chat completion (LAST RESORT)
+        intent, answer = "no_api_key", NO_API_KEY_MESSAGE
+    else:
+        intent = "openai"
+        answer = _openai_response(analysis)
+        started = _lap(timings, "openai", started)
+        answer = _finish_answer(analysis, answer)
+    if intent != "openai":
+        answer = _translate_local(analysis, intent, answer)
+    if analysis.language != "en":
+        _lap(timings, "translate", started)
+    _remember(analysis, answer)
+    _record(analysis, intent, request_started)
+
+    return ChatResult(
+        response=answer,
+        mood=analysis.mood,
+        mood_emoji=analysis.mood_emoji,
+        language=analysis.language,
+        intent=intent,
+    )
+
+async def _analyze_message_async(user_input: str, user_id: str) -> MessageAnalysis:
+    """Run analyze_message, in a worker thread when it may block"""
+    if _analysis_blocks():
+        return await asyncio.to_thread(analyze_message, user_input, user_id)
+    return analyze_message(user_input, user_id)
+
+async def _local_response_async(analysis: MessageAnalysis) -> Optional[Tuple[str, str]]:
+    """Answer from the local tiers, executing code off the event loop with backpressure"""
+    started = time.perf_counter()
+    local = _local_response(analysis)
+    started = _lap(analysis.timings, "local", started)
+    if local and local[0] == "code_run":
+        output = await _execute_code_async(local[1], analysis.user_id)
+        _lap(analysis.timings, "code_run", started)
+        return "code_run", output
+    return local
+
+async def get_response_details_async(user_input: str, user_id: str = "guest") -> ChatResult:
+    """
+    Async variant of get_response_details: the OpenAI call uses the shared
+    async client and blocking local work runs in worker threads
+    """
+    request_started = time.perf_counter()
+    analysis = await _analyze_message_async(user_input, user_id)
+
+    local = await _local_response_async(analysis)
+    started = time.perf_counter()
+    if local:
+        intent, answer = local
+    elif not llm_client.api_key():
+        # If no direct handler, fallback to OpenAI GPT chat completion (LAST RESORT)
+        intent, answer = "no_api_key", NO_API_KEY_MESSAGE
+    else:
+        intent = "openai"
+        answer = await _openai_response_async(analysis)
+        started = _lap(analysis.timings, "openai", started)
+        if analysis.language != "en":
+            answer = await asyncio.to_thread(_finish_answer, analysis, answer)
+        else:
+            answer = _finish_answer(analysis, answer)
+    if intent != "openai" and analysis.language != "en":
+        answer = await asyncio.to_thread(_translate_local, analysis, intent, answer)
+    if analysis.language != "en":
+        _lap(analysis.timings, "translate", started)
+    _remember(analysis, answer)
+    _record(analysis, intent, request_started)
+
+    return ChatResult(
+        response=answer,
+        mood=analysis.mood,
+        mood_emoji=analysis.mood_emoji,
+        language=analysis.language,
+        intent=intent,
+    )
+
+async def stream_response_details(user_input: str, user_id: str = "guest") -> AsyncIterator[Union[str, ChatResult]]:
+    """
+    Streaming variant of get_response_details_async: yields answer chunks as
+    the completion produces them, then the final ChatResult. Local tiers and
+    translated answers arrive as a single chunk.
+    """
+    request_started = time.perf_counter()
+    analysis = await _analyze_message_async(user_input, user_id)
+
+    local = await _local_response_async(analysis)
+    started = time.perf_counter()
+    if local or not llm_client.api_key():
+        intent, answer = local or ("no_api_key", NO_API_KEY_MESSAGE)
+        if analysis.language != "en":
+            answer = await asyncio.to_thread(_translate_local, analysis, intent, answer)
+            _lap(analysis.timings, "translate", started)
+        yield answer
+    elif analysis.language != "en":
+        # Translation needs the whole answer, so it goes out in one chunk
+        intent = "openai"
+        answer = await _openai_response_async(analysis)
+        started = _lap(analysis.timings, "openai", started)
+        answer = await asyncio.to_thread(_finish_answer, analysis, answer)
+        _lap(analysis.timings, "translate", started)
+        yield answer
+    else:
+        intent = "openai"
+        parts = []
+        mood_msg = _mood_prefix(analysis)
+        if mood_msg:
+            parts.append(PrefixChunk(f"{mood_msg} "))
+            yield parts[0]
+        async for token in _openai_stream_async(analysis):
+            parts.append(token)
+            yield token
+        # Includes the time the client took to read the stream
+        _lap(analysis.timings, "openai", started)
+        answer = "".join(parts).strip()
+    _remember(analysis, answer)
+    _record(analysis, intent, request_started)
+
+    yield ChatResult(
+        response=answer,
+        mood=analysis.mood,
+        mood_emoji=analysis.mood_emoji,
+        language=analysis.language,
+        intent=intent,
+    )
+
+def get_response(user_input: str, user_id: str = "guest") -> str:
+    """
+    Main chatbot response function, routes queries to relevant modules
+    """
+    return get_response_details(user_input, user_id).response
+
+async def get_response_async(user_input: str, user_id: str = "guest") -> str:
+    """Async variant of get_response"""
+    return (await get_response_details_async(user_input, user_id)).response
@@ -0,0 +1,60 @@
+# code_analysis.py
+# Cheap static check of whether a snippet's output depends only on its
+# source, so run_code results can be cached by a hash of the code
+
+import ast
+import re
+
+# Standard modules without clocks, randomness, I/O or network access
+PURE_MODULES = frozenset([
+    "math", "cmath", "decimal", "fractions", "numbers", "statistics",
+    "string", "re", "textwrap", "unicodedata", "difflib",
+    "collections", "heapq", "bisect", "array", "itertools", "functools", "operator",
+    "copy", "dataclasses", "enum", "typing", "abc", "json", "keyword",
+])
+
+# Builtins that read the outside world, depend on the process, or escape the
+# scan. Sets iterate in an order that depends on the per-process string hash
+# seed, so set and frozenset are here too, as are set literals and
+# comprehensions below.
+IMPURE_BUILTINS = frozenset([
+    "open", "input", "exec", "eval", "compile", "__import__", "breakpoint", "help",
+    "id", "hash", "globals", "locals", "vars", "getattr", "setattr", "delattr",
+    "memoryview", "__builtins__", "__loader__", "__spec__",
+    "set", "frozenset",
+])
+
+# Default reprs of objects, functions and iterators include a memory address
+_ADDRESS_RE = re.compile(r" at 0x[0-9a-fA-F]+>")
+
+def is_deterministic(code: str) -> bool:
+    """True when the snippet only imports pure modules, calls no impure builtins and builds no sets.
+
+    Conservative: anything unrecognised counts as non-deterministic. Code that
+    does not parse is deterministic, its syntax error is always the same.
+    """
+    try:
+        tree = ast.parse(code)
+    except (SyntaxError, ValueError):
+        return True
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            if any(alias.name.partition(".")[0] not in PURE_MODULES for alias in node.names):
+                return False
+        elif isinstance(node, ast.ImportFrom):
+            if node.level or (node.module or "").partition(".")[0] not in PURE_MODULES:
+                return False
+        elif isinstance(node, (ast.Set, ast.SetComp)):
+            return False
+        elif isinstance(node, ast.Name):
+            if node.id in IMPURE_BUILTINS:
+                return False
+        elif isinstance(node, ast.Attribute):
+            # Dunder attributes lead to the builtins and module internals
+            if node.attr.startswith("__") and node.attr.endswith("__"):
+                return False
+    return True
+
+def shows_addresses(output: str) -> bool:
+    """True when output prints a default repr, whose memory address changes between runs"""
+    return _ADDRESS_RE.search(output) is not None
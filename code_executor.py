@@ -1,41 +1,181 @@
 # code_executor.py
 
+import asyncio
+import hashlib
+import os
 import subprocess
 import sys
+import threading
 import traceback
+from typing import Callable, Optional
 
-def run_code(code: str) -> str:
-    """Execute Python code and return output or error"""
-    if not code or not code.strip():
-        return "Please provide code to execute. Example: 'run print(2+2)'"
-    
+from code_analysis import is_deterministic, shows_addresses
+from execution_limiter import ExecutionBusy, ExecutionLimiter
+from response_cache import ResponseCache
+from sandbox_pool import RunResult, SandboxPool, pool_supported
+
+# Wall-clock limit for one run, in seconds
+RUN_TIMEOUT = 10
+
+# Warm worker pool for run_code (POSIX only); MANNA_SANDBOX_POOL=0 runs a
+# fresh interpreter per call instead
+USE_POOL = os.getenv("MANNA_SANDBOX_POOL", "1") != "0" and pool_supported()
+
+_pool = None
+_pool_lock = threading.Lock()
+
+# Admission control for run_code_async: concurrent runs overall and per user,
+# and how many callers may wait for a slot before new ones are turned away
+LIMITER = ExecutionLimiter(
+    max_concurrency=int(os.getenv("MANNA_CODE_CONCURRENCY", os.getenv("MANNA_SANDBOX_WORKERS", "2"))),
+    per_user=int(os.getenv("MANNA_CODE_PER_USER", "1")),
+    max_queue=int(os.getenv("MANNA_CODE_QUEUE", "8")),
+)
+
+# Results of deterministic runs and of debug_code, keyed by a hash of the code.
+# Outputs longer than RESULT_CACHE_MAX_OUTPUT characters are not cached.
+RESULT_CACHE = ResponseCache(maxsize=int(os.getenv("MANNA_CODE_CACHE_SIZE", "512")), ttl=None)
+RESULT_CACHE_MAX_OUTPUT = int(os.getenv("MANNA_CODE_CACHE_MAX_OUTPUT", "16384"))
+
+def _result_key(kind: str, code: str) -> str:
+    """Content address of a snippet for the given operation ("run" or "debug")"""
+    return hashlib.sha256(f"{kind}\x00{code}".encode("utf-8")).hexdigest()
+
+def _cache_result(key: str, output: str) -> None:
+    if len(output) <= RESULT_CACHE_MAX_OUTPUT:
+        RESULT_CACHE.set(key, output)
+
+def _get_pool() -> SandboxPool:
+    """Create the sandbox pool on first use"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = SandboxPool(
+                size=int(os.getenv("MANNA_SANDBOX_WORKERS", "2")),
+                max_jobs=int(os.getenv("MANNA_SANDBOX_MAX_JOBS", "50")),
+                timeout=RUN_TIMEOUT,
+                memory_mb=int(os.getenv("MANNA_SANDBOX_MEMORY_MB", "512")),
+            )
+        return _pool
+
+def warm_up() -> bool:
+    """Start the sandbox workers ahead of the first "run" message"""
+    if not USE_POOL:
+        return False
+    _get_pool().warm_up()
+    return True
+
+def close_pool() -> None:
+    """Stop the sandbox workers, e.g. on application shutdown"""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.close()
+
+def _run_subprocess(code: str) -> RunResult:
+    """Run code in a fresh interpreter (fallback when the pool is unavailable)"""
     try:
-        # Create a safe execution environment
         result = subprocess.run(
             [sys.executable, "-c", code],
             capture_output=True,
             text=True,
-            timeout=10
+            timeout=RUN_TIMEOUT
         )
+    except subprocess.TimeoutExpired:
+        return RunResult(-1, "", "", timed_out=True)
+    return RunResult(result.returncode, result.stdout, result.stderr)
+
+def _execute(code: str) -> RunResult:
+    """Run in an isolated, resource-limited process"""
+    return _get_pool().run(code) if USE_POOL else _run_subprocess(code)
+
+EMPTY_CODE_MESSAGE = "Please provide code to execute. Example: 'run print(2+2)'"
+
+def run_code(code: str) -> str:
+    """Execute Python code and return output or error"""
+    if not code or not code.strip():
+        return EMPTY_CODE_MESSAGE
+
+    key = _result_key("run", code)
+    cached = RESULT_CACHE.get(key)
+    if cached is not None:
+        return cached
+    return _run_uncached(code, key)
+
+def _run_uncached(code: str, key: str) -> str:
+    """Execute code whose cache lookup already missed, caching the output if it is deterministic"""
+    try:
+        result = _execute(code)
+        if result.timed_out:
+            return f"Error: Code execution timed out (max {RUN_TIMEOUT} seconds)"
         if result.returncode == 0:
             output = result.stdout.strip()
-            return output if output else "Code executed successfully (no output)"
+            output = output if output else "Code executed successfully (no output)"
         else:
             error = result.stderr.strip()
-            return f"Error: {error}" if error else "Code execution failed"
-    except subprocess.TimeoutExpired:
-        return "Error: Code execution timed out (max 10 seconds)"
+            output = f"Error: {error}" if error else "Code execution failed"
     except Exception as e:
         return f"Error executing code: {str(e)}"
+    # Timeouts and sandbox failures above are never cached; neither is code
+    # that reads clocks, randomness, files or the network, or output that
+    # shows a memory address
+    if result.returncode >= 0 and is_deterministic(code) and not shows_addresses(output):
+        _cache_result(key, output)
+    return output
+
+async def run_code_limited(code: str, user_id: Optional[str] = None,
+                           on_start: Optional[Callable[[], None]] = None) -> str:
+    """Run code off the event loop once the limiter grants a slot.
+
+    user_id None skips the per-user limit (e.g. for a shared anonymous id).
+    on_start is called when the run leaves the wait queue. Raises
+    ExecutionBusy when no slot is free and the wait queue is full.
+    """
+    if not code or not code.strip():
+        return EMPTY_CODE_MESSAGE
+    # Cached results need neither a slot nor a worker thread; this is the
+    # only lookup, so each call counts once in the cache stats
+    key = _result_key("run", code)
+    cached = RESULT_CACHE.get(key)
+    if cached is not None:
+        return cached
+    await LIMITER.acquire(user_id)
+    if on_start is not None:
+        on_start()
+    try:
+        return await asyncio.to_thread(_run_uncached, code, key)
+    finally:
+        LIMITER.release(user_id)
+
+async def run_code_async(code: str, user_id: Optional[str] = None) -> str:
+    """Run code without blocking the event loop; a "busy" message when refused"""
+    try:
+        return await run_code_limited(code, user_id)
+    except ExecutionBusy as e:
+        return str(e)
+
+def execution_stats() -> dict:
+    """Concurrency, queue depth and wait times of run_code_async, and result cache hits"""
+    stats = LIMITER.stats()
+    stats["result_cache"] = RESULT_CACHE.stats()
+    if _pool is not None:
+        stats["pool"] = _pool.stats()
+    return stats
 
 def debug_code(code: str) -> str:
     """Attempt to debug code and provide suggestions"""
+    key = _result_key("debug", code)
+    cached = RESULT_CACHE.get(key)
+    if cached is not None:
+        return cached
     try:
         # Try to compile the code to check for syntax errors
         compile(code, "<string>", "exec")
-        return "Code syntax is valid. Try running it to see runtime errors."
+        output = "Code syntax is valid. Try running it to see runtime errors."
     except SyntaxError as e:
-        return f"Syntax Error: {e.msg} at line {e.lineno}\n{e.text}"
+        output = f"Syntax Error: {e.msg} at line {e.lineno}\n{e.text}"
     except Exception as e:
         return f"Error analyzing code: {str(e)}"
-
+    _cache_result(key, output)
+    return output
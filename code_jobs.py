@@ -0,0 +1,118 @@
+# code_jobs.py
+# Background code runs for the /code/jobs API: submit returns a job id at
+# once, and the result is fetched later by polling or long-polling. Jobs
+# live in a bounded in-memory store and expire a while after finishing.
+
+import asyncio
+import os
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Optional
+
+from code_executor import run_code_limited
+from execution_limiter import ExecutionBusy
+from nlp_utils import ANONYMOUS_USER
+
+# Longest a GET may hold the connection waiting for a result, in seconds
+MAX_WAIT = 30
+
+@dataclass
+class CodeJob:
+    job_id: str
+    user_id: str
+    status: str = "queued"  # queued -> running -> done | rejected
+    result: Optional[str] = None
+    created: float = field(default_factory=time.time)
+    finished: Optional[float] = None
+    done: asyncio.Event = field(default_factory=asyncio.Event, repr=False)
+    task: Optional[asyncio.Task] = field(default=None, repr=False)
+
+    def to_dict(self) -> dict:
+        data = {"job_id": self.job_id, "status": self.status}
+        if self.result is not None:
+            data["result"] = self.result
+        return data
+
+class JobStoreFull(Exception):
+    """Raised when every slot in the store holds an unfinished job"""
+
+class JobStore:
+    """Insertion-ordered job table with a size bound and result expiry"""
+
+    def __init__(self, maxsize: int = 1000, ttl: float = 300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._jobs: "OrderedDict[str, CodeJob]" = OrderedDict()
+        self._finished: "OrderedDict[str, float]" = OrderedDict()  # in completion order
+        self.submitted = 0
+        self.expired = 0
+
+    def _prune(self) -> None:
+        """Drop expired results, and the oldest finished ones until a new job fits"""
+        now = time.time()
+        while self._finished:
+            job_id, finished = next(iter(self._finished.items()))
+            if finished + self.ttl > now and len(self._jobs) < self.maxsize:
+                break
+            del self._finished[job_id]
+            del self._jobs[job_id]
+            self.expired += 1
+
+    def submit(self, code: str, user_id: str) -> CodeJob:
+        """Register a job and start running it in the background"""
+        self._prune()
+        if len(self._jobs) >= self.maxsize:
+            raise JobStoreFull("Too many code jobs are pending, please retry later.")
+        job = CodeJob(job_id=uuid.uuid4().hex, user_id=user_id)
+        self._jobs[job.job_id] = job
+        self.submitted += 1
+        job.task = asyncio.get_running_loop().create_task(self._run(job, code))
+        return job
+
+    async def _run(self, job: CodeJob, code: str) -> None:
+        limit_user = None if job.user_id == ANONYMOUS_USER else job.user_id
+
+        def started() -> None:
+            job.status = "running"
+
+        try:
+            job.result = await run_code_limited(code, limit_user, on_start=started)
+            job.status = "done"
+        except ExecutionBusy as e:
+            job.status, job.result = "rejected", str(e)
+        except Exception as e:
+            job.status, job.result = "done", f"Error executing code: {str(e)}"
+        finally:
+            job.finished = time.time()
+            self._finished[job.job_id] = job.finished
+            job.task = None
+            job.done.set()
+
+    def get(self, job_id: str) -> Optional[CodeJob]:
+        self._prune()
+        return self._jobs.get(job_id)
+
+    async def wait(self, job_id: str, timeout: float = 0) -> Optional[CodeJob]:
+        """Return the job, first waiting up to timeout seconds for it to finish"""
+        job = self.get(job_id)
+        if job is not None and job.finished is None and timeout > 0:
+            try:
+                await asyncio.wait_for(job.done.wait(), min(timeout, MAX_WAIT))
+            except asyncio.TimeoutError:
+                pass
+        return job
+
+    def stats(self) -> dict:
+        return {
+            "jobs": len(self._jobs),
+            "pending": len(self._jobs) - len(self._finished),
+            "submitted": self.submitted,
+            "expired": self.expired,
+        }
+
+JOB_STORE = JobStore(
+    maxsize=int(os.getenv("MANNA_CODE_JOBS_SIZE", "1000")),
+    ttl=float(os.getenv("MANNA_CODE_JOBS_TTL", "300")),
+)
@@ -0,0 +1,108 @@
+# execution_limiter.py
+# Admission control for code runs on the event loop: a global concurrency
+# limit, a per-user limit and a bounded FIFO wait queue. Callers that cannot
+# be queued are refused at once instead of piling up behind slow jobs.
+
+import asyncio
+import time
+from collections import deque
+from typing import Dict, Optional
+
+class ExecutionBusy(Exception):
+    """Raised when a run is refused; the message is meant for the user"""
+
+class ExecutionLimiter:
+    """Semaphore-like slot counter with a bounded queue and per-user caps.
+
+    Waiters are plain futures of whichever loop is running, so one limiter
+    serves the app's event loop without being bound to it at import time.
+    Not thread-safe: use it from a single event loop.
+    """
+
+    def __init__(self, max_concurrency: int = 2, per_user: int = 1, max_queue: int = 8):
+        self.max_concurrency = max_concurrency
+        self.per_user = per_user
+        self.max_queue = max_queue
+        self.running = 0
+        self._waiters: deque = deque()
+        self._users: Dict[str, int] = {}
+        self._wait_ms: deque = deque(maxlen=1000)
+        self.completed = 0
+        self.rejected = 0
+        self.max_queue_depth = 0
+
+    async def acquire(self, user_id: Optional[str] = None) -> None:
+        """Wait for a slot; raises ExecutionBusy when the caller cannot be queued"""
+        if user_id is not None and self._users.get(user_id, 0) >= self.per_user:
+            self.rejected += 1
+            raise ExecutionBusy("You already have code running. Please wait for it to finish.")
+        if (self.running >= self.max_concurrency or self._waiters) and len(self._waiters) >= self.max_queue:
+            self.rejected += 1
+            raise ExecutionBusy("The code runner is busy right now, please retry in a few seconds.")
+        self._add_user(user_id)
+        started = time.perf_counter()
+        if self.running < self.max_concurrency and not self._waiters:
+            self.running += 1
+        else:
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            self.max_queue_depth = max(self.max_queue_depth, len(self._waiters))
+            try:
+                await waiter  # release() hands its slot straight to us
+            except BaseException:
+                if waiter.done() and not waiter.cancelled():
+                    self._release_slot()  # slot arrived together with the cancellation
+                else:
+                    try:
+                        self._waiters.remove(waiter)
+                    except ValueError:
+                        pass
+                self._remove_user(user_id)
+                raise
+        self._wait_ms.append((time.perf_counter() - started) * 1000)
+
+    def release(self, user_id: Optional[str] = None) -> None:
+        """Give back the slot taken by acquire()"""
+        self.completed += 1
+        self._remove_user(user_id)
+        self._release_slot()
+
+    def _release_slot(self) -> None:
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.running -= 1
+
+    def _add_user(self, user_id: Optional[str]) -> None:
+        if user_id is not None:
+            self._users[user_id] = self._users.get(user_id, 0) + 1
+
+    def _remove_user(self, user_id: Optional[str]) -> None:
+        if user_id is not None:
+            count = self._users.get(user_id, 0) - 1
+            if count > 0:
+                self._users[user_id] = count
+            else:
+                self._users.pop(user_id, None)
+
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    def stats(self) -> dict:
+        """Current load, refusals and queue wait times"""
+        waits = sorted(self._wait_ms)
+        stats = {
+            "running": self.running,
+            "queued": self.queued(),
+            "max_queue_depth": self.max_queue_depth,
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "completed": self.completed,
+            "rejected": self.rejected,
+        }
+        if waits:
+            stats["wait_p50_ms"] = round(waits[len(waits) // 2], 2)
+            stats["wait_p95_ms"] = round(waits[min(len(waits) - 1, int(len(waits) * 0.95))], 2)
+        return stats
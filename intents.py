@@ -0,0 +1,65 @@
+# intents.py
+# Single-pass keyword matcher used to route messages to response tiers
+
+from typing import Dict, FrozenSet, Iterable, List, Mapping, Set
+
+
+class IntentMatcher:
+    """Aho-Corasick automaton mapping keywords to intent labels.
+
+    Matching keeps the semantics of ``keyword in text``: every keyword that
+    occurs anywhere in the text, including overlapping and nested ones,
+    contributes its intents to the result.
+    """
+
+    def __init__(self, tables: Mapping[str, Iterable[str]]):
+        # Trie construction: one transition dict per state
+        goto: List[Dict[str, int]] = [{}]
+        outputs: List[Set[str]] = [set()]
+        for intent, keywords in tables.items():
+            for keyword in keywords:
+                if not keyword:
+                    continue
+                state = 0
+                for ch in keyword:
+                    nxt = goto[state].get(ch)
+                    if nxt is None:
+                        nxt = len(goto)
+                        goto[state][ch] = nxt
+                        goto.append({})
+                        outputs.append(set())
+                    state = nxt
+                outputs[state].add(intent)
+
+        # Breadth-first pass: resolve failure links into a full DFA so a scan
+        # needs exactly one dict lookup per character
+        fail = [0] * len(goto)
+        delta: List[Dict[str, int]] = [dict(goto[0])] + [{} for _ in goto[1:]]
+        queue = list(goto[0].values())
+        head = 0
+        while head < len(queue):
+            state = queue[head]
+            head += 1
+            outputs[state] |= outputs[fail[state]]
+            transitions = dict(delta[fail[state]])
+            for ch, nxt in goto[state].items():
+                fail[nxt] = delta[fail[state]].get(ch, 0)
+                transitions[ch] = nxt
+                queue.append(nxt)
+            delta[state] = transitions
+
+        self._delta = delta
+        self._outputs: List[FrozenSet[str]] = [frozenset(out) for out in outputs]
+        self.intents: FrozenSet[str] = frozenset(tables)
+
+    def match(self, text: str) -> Set[str]:
+        """Scan text once and return the set of matched intent labels"""
+        delta = self._delta
+        outputs = self._outputs
+        found: Set[str] = set()
+        state = 0
+        for ch in text:
+            state = delta[state].get(ch, 0)
+            if outputs[state]:
+                found |= outputs[state]
+        return found
@@ -0,0 +1,190 @@
+# kb_store.py
+# Knowledge base content from data files, with hot reload.
+#
+#   data/knowledge_base.json   {"category": ["response", ...], ...}
+#   data/qa.jsonl              {"question": ..., "answer": ...} per line
+#   data/programming.jsonl     same format, consulted after qa.jsonl
+#
+# The Q&A tables are compiled into a qa_index file in a per-user cache
+# directory only its owner can write to, and memory-mapped, so worker
+# processes share it and a restart only maps the file. A background thread watches the data files; on a
+# change it compiles the new index in a subprocess, so request threads
+# never wait on the GIL for it, then swaps the content in one assignment.
+
+import hashlib
+import json
+import os
+import stat
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from qa_index import MappedQAIndex, QAIndex
+
+KNOWLEDGE_BASE_FILE = "knowledge_base.json"
+# Q&A tables in priority order
+QA_FILES = ["qa.jsonl", "programming.jsonl"]
+
+@dataclass
+class KnowledgeBase:
+    """One consistent snapshot of the content; replaced whole on reload"""
+    categories: Dict[str, List[str]]
+    qa: MappedQAIndex
+    fingerprint: str
+
+def read_jsonl(path: str) -> Dict[str, str]:
+    """question -> answer from a JSON-lines file; blank lines are skipped"""
+    table = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                item = json.loads(line)
+                table[item["question"]] = item["answer"]
+    return table
+
+def compile_index(data_dir: str, index_path: str, fingerprint: str) -> None:
+    """Build the Q&A index from the data files and write it to index_path"""
+    tables = []
+    for name in QA_FILES:
+        path = os.path.join(data_dir, name)
+        tables.append(read_jsonl(path) if os.path.exists(path) else {})
+    QAIndex(tables).save(index_path, fingerprint)
+
+def private_cache_dir() -> str:
+    """A directory for the compiled index that only this user can write to.
+
+    Tries the user cache directory, then a per-user directory under the
+    temp directory (the only writable place on Vercel). One that exists but
+    is not a directory owned by this user with mode 0700 is skipped, since
+    another user could plant an index there; the last resort is a new
+    private directory of this process's own.
+    """
+    candidates = [os.path.join(os.getenv("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "manna")]
+    if hasattr(os, "geteuid"):
+        candidates.append(os.path.join(tempfile.gettempdir(), f"manna-{os.geteuid()}"))
+    for path in candidates:
+        try:
+            os.makedirs(path, mode=0o700, exist_ok=True)
+            st = os.lstat(path)
+        except OSError:
+            continue
+        if not hasattr(os, "geteuid"):
+            return path
+        if stat.S_ISDIR(st.st_mode) and st.st_uid == os.geteuid() and not st.st_mode & 0o077:
+            return path
+    return tempfile.mkdtemp(prefix="manna-kb-")
+
+class KnowledgeStore:
+    """Loads the content on first use and keeps it current while running"""
+
+    def __init__(self, data_dir: str, index_path: Optional[str] = None, reload_interval: float = 2.0):
+        self.data_dir = os.path.abspath(data_dir)
+        digest = hashlib.sha1(self.data_dir.encode("utf-8")).hexdigest()[:12]
+        self.index_path = index_path or os.path.join(private_cache_dir(), f"kb_{digest}.idx")
+        self.reload_interval = reload_interval
+        self._current: Optional[KnowledgeBase] = None
+        self._lock = threading.Lock()
+        self._watcher: Optional[threading.Thread] = None
+        self._failed_fingerprint: Optional[str] = None
+        self.reloads = 0
+        self.reload_errors = 0
+        self.last_load_ms = 0.0
+
+    def fingerprint(self) -> str:
+        """Changes whenever a data file is added, removed or modified"""
+        parts = []
+        for name in [KNOWLEDGE_BASE_FILE] + QA_FILES:
+            try:
+                st = os.stat(os.path.join(self.data_dir, name))
+                parts.append(f"{name}:{st.st_size}:{st.st_mtime_ns}")
+            except FileNotFoundError:
+                parts.append(f"{name}:-")
+        return hashlib.sha1("|".join(parts).encode("utf-8")).hexdigest()[:16]
+
+    def _map_index(self, fingerprint: str, in_process: bool) -> MappedQAIndex:
+        """Map the compiled index, compiling it first unless it matches fingerprint"""
+        try:
+            index = MappedQAIndex(self.index_path)
+            if index.fingerprint == fingerprint:
+                return index
+            index.close()
+        except (OSError, ValueError):
+            pass
+        if in_process:
+            compile_index(self.data_dir, self.index_path, fingerprint)
+        else:
+            subprocess.run(
+                [sys.executable, os.path.abspath(__file__), self.data_dir, self.index_path, fingerprint],
+                check=True, capture_output=True,
+            )
+        return MappedQAIndex(self.index_path)
+
+    def _load(self, in_process: bool) -> KnowledgeBase:
+        started = time.perf_counter()
+        fingerprint = self.fingerprint()
+        with open(os.path.join(self.data_dir, KNOWLEDGE_BASE_FILE), encoding="utf-8") as f:
+            categories = json.load(f)
+        content = KnowledgeBase(categories, self._map_index(fingerprint, in_process), fingerprint)
+        self.last_load_ms = (time.perf_counter() - started) * 1000
+        return content
+
+    def current(self) -> KnowledgeBase:
+        """The live content; callers read it once per request"""
+        content = self._current
+        if content is None:
+            with self._lock:
+                if self._current is None:
+                    # Nothing is being served yet, so compiling here stalls no one
+                    self._current = self._load(in_process=True)
+                    if self.reload_interval > 0:
+                        self._watcher = threading.Thread(target=self._watch, daemon=True)
+                        self._watcher.start()
+                content = self._current
+        return content
+
+    def reload(self) -> bool:
+        """Swap in new content if the data files changed; True when it did"""
+        with self._lock:
+            fingerprint = self.fingerprint()
+            if self._current is not None and fingerprint == self._current.fingerprint:
+                return False
+            if fingerprint == self._failed_fingerprint:
+                return False  # same broken files as last time
+            try:
+                content = self._load(in_process=False)
+            except Exception:
+                self._failed_fingerprint = fingerprint
+                raise
+            # The old index stays mapped until the requests using it let go
+            self._current = content
+            self.reloads += 1
+            return True
+
+    def _watch(self) -> None:
+        while True:
+            time.sleep(self.reload_interval)
+            try:
+                self.reload()
+            except Exception as e:  # keep serving the old content
+                self.reload_errors += 1
+                print(f"Warning: knowledge base reload failed: {e}")
+
+    def stats(self) -> dict:
+        content = self._current
+        return {
+            "loaded": content is not None,
+            "qa_entries": len(content.qa) if content else 0,
+            "categories": len(content.categories) if content else 0,
+            "fingerprint": content.fingerprint if content else None,
+            "reloads": self.reloads,
+            "reload_errors": self.reload_errors,
+            "last_load_ms": round(self.last_load_ms, 2),
+        }
+
+if __name__ == "__main__":
+    # Reload compiler: python kb_store.py <data_dir> <index_path> <fingerprint>
+    compile_index(sys.argv[1], sys.argv[2], sys.argv[3])
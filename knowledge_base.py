@@ -1,162 +1,80 @@
 # knowledge_base.py
 # Comprehensive custom response system for Manna AI
 
-import re
-from typing import Optional, Dict, List
+import os
+import random
+from typing import Optional, Dict, List, Set
 
-# Knowledge base categories and responses
-KNOWLEDGE_BASE: Dict[str, List[str]] = {
-    "greetings": [
-        "Hello! I'm Manna AI. How can I help you today?",
-        "Hi there! Welcome to Manna AI. What would you like to know?",
-        "Hey! I'm Manna AI, your intelligent assistant. Ready to help!",
-        "Greetings! I'm Manna AI. How may I assist you?",
-    ],
-    "capabilities": [
-        "I can help you with:\n• AI-powered conversations\n• Code execution and debugging\n• Telling jokes\n• Mood detection and empathetic responses\n• Answering questions\n• Time and date information\n• Math calculations\n• And much more! What would you like to try?",
-    ],
-    "help": [
-        "I'm here to help! You can:\n• Ask me questions\n• Request jokes\n• Run code (type 'run' followed by your code)\n• Ask about time/date\n• Do math calculations\n• Just chat naturally!",
-    ],
-    "goodbye": [
-        "Goodbye! Thanks for chatting with Manna AI. Hope to see you again soon!",
-        "See you later! It was great talking with you.",
-        "Farewell! Have a wonderful day! - Manna AI",
-    ],
-    "thanks": [
-        "You're very welcome! I'm glad I could help.",
-        "Happy to help! That's what I'm here for.",
-        "Anytime! Feel free to ask if you need anything else.",
-    ],
-    "how_are_you": [
-        "I'm doing great! I'm Manna AI, and I'm here to help you. How are you doing today?",
-        "I'm fantastic! Ready to assist you with anything you need. How can I help?",
-        "I'm excellent! Thanks for asking. What can I do for you today?",
-    ],
-}
+from intents import IntentMatcher
+from kb_store import KnowledgeStore
 
-# Q&A Database - Common questions with custom answers
-QA_DATABASE: Dict[str, str] = {
-    "what can you do": "I'm Manna AI! I can:\n• Have intelligent conversations\n• Execute and debug code\n• Tell jokes\n• Detect your mood and respond empathetically\n• Answer questions\n• Help with calculations\n• Provide time/date info\n• And much more! What interests you?",
-    
-    "what are your features": "My features include:\n✨ AI Conversations\n💻 Code Execution\n😄 Joke Telling\n😊 Mood Detection\n❓ Q&A Support\n🔢 Math Calculations\n⏰ Time/Date Info",
-    
-    "who are you": "I'm Manna AI, an intelligent chatbot. I'm designed to be helpful, empathetic, and fun to interact with!",
-    
-    "what is manna ai": "Manna AI is an intelligent chatbot. I can help with conversations, code execution, jokes, mood detection, and various tasks. I'm here to make your day better!",
-    
-    "how do you work": "I work by analyzing your messages, understanding your intent, detecting your mood, and providing appropriate responses. I use natural language processing, sentiment analysis, and custom knowledge bases to give you the best experience.",
-    
-    "tell me about yourself": "I'm Manna AI, designed to be helpful, understanding, and fun. I can detect your mood, tell jokes, execute code, and have meaningful conversations. My goal is to assist you in the best way possible!",
-    
-    "what is python": "Python is a high-level programming language known for its simplicity and readability. It's used for web development, data science, AI, automation, and more. I can help you run Python code - just type 'run' followed by your code!",
-    
-    "what is javascript": "JavaScript is a programming language used for web development. It makes websites interactive and dynamic. Need help with JavaScript? I can execute code for you!",
-    
-    "what is ai": "AI (Artificial Intelligence) simulates human intelligence in machines. It includes machine learning, natural language processing, and more. I'm an example of AI designed to help and assist users!",
-    
-    "how to use": "Using Manna AI is easy:\n1. Type your message or question\n2. I'll analyze it and respond\n3. Try asking for jokes, running code, or just chatting!",
-    
-    "what is programming": "Programming is the process of creating software by writing code. It's like giving instructions to a computer. I can help you run and test code!",
-    
-    "what is coding": "Coding is writing instructions in a programming language that computers can understand. It's creative problem-solving! I can execute code for you - just type 'run' followed by your code.",
-    
-    "how are you": "I'm doing great! I'm Manna AI, and I'm here to help you. How are you doing today?",
-    
-    "what's your name": "I'm Manna AI! Nice to meet you!",
-    
-    "where are you from": "I exist in the digital world to assist users like you! I'm here whenever you need help.",
-    
-    "why were you created": "I was created to help people with various tasks, make conversations more engaging, and provide assistance whenever needed. How can I help you today?",
-    
-    "what can i ask": "You can ask me anything! Try:\n• Questions about me\n• Request jokes\n• Run code\n• Ask about time/date\n• Do math\n• Just chat naturally!",
-    
-    "how old are you": "I'm a new creation, but I'm learning and growing every day!",
-    
-    "what languages": "I can understand and respond in multiple languages! I primarily work in English, but I can help with translations too.",
-    
-    "what is machine learning": "Machine Learning is a subset of AI where computers learn from data to make predictions or decisions. It's fascinating!",
-    
-    "what is nlp": "NLP (Natural Language Processing) helps computers understand human language. I use it to understand your messages!",
+# Responses and Q&A tables live in data/, see kb_store.py; edits there are
+# picked up while running
+KNOWLEDGE_STORE = KnowledgeStore(
+    os.getenv("MANNA_KB_DIR") or os.path.join(os.path.dirname(os.path.abspath(__file__)), "data"),
+    index_path=os.getenv("MANNA_KB_INDEX") or None,
+    reload_interval=float(os.getenv("MANNA_KB_RELOAD_INTERVAL", "2")),
+)
+
+# Keyword tables for category detection, checked in priority order
+CATEGORY_KEYWORDS: Dict[str, List[str]] = {
+    "greetings": ["hello", "hi", "hey", "greetings", "good morning", "good afternoon", "good evening"],
+    "capabilities": ["what can you", "what do you", "capabilities", "features", "what are you"],
+    "help": ["help", "how to", "how do i", "guide", "instructions"],
+    "goodbye": ["bye", "goodbye", "see you", "farewell", "later"],
+    "thanks": ["thank", "thanks", "appreciate", "grateful"],
+    "how_are_you": ["how are you", "how's it going", "how do you feel"],
 }
 
-# Programming-related responses
-PROGRAMMING_RESPONSES: Dict[str, str] = {
-    "python": "Python is great! It's simple, powerful, and versatile. I can execute Python code for you - just type 'run' followed by your code.",
-    "javascript": "JavaScript is essential for web development! I can help you test JavaScript code.",
-    "code": "I can help with code! Type 'run' followed by your code to execute it, or 'debug' to check for errors.",
-    "programming": "Programming is awesome! I can help you run and debug code. Just type 'run' followed by your code.",
-    "developer": "Developers are amazing! I can help with coding tasks!",
+# Keyword tables for mood-aware contextual responses
+CONTEXTUAL_KEYWORDS: Dict[str, List[str]] = {
+    "sad_support": ["help", "problem", "issue", "trouble"],
+    "happy_cheer": ["great", "awesome", "wonderful", "amazing"],
 }
 
-def find_response_category(user_input: str) -> Optional[str]:
+_category_matcher: Optional[IntentMatcher] = None
+
+def _match_intents(text: str) -> Set[str]:
+    """Match knowledge base keyword tables when no precomputed intents are given"""
+    global _category_matcher
+    if _category_matcher is None:
+        _category_matcher = IntentMatcher({**CATEGORY_KEYWORDS, **CONTEXTUAL_KEYWORDS})
+    return _category_matcher.match(text)
+
+def find_response_category(user_input: str, intents: Optional[Set[str]] = None) -> Optional[str]:
     """Find the category of the user's input"""
-    text = user_input.lower().strip()
-    
-    # Greetings
-    if any(word in text for word in ["hello", "hi", "hey", "greetings", "good morning", "good afternoon", "good evening"]):
-        return "greetings"
-    
-    # Capabilities
-    if any(phrase in text for phrase in ["what can you", "what do you", "capabilities", "features", "what are you"]):
-        return "capabilities"
+    if intents is None:
+        intents = _match_intents(user_input.lower().strip())
     
-    # Help
-    if any(word in text for word in ["help", "how to", "how do i", "guide", "instructions"]):
-        return "help"
-    
-    # Goodbye
-    if any(word in text for word in ["bye", "goodbye", "see you", "farewell", "later"]):
-        return "goodbye"
-    
-    # Thanks
-    if any(word in text for word in ["thank", "thanks", "appreciate", "grateful"]):
-        return "thanks"
-    
-    # How are you
-    if any(phrase in text for phrase in ["how are you", "how's it going", "how do you feel"]):
-        return "how_are_you"
+    for category in CATEGORY_KEYWORDS:
+        if category in intents:
+            return category
     
     return None
 
 def get_custom_response(category: str) -> Optional[str]:
     """Get a random custom response from a category"""
-    import random
-    if category in KNOWLEDGE_BASE:
-        return random.choice(KNOWLEDGE_BASE[category])
+    responses = KNOWLEDGE_STORE.current().categories.get(category)
+    if responses:
+        return random.choice(responses)
     return None
 
 def get_qa_response(user_input: str) -> Optional[str]:
-    """Get response from Q&A database"""
-    text = user_input.lower().strip()
-    
-    # Direct match
-    if text in QA_DATABASE:
-        return QA_DATABASE[text]
-    
-    # Partial match - check if any key phrase is in the input
-    for key, value in QA_DATABASE.items():
-        if key in text:
-            return value
-    
-    # Programming-related
-    for key, value in PROGRAMMING_RESPONSES.items():
-        if key in text:
-            return value
-    
-    return None
+    """Get response from Q&A database, then programming responses"""
+    return KNOWLEDGE_STORE.current().qa.lookup(user_input)
 
-def get_contextual_response(user_input: str, mood: str = "neutral") -> Optional[str]:
+def get_contextual_response(user_input: str, mood: str = "neutral", intents: Optional[Set[str]] = None) -> Optional[str]:
     """Get contextual response based on mood and input"""
-    text = user_input.lower().strip()
+    if intents is None:
+        intents = _match_intents(user_input.lower().strip())
     
     # Mood-specific responses
     if mood == "sad":
-        if any(word in text for word in ["help", "problem", "issue", "trouble"]):
+        if "sad_support" in intents:
             return "I'm sorry you're going through a tough time. I'm here to help. Would you like to talk about it, or would a joke help cheer you up?"
     
     if mood == "happy":
-        if any(word in text for word in ["great", "awesome", "wonderful", "amazing"]):
+        if "happy_cheer" in intents:
             return "That's fantastic! I'm so glad you're feeling great! How can I help make your day even better?"
     
     return None
@@ -0,0 +1,284 @@
+# language_id.py
+# Offline language detection: Unicode script ranges for non-Latin text and
+# character-trigram profiles for Latin-script languages, with a stopword
+# fast path so ordinary English never reaches the model.
+
+import math
+import re
+import threading
+import unicodedata
+from collections import Counter, OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+DEFAULT_LANGUAGE = "en"
+
+# Language codes follow googletrans so translate_text() accepts them unchanged
+# ("zh-CN" for Chinese, "iw" for Hebrew)
+
+# (first code point, last code point, language) for scripts used by one main language
+_SCRIPT_RANGES = [
+    (0x0370, 0x03FF, "el"), (0x0590, 0x05FF, "iw"), (0x0900, 0x097F, "hi"),
+    (0x0980, 0x09FF, "bn"), (0x0A00, 0x0A7F, "pa"), (0x0A80, 0x0AFF, "gu"),
+    (0x0B80, 0x0BFF, "ta"), (0x0C00, 0x0C7F, "te"), (0x0C80, 0x0CFF, "kn"),
+    (0x0D00, 0x0D7F, "ml"), (0x0E00, 0x0E7F, "th"), (0x10A0, 0x10FF, "ka"),
+    (0x3040, 0x30FF, "ja"), (0xAC00, 0xD7AF, "ko"), (0x1100, 0x11FF, "ko"),
+    (0x0400, 0x04FF, "ru"), (0x0600, 0x06FF, "ar"), (0x4E00, 0x9FFF, "zh-CN"),
+]
+
+# Letters that set Urdu apart from Arabic within the Arabic script
+_URDU_LETTERS = frozenset("ٹڈڑںےہھ")
+# Letters only Ukrainian uses among Cyrillic languages
+_UKRAINIAN_LETTERS = frozenset("ієїґ")
+
+# Short conversational samples; each Latin-script profile is built from its sample
+_SEED_TEXTS: Dict[str, str] = {
+    "en": """hello how are you today i am fine thank you what is your name can you help me
+        with this problem please tell me a joke i would like to know more about the weather
+        where do you live what time is it now this is very good and i really like it they
+        were going to the market with their friends we should have done that yesterday
+        which one is better for learning programming the children are playing outside
+        could you explain how this works i think that would be nice thanks for everything""",
+    "es": """hola cómo estás hoy estoy bien gracias cuál es tu nombre puedes ayudarme con este
+        problema por favor cuéntame un chiste me gustaría saber más sobre el tiempo dónde
+        vives qué hora es ahora esto es muy bueno y me gusta mucho ellos iban al mercado con
+        sus amigos deberíamos haberlo hecho ayer cuál es mejor para aprender programación
+        los niños están jugando afuera podrías explicar cómo funciona esto creo que sería
+        bonito gracias por todo buenos días necesito una respuesta rápida""",
+    "fr": """bonjour comment allez vous aujourd'hui je vais bien merci quel est ton nom peux tu
+        m'aider avec ce problème s'il te plaît raconte moi une blague je voudrais en savoir
+        plus sur la météo où habites tu quelle heure est il maintenant c'est très bien et
+        j'aime beaucoup ça ils allaient au marché avec leurs amis nous aurions dû le faire
+        hier lequel est le meilleur pour apprendre la programmation les enfants jouent dehors
+        pourrais tu expliquer comment cela fonctionne je pense que ce serait gentil""",
+    "de": """hallo wie geht es dir heute mir geht es gut danke wie heißt du kannst du mir bei
+        diesem problem helfen bitte erzähl mir einen witz ich möchte mehr über das wetter
+        wissen wo wohnst du wie spät ist es jetzt das ist sehr gut und ich mag es wirklich
+        sie gingen mit ihren freunden zum markt wir hätten das gestern machen sollen welches
+        ist besser zum programmieren lernen die kinder spielen draußen könntest du erklären
+        wie das funktioniert ich denke das wäre schön danke für alles""",
+    "it": """ciao come stai oggi sto bene grazie come ti chiami puoi aiutarmi con questo problema
+        per favore raccontami una barzelletta vorrei sapere di più sul tempo dove vivi che
+        ore sono adesso questo è molto buono e mi piace davvero stavano andando al mercato
+        con i loro amici avremmo dovuto farlo ieri quale è meglio per imparare a programmare
+        i bambini stanno giocando fuori potresti spiegare come funziona penso che sarebbe
+        bello grazie di tutto buongiorno ho bisogno di una risposta""",
+    "pt": """olá como você está hoje estou bem obrigado qual é o seu nome você pode me ajudar
+        com este problema por favor me conte uma piada eu gostaria de saber mais sobre o
+        tempo onde você mora que horas são agora isso é muito bom e eu gosto muito eles
+        estavam indo ao mercado com os seus amigos nós deveríamos ter feito isso ontem qual
+        é melhor para aprender programação as crianças estão brincando lá fora você poderia
+        explicar como isso funciona acho que seria legal não sei então""",
+    "nl": """hallo hoe gaat het vandaag met je het gaat goed dank je wat is je naam kun je me
+        helpen met dit probleem vertel me alsjeblieft een grap ik wil graag meer weten over
+        het weer waar woon je hoe laat is het nu dit is heel goed en ik vind het echt leuk
+        ze gingen met hun vrienden naar de markt we hadden dat gisteren moeten doen welke is
+        beter om te leren programmeren de kinderen spelen buiten zou je kunnen uitleggen hoe
+        dit werkt ik denk dat dat fijn zou zijn bedankt voor alles""",
+    "tr": """merhaba bugün nasılsın iyiyim teşekkür ederim adın ne bu sorunda bana yardım
+        edebilir misin lütfen bana bir fıkra anlat hava durumu hakkında daha fazla bilgi
+        almak istiyorum nerede yaşıyorsun saat kaç şimdi bu çok güzel ve gerçekten hoşuma
+        gidiyor arkadaşlarıyla birlikte pazara gidiyorlardı bunu dün yapmalıydık programlama
+        öğrenmek için hangisi daha iyi çocuklar dışarıda oynuyor bunun nasıl çalıştığını
+        açıklayabilir misin bence güzel olur her şey için teşekkürler""",
+    "id": """halo apa kabar hari ini saya baik baik saja terima kasih siapa nama kamu bisakah
+        kamu membantu saya dengan masalah ini tolong ceritakan sebuah lelucon saya ingin
+        tahu lebih banyak tentang cuaca di mana kamu tinggal jam berapa sekarang ini sangat
+        bagus dan saya sangat menyukainya mereka pergi ke pasar bersama teman teman mereka
+        kita seharusnya melakukannya kemarin mana yang lebih baik untuk belajar pemrograman
+        anak anak sedang bermain di luar bisakah kamu menjelaskan bagaimana ini bekerja""",
+    "pl": """cześć jak się dzisiaj masz mam się dobrze dziękuję jak masz na imię czy możesz mi
+        pomóc z tym problemem proszę opowiedz mi dowcip chciałbym wiedzieć więcej o pogodzie
+        gdzie mieszkasz która jest teraz godzina to jest bardzo dobre i naprawdę mi się
+        podoba szli na targ ze swoimi przyjaciółmi powinniśmy byli to zrobić wczoraj który
+        jest lepszy do nauki programowania dzieci bawią się na dworze czy możesz wyjaśnić
+        jak to działa myślę że byłoby miło dziękuję za wszystko""",
+    "sv": """hej hur mår du idag jag mår bra tack vad heter du kan du hjälpa mig med det här
+        problemet snälla berätta ett skämt jag skulle vilja veta mer om vädret var bor du
+        vad är klockan nu det här är mycket bra och jag gillar det verkligen de gick till
+        marknaden med sina vänner vi borde ha gjort det igår vilken är bättre för att lära
+        sig programmering barnen leker ute kan du förklara hur det här fungerar jag tror att
+        det skulle vara trevligt tack för allt""",
+}
+
+# Frequent function words per language, the main evidence in short messages
+_STOPWORD_TEXT: Dict[str, str] = {
+    "en": """the a an is are was were be to of and in on for with at by from
+        this that it i you he she we they my your what how why when where who which can
+        could would should will do does did have has had not me please hi hello hey thanks
+        thank tell give show write make explain about""",
+    "es": "el la los las es son está estoy un una de del que y a en por para con como qué cómo hola gracias muy me mi yo hoy",
+    "fr": "le la les est sont un une des du de et en pour avec je tu il nous vous que qui bonjour merci très",
+    "de": "der die das ist sind ein eine und zu mit ich du er wir ihr nicht wie was hallo danke bin habe",
+    "it": "il lo la gli le è sono un una di e che per con come non ciao grazie mi sei molto",
+    "pt": "o os as é são um uma de do da que e em para com como não você olá obrigado estou muito",
+    "nl": "de het een is zijn van en in met ik je hij wij niet hoe wat hallo dank ben",
+    "tr": "bir ve bu da de mi ne nasıl için ile ben sen merhaba teşekkür çok",
+    "id": "yang dan di ke dari ini itu saya kamu apa bagaimana tidak halo terima kasih",
+    "pl": "jest są i w na z do że to nie jak co się cześć dziękuję",
+    "sv": "och är en ett att det som på med jag du inte hur vad hej tack",
+}
+_STOPWORDS = {lang: frozenset(words.split()) for lang, words in _STOPWORD_TEXT.items()}
+
+_WORD_RE = re.compile(r"[^\W\d_]+(?:'[^\W\d_]+)?")
+
+# A non-English guess must beat English by this many nats per trigram,
+# so code snippets and names stay English
+_MIN_MARGIN = 0.15
+# Log-likelihood added per stopword or distinctive letter of a language
+_EVIDENCE_BONUS = 3.0
+
+# Letters that (among the supported languages) point to one language
+_DISTINCTIVE_LETTERS: Dict[str, str] = {
+    "es": "ñ¿¡", "pt": "ãõ", "de": "ß", "tr": "ığş", "pl": "ąęłśżźćń", "sv": "å", "fr": "œîû",
+}
+
+def _trigrams(words: List[str]) -> List[str]:
+    grams = []
+    for word in words:
+        padded = f" {word} "
+        grams.extend(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+_profiles: Optional[Dict[str, Tuple[Dict[str, float], float]]] = None
+
+def _get_profiles() -> Dict[str, Tuple[Dict[str, float], float]]:
+    """Build log-probability trigram profiles from the seed texts on first use"""
+    global _profiles
+    if _profiles is None:
+        profiles = {}
+        for lang, text in _SEED_TEXTS.items():
+            counts = Counter(_trigrams(_WORD_RE.findall(text.lower())))
+            total = sum(counts.values()) + len(counts) + 1
+            profiles[lang] = (
+                {gram: math.log((count + 1) / total) for gram, count in counts.items()},
+                math.log(1 / total),  # unseen trigram
+            )
+        _profiles = profiles
+    return _profiles
+
+def _script_language(text: str) -> Optional[str]:
+    """Language of the dominant non-Latin script, or None for Latin text"""
+    counts: Counter = Counter()
+    latin = 0
+    for ch in text:
+        code = ord(ch)
+        if code < 0x0370:
+            latin += ch.isalpha()
+            continue
+        for first, last, lang in _SCRIPT_RANGES:
+            if first <= code <= last:
+                counts[lang] += 1
+                break
+    if not counts or sum(counts.values()) < latin:
+        return None
+    lang = counts.most_common(1)[0][0]
+    if lang == "zh-CN" and counts["ja"]:
+        return "ja"  # Japanese mixes kanji with kana
+    if lang == "ar" and any(ch in _URDU_LETTERS for ch in text):
+        return "ur"
+    if lang == "ru" and any(ch in _UKRAINIAN_LETTERS for ch in text.lower()):
+        return "uk"
+    return lang
+
+def _evidence(text: str, words: List[str]) -> Dict[str, int]:
+    """Stopword and distinctive-letter counts per language"""
+    hits = {lang: sum(word in stopwords for word in words) for lang, stopwords in _STOPWORDS.items()}
+    if not text.isascii():
+        for lang, letters in _DISTINCTIVE_LETTERS.items():
+            hits[lang] += sum(letter in text for letter in letters)
+    return hits
+
+def language_scores(words: List[str], evidence: Dict[str, int]) -> Dict[str, float]:
+    """Average per-trigram log-likelihood of the words under each Latin profile"""
+    grams = _trigrams(words)
+    if not grams:
+        return {}
+    scores = {}
+    for lang, (logprobs, unseen) in _get_profiles().items():
+        total = sum(logprobs.get(gram, unseen) for gram in grams)
+        total += _EVIDENCE_BONUS * evidence[lang]
+        scores[lang] = total / len(grams)
+    return scores
+
+def detect(text: str) -> str:
+    """Best-guess language code of text, "en" when unsure"""
+    if not text or not text.strip():
+        return DEFAULT_LANGUAGE
+    if not text.isascii():
+        script = _script_language(text)
+        if script:
+            return script
+    text = unicodedata.normalize("NFC", text.lower())
+    words = _WORD_RE.findall(text)
+    if not words:
+        return DEFAULT_LANGUAGE
+    evidence = _evidence(text, words)
+    other = max(count for lang, count in evidence.items() if lang != DEFAULT_LANGUAGE)
+    # Fast path: English function words dominate, or plain ASCII without any
+    # sign of another language (code, names, terse commands)
+    if evidence[DEFAULT_LANGUAGE] > other or (other == 0 and text.isascii()):
+        return DEFAULT_LANGUAGE
+    scores = language_scores(words, evidence)
+    best = max(scores, key=scores.get)
+    if best != DEFAULT_LANGUAGE and scores[best] - scores[DEFAULT_LANGUAGE] < _MIN_MARGIN:
+        return DEFAULT_LANGUAGE
+    return best
+
+def _is_latin(text: str) -> bool:
+    """True when text has no letters beyond the Latin script blocks"""
+    return text.isascii() or all(ord(ch) < 0x0370 for ch in text if ch.isalpha())
+
+class LanguageMemory:
+    """Per-user language that stops re-detection once a user's language is settled.
+
+    After `confirmations` agreeing detections the remembered language is
+    returned without detecting. It is re-verified every `recheck_every`
+    messages, and whenever a message switches between Latin and non-Latin
+    script, which is how most real language switches show up.
+    """
+
+    def __init__(self, maxsize: int = 10000, confirmations: int = 3, recheck_every: int = 20):
+        self.maxsize = maxsize
+        self.confirmations = confirmations
+        self.recheck_every = recheck_every
+        self._users: "OrderedDict[str, list]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.skipped = 0
+        self.detected = 0
+
+    def detect(self, user_id: str, text: str, detector: Callable[[str], str]) -> str:
+        """Language of text from user_id, calling detector only when needed"""
+        latin = _is_latin(text)
+        with self._lock:
+            entry = self._users.get(user_id)
+            if entry is not None:
+                self._users.move_to_end(user_id)
+                lang, streak, since_check, entry_latin = entry
+                if streak >= self.confirmations and since_check < self.recheck_every and latin == entry_latin:
+                    entry[2] += 1
+                    self.skipped += 1
+                    return lang
+        lang = detector(text)
+        with self._lock:
+            self.detected += 1
+            entry = self._users.get(user_id)
+            if entry is not None and entry[0] == lang:
+                entry[1] += 1
+                entry[2] = 0
+                entry[3] = latin
+            else:
+                self._users[user_id] = [lang, 1, 0, latin]
+                while len(self._users) > self.maxsize:
+                    self._users.popitem(last=False)
+        return lang
+
+    def forget(self, user_id: str) -> None:
+        with self._lock:
+            self._users.pop(user_id, None)
+
+    def __len__(self) -> int:
+        return len(self._users)
+
+    def stats(self) -> dict:
+        """Detections run vs skipped thanks to a settled language"""
+        return {"detected": self.detected, "skipped": self.skipped, "users": len(self._users)}
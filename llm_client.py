@@ -0,0 +1,56 @@
+# llm_client.py
+# Shared OpenAI clients: created once, reused by every completion call so
+# connections stay pooled instead of being rebuilt per request
+
+import os
+import sys
+
+OPENAI_MODEL = os.getenv("MANNA_OPENAI_MODEL", "gpt-4o-mini")
+# Optional override, e.g. a local OpenAI-compatible server for benchmarks
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL") or None
+OPENAI_TIMEOUT = float(os.getenv("MANNA_OPENAI_TIMEOUT", "30"))
+
+_async_client = None
+_sync_client = None
+
+def api_key():
+    """Use the key configured on the openai module, falling back to the environment.
+
+    Only looks at the module once something has imported it, so checking for
+    a key does not load the openai package.
+    """
+    openai = sys.modules.get("openai")
+    return getattr(openai, "api_key", None) or os.getenv("OPENAI_API_KEY")
+
+def get_async_client():
+    """Return the shared AsyncOpenAI client, creating it on first use"""
+    global _async_client
+    if _async_client is None:
+        from openai import AsyncOpenAI
+        _async_client = AsyncOpenAI(api_key=api_key(), base_url=OPENAI_BASE_URL, timeout=OPENAI_TIMEOUT)
+    return _async_client
+
+def get_sync_client():
+    """Return the shared blocking OpenAI client, creating it on first use"""
+    global _sync_client
+    if _sync_client is None:
+        from openai import OpenAI
+        _sync_client = OpenAI(api_key=api_key(), base_url=OPENAI_BASE_URL, timeout=OPENAI_TIMEOUT)
+    return _sync_client
+
+def warm_up() -> bool:
+    """Create the shared async client at startup when an API key is configured"""
+    if not api_key():
+        return False
+    get_async_client()
+    return True
+
+async def close_clients():
+    """Close pooled connections, e.g. on application shutdown"""
+    global _async_client, _sync_client
+    if _async_client is not None:
+        await _async_client.close()
+        _async_client = None
+    if _sync_client is not None:
+        _sync_client.close()
+        _sync_client = None
@@ -1,21 +1,59 @@
 from fastapi import FastAPI, Request
-from fastapi.responses import HTMLResponse, FileResponse
-from fastapi.staticfiles import StaticFiles
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
+from contextlib import asynccontextmanager
 from pydantic import BaseModel
-from chatbot import get_response
-from sentiment import get_mood, get_mood_emoji
+from chatbot import get_response_details_async, stream_response_details, cache_stats, get_semantic_cache
+from streaming import chat_event_stream, ttfb_stats
+from code_jobs import JOB_STORE, JobStoreFull
+from sessions import SESSION_STORE
+from knowledge_base import KNOWLEDGE_STORE
+import llm_client
+import code_executor
+import metrics
+from static_assets import AssetStore, PAGE_CACHE_CONTROL
+import asyncio
 import os
+import time
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Create the shared, connection-pooled OpenAI client once at startup
+    try:
+        if llm_client.warm_up():
+            # The paraphrase cache imports NumPy; build it before the first fallback
+            await asyncio.to_thread(get_semantic_cache)
+    except Exception as e:
+        print(f"Warning: OpenAI client unavailable: {e}")
+    # Start the sandbox workers so the first "run ..." skips interpreter startup
+    try:
+        await asyncio.to_thread(code_executor.warm_up)
+    except Exception as e:
+        print(f"Warning: code sandbox pool unavailable: {e}")
+    # Event loop lag, reported by /metrics
+    lag_monitor = asyncio.create_task(metrics.monitor_event_loop())
+    yield
+    lag_monitor.cancel()
+    await llm_client.close_clients()
+    code_executor.close_pool()
+
+app = FastAPI(lifespan=lifespan)
+
+# The page and static files are read and compressed once, at startup
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+HOME_PAGE = AssetStore(PAGE_CACHE_CONTROL)
+HOME_PAGE.add_file("Manna.html", os.path.join(STATIC_DIR, "Manna.html"))
+STATIC_FILES = AssetStore()
+STATIC_FILES.load_directory(STATIC_DIR)
 
 # Root route to serve the HTML page
-@app.get("/", response_class=HTMLResponse)
-async def serve_home():
-    return FileResponse("static/Manna.html")
+@app.api_route("/", methods=["GET", "HEAD"])
+async def serve_home(request: Request):
+    return HOME_PAGE.response("Manna.html", request.headers, request.method)
 
-# Serve static files (mounted after root route to avoid conflicts)
-app.mount("/static", StaticFiles(directory="static"), name="static")
+@app.api_route("/static/{name:path}", methods=["GET", "HEAD"])
+async def serve_static(name: str, request: Request):
+    return STATIC_FILES.response(name, request.headers, request.method)
 
 class UserMessage(BaseModel):
     message: str
@@ -23,22 +61,68 @@ class UserMessage(BaseModel):
 
 @app.post("/chat")
 async def chat_endpoint(user_msg: UserMessage):
-    response = get_response(user_msg.message, user_msg.user_id)
+    started = time.perf_counter()
+    # Mood is detected once inside the chatbot and reused here
+    result = await get_response_details_async(user_msg.message, user_msg.user_id)
+    metrics.REQUEST_SECONDS.observe(("/chat", result.intent), time.perf_counter() - started)
     
-    # Detect mood from user message
+    return {
+        "response": result.response,
+        "mood": result.mood,
+        "mood_emoji": result.mood_emoji
+    }
+
+@app.post("/chat/stream")
+async def chat_stream_endpoint(user_msg: UserMessage):
+    # Server-sent events: "token" events as the answer arrives, then "done"
+    started = time.perf_counter()
+    return StreamingResponse(
+        chat_event_stream(stream_response_details, user_msg.message, user_msg.user_id, started),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+class CodeJobRequest(BaseModel):
+    code: str
+    user_id: str = "guest"
+
+@app.post("/code/jobs", status_code=202)
+async def submit_code_job(job_request: CodeJobRequest):
+    # Start the run in the background and answer with its id right away
+    if not job_request.code.strip():
+        return JSONResponse({"error": "No code provided"}, status_code=400)
     try:
-        mood = get_mood(user_msg.message)
-        mood_emoji = get_mood_emoji(mood)
-    except Exception:
-        mood = "neutral"
-        mood_emoji = "😐"
-    
+        job = JOB_STORE.submit(job_request.code, job_request.user_id)
+    except JobStoreFull as e:
+        return JSONResponse({"error": str(e)}, status_code=503)
+    return job.to_dict()
+
+@app.get("/code/jobs/{job_id}")
+async def code_job_result(job_id: str, wait: float = 0):
+    # wait > 0 long-polls until the job finishes or that many seconds pass
+    job = await JOB_STORE.wait(job_id, wait)
+    if job is None:
+        return JSONResponse({"error": "Unknown or expired job"}, status_code=404)
+    return job.to_dict()
+
+@app.get("/stats")
+async def stats():
+    # Cache hit/miss counters, streaming time-to-first-byte, code-run load, session memory
+    # and knowledge base reloads
     return {
-        "response": response,
-        "mood": mood,
-        "mood_emoji": mood_emoji
+        "cache": cache_stats(),
+        "stream_ttfb": ttfb_stats(),
+        "code": code_executor.execution_stats(),
+        "code_jobs": JOB_STORE.stats(),
+        "sessions": SESSION_STORE.stats(),
+        "knowledge_base": KNOWLEDGE_STORE.stats(),
     }
 
+@app.get("/metrics")
+async def prometheus_metrics():
+    # Per-stage and per-endpoint latency histograms in the Prometheus text format
+    return PlainTextResponse(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
 if __name__ == "__main__":
     import uvicorn
     print("Starting Manna AI Server...")
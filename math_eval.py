@@ -0,0 +1,167 @@
+# math_eval.py
+# Arithmetic for the chatbot's math tier without eval(): the expression is
+# parsed into an AST and only numbers, arithmetic operators and a few math
+# functions are evaluated. Operand size, exponents and the number of
+# evaluation steps are bounded, so no input can pin the CPU.
+
+import ast
+import math
+import operator
+import os
+from functools import lru_cache
+from typing import Tuple, Union
+
+Number = Union[int, float]
+
+# Longest expression accepted, in characters
+MAX_LENGTH = 200
+# AST nodes evaluated per expression
+MAX_STEPS = 200
+# Largest integer operand or result, in bits (about 1200 decimal digits)
+MAX_INT_BITS = 4096
+# Largest exponent for ** and pow()
+MAX_EXPONENT = 10000
+# Largest argument for factorial()
+MAX_FACTORIAL = 400
+# Largest |ndigits| for round()
+MAX_ROUND_DIGITS = 100
+
+class MathError(ValueError):
+    """The expression is not plain arithmetic, or it exceeds a limit"""
+
+def _check(value: Number) -> Number:
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, int):
+        if value.bit_length() > MAX_INT_BITS:
+            raise MathError("Number too large")
+    elif isinstance(value, float):
+        if not math.isfinite(value):
+            raise MathError("Result out of range")
+    else:
+        raise MathError("Unsupported result")
+    return value
+
+def _pow(base: Number, exponent: Number) -> Number:
+    if isinstance(exponent, int) and abs(exponent) > MAX_EXPONENT:
+        raise MathError("Exponent too large")
+    if isinstance(base, int) and isinstance(exponent, int) and exponent > 0 and abs(base) > 1:
+        # Size of the result is known up front: log2(base) * exponent bits
+        if math.log2(abs(base)) * exponent > MAX_INT_BITS:
+            raise MathError("Number too large")
+    return operator.pow(base, exponent)
+
+def _mul(a: Number, b: Number) -> Number:
+    if isinstance(a, int) and isinstance(b, int) and a.bit_length() + b.bit_length() > MAX_INT_BITS + 1:
+        raise MathError("Number too large")
+    return a * b
+
+def _pow_function(base: Number, exponent: Number, modulus: Number = None) -> Number:
+    if modulus is None:
+        return _pow(base, exponent)
+    if abs(exponent) > MAX_EXPONENT:
+        raise MathError("Exponent too large")
+    return pow(base, exponent, modulus)
+
+def _factorial(n: Number) -> int:
+    if not isinstance(n, int) or n > MAX_FACTORIAL:
+        raise MathError("Factorial argument too large")
+    return math.factorial(n)
+
+def _round(x: Number, ndigits: int = None) -> Number:
+    if ndigits is None:
+        return round(x)
+    if not isinstance(ndigits, int) or abs(ndigits) > MAX_ROUND_DIGITS:
+        raise MathError("Too many digits")
+    return round(x, ndigits)
+
+_BINARY_OPS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: _mul,
+    ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv,
+    ast.Mod: operator.mod,
+    ast.Pow: _pow,
+}
+
+_UNARY_OPS = {
+    ast.UAdd: operator.pos,
+    ast.USub: operator.neg,
+}
+
+FUNCTIONS = {
+    "sqrt": math.sqrt,
+    "pow": _pow_function,
+    "abs": abs,
+    "round": _round,
+    "min": min,
+    "max": max,
+    "floor": math.floor,
+    "ceil": math.ceil,
+    "log": math.log,
+    "log10": math.log10,
+    "log2": math.log2,
+    "exp": math.exp,
+    "sin": math.sin,
+    "cos": math.cos,
+    "tan": math.tan,
+    "factorial": _factorial,
+}
+
+CONSTANTS = {"pi": math.pi, "e": math.e, "tau": math.tau}
+
+class _Evaluator:
+    """Walks one expression tree, counting steps"""
+
+    def __init__(self):
+        self.steps = 0
+
+    def eval(self, node: ast.AST) -> Number:
+        self.steps += 1
+        if self.steps > MAX_STEPS:
+            raise MathError("Expression too long")
+        if isinstance(node, ast.Constant):
+            if type(node.value) not in (int, float):
+                raise MathError("Unsupported constant")
+            return _check(node.value)
+        if isinstance(node, ast.BinOp) and type(node.op) in _BINARY_OPS:
+            left = self.eval(node.left)
+            right = self.eval(node.right)
+            return _check(_BINARY_OPS[type(node.op)](left, right))
+        if isinstance(node, ast.UnaryOp) and type(node.op) in _UNARY_OPS:
+            return _check(_UNARY_OPS[type(node.op)](self.eval(node.operand)))
+        if isinstance(node, ast.Name) and node.id in CONSTANTS:
+            return CONSTANTS[node.id]
+        if (isinstance(node, ast.Call) and isinstance(node.func, ast.Name)
+                and node.func.id in FUNCTIONS and not node.keywords):
+            args = [self.eval(arg) for arg in node.args]
+            return _check(FUNCTIONS[node.func.id](*args))
+        raise MathError("Unsupported expression")
+
+@lru_cache(maxsize=int(os.getenv("MANNA_MATH_CACHE_SIZE", "1024")))
+def _evaluate(expression: str) -> Tuple[Number, str]:
+    """(result, "") or (0, error message); failures are memoized as well"""
+    if len(expression) > MAX_LENGTH:
+        return 0, "Expression too long"
+    try:
+        tree = ast.parse(expression, mode="eval")
+        return _Evaluator().eval(tree.body), ""
+    except MathError as e:
+        return 0, str(e)
+    except (SyntaxError, ValueError, TypeError, ZeroDivisionError, OverflowError, RecursionError) as e:
+        return 0, f"{type(e).__name__}: {e}"
+
+def evaluate(expression: str) -> Number:
+    """Evaluate an arithmetic expression; raises MathError when it is not one"""
+    result, error = _evaluate(expression.strip())
+    if error:
+        raise MathError(error)
+    return result
+
+def cache_clear() -> None:
+    _evaluate.cache_clear()
+
+def cache_stats() -> dict:
+    info = _evaluate.cache_info()
+    return {"hits": info.hits, "misses": info.misses, "size": info.currsize, "maxsize": info.maxsize}
@@ -0,0 +1,122 @@
+# metrics.py
+# In-process latency histograms, exposed by /metrics in the Prometheus text
+# format. Observing is a bisect and a few additions under a lock, so the
+# request path can afford to time every stage.
+
+import asyncio
+import os
+import threading
+from bisect import bisect_left
+from typing import Dict, List, Sequence, Tuple
+
+# MANNA_METRICS=0 stops recording; /metrics then reports empty histograms
+ENABLED = os.getenv("MANNA_METRICS", "1") != "0"
+
+# Upper bounds in seconds, from sub-millisecond local tiers to slow completions
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+class Histogram:
+    """Duration histogram with one series per tuple of label values.
+
+    A series is a list of per-bucket counts (the last one is +Inf) followed
+    by the sum; buckets are only made cumulative when rendered.
+    """
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str], buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series: Dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def _new_series(self, labels: tuple) -> list:
+        series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        return series
+
+    def observe(self, labels: tuple, value: float) -> None:
+        if not ENABLED:
+            return
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels) or self._new_series(labels)
+            series[index] += 1
+            series[-1] += value
+
+    def observe_many(self, label: str, values: Dict[str, float]) -> None:
+        """Observe (key, label) -> value for every item under one lock acquisition"""
+        if not ENABLED:
+            return
+        buckets = self.buckets
+        with self._lock:
+            for key, value in values.items():
+                labels = (key, label)
+                series = self._series.get(labels) or self._new_series(labels)
+                series[bisect_left(buckets, value)] += 1
+                series[-1] += value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._series.clear()
+
+    def snapshot(self) -> Dict[tuple, Tuple[int, float]]:
+        """(count, sum) per series"""
+        with self._lock:
+            return {labels: (sum(series[:-1]), series[-1]) for labels, series in self._series.items()}
+
+    def render(self) -> List[str]:
+        with self._lock:
+            series = {labels: list(values) for labels, values in self._series.items()}
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        bounds = [_format_float(bound) for bound in self.buckets] + ["+Inf"]
+        for labels in sorted(series):
+            values = series[labels]
+            label_text = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, labels))
+            prefix = label_text + "," if label_text else ""
+            braces = f"{{{label_text}}}" if label_text else ""
+            cumulative = 0
+            for bound, count in zip(bounds, values[:-1]):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{prefix}le="{bound}"}} {cumulative}')
+            lines.append(f"{self.name}_sum{braces} {_format_float(values[-1])}")
+            lines.append(f"{self.name}_count{braces} {cumulative}")
+        return lines
+
+def _format_float(value: float) -> str:
+    return repr(float(value))
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+# Time spent in each stage of chatbot.get_response, by the tier that answered
+STAGE_SECONDS = Histogram(
+    "manna_stage_seconds", "Time spent in each stage of a chat request", ("stage", "tier"))
+# Whole /chat and /chat/stream handlers, by the tier that answered
+REQUEST_SECONDS = Histogram(
+    "manna_request_seconds", "Chat endpoint handling time", ("endpoint", "tier"))
+# Streaming time to first byte of the answer; the mood line sent ahead of it does not count
+STREAM_TTFB_SECONDS = Histogram(
+    "manna_stream_ttfb_seconds", "Time until the first streamed chunk of the answer", ())
+# How late the event loop runs a timer; blocking work in a handler shows up here
+EVENT_LOOP_LAG_SECONDS = Histogram(
+    "manna_event_loop_lag_seconds", "Delay of event loop timer callbacks", ())
+
+REGISTRY = [STAGE_SECONDS, REQUEST_SECONDS, STREAM_TTFB_SECONDS, EVENT_LOOP_LAG_SECONDS]
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+async def monitor_event_loop(interval: float = 0.05) -> None:
+    """Record how late each wakeup from a sleep of interval seconds is; runs until cancelled"""
+    loop = asyncio.get_running_loop()
+    while True:
+        started = loop.time()
+        await asyncio.sleep(interval)
+        EVENT_LOOP_LAG_SECONDS.observe((), max(0.0, loop.time() - started - interval))
+
+def render() -> str:
+    """Every registered histogram in the Prometheus text exposition format"""
+    lines = []
+    for histogram in REGISTRY:
+        lines.extend(histogram.render())
+    return "\n".join(lines) + "\n"
@@ -1,6 +1,26 @@
 # nlp_utils.py
 
+import os
 import re
+from typing import List
+
+import language_id
+from language_id import LanguageMemory
+from response_cache import ResponseCache
+
+# Backend used by detect_language: "offline" (built-in, default) or
+# "googletrans" (network round-trip per message)
+LANG_BACKEND = os.getenv("MANNA_LANG_BACKEND", "offline").lower()
+
+# Translations keyed by (text, dest); canned answers repeat constantly, so
+# entries never expire and only the LRU bound applies
+TRANSLATION_CACHE = ResponseCache(maxsize=int(os.getenv("MANNA_TRANSLATION_CACHE_SIZE", "2048")), ttl=None)
+
+# Settled language per user_id, so detection stops once a user's language is known
+LANGUAGE_MEMORY = LanguageMemory(maxsize=int(os.getenv("MANNA_LANGUAGE_MEMORY_SIZE", "10000")))
+
+# Shared default id of anonymous requests; never remembered
+ANONYMOUS_USER = "guest"
 
 # Lazy loading - don't import until needed
 TextBlob = None
@@ -33,8 +53,10 @@ def clean_text(text: str) -> str:
     text = re.sub(r'[^a-zA-Z0-9\s]', '', text)
     return text.lower().strip()
 
-def detect_language(text: str) -> str:
+def detect_language(text: str, backend: str = None) -> str:
     """Detect language code of text"""
+    if (backend or LANG_BACKEND) != "googletrans":
+        return language_id.detect(text)
     trans = _get_translator()
     if not trans:
         return 'en'  # default fallback if translator not available
@@ -44,16 +66,51 @@ def detect_language(text: str) -> str:
     except Exception:
         return 'en'  # default fallback
 
+def detect_user_language(user_id: str, text: str) -> str:
+    """Detect the language of a message, reusing the user's settled language"""
+    if not user_id or user_id == ANONYMOUS_USER:
+        return detect_language(text)
+    return LANGUAGE_MEMORY.detect(user_id, text, detect_language)
+
+def detect_language_blocks() -> bool:
+    """Whether detect_language makes a network round-trip"""
+    return LANG_BACKEND == "googletrans" and bool(_get_translator())
+
+def _translation_key(text: str, dest: str) -> str:
+    return f"{dest}\x00{text}"
+
 def translate_text(text: str, dest: str = 'en') -> str:
     """Translate text to destination language"""
-    if dest == 'en':
+    if dest == 'en' or not text:
         return text
+    key = _translation_key(text, dest)
+    cached = TRANSLATION_CACHE.get(key)
+    if cached is not None:
+        return cached
     trans = _get_translator()
     if not trans:
         return text
     try:
         translation = trans.translate(text, dest=dest)
-        return translation.text
     except Exception:
         return text
+    TRANSLATION_CACHE.set(key, translation.text)
+    return translation.text
+
+def translate_batch(texts: List[str], dest: str = 'en') -> List[str]:
+    """Translate several texts, sending every uncached one in a single request"""
+    if dest == 'en':
+        return list(texts)
+    results = {text: TRANSLATION_CACHE.get(_translation_key(text, dest)) for text in set(texts) if text}
+    missing = [text for text, cached in results.items() if cached is None]
+    trans = _get_translator() if missing else None
+    if trans:
+        try:
+            translations = trans.translate(missing, dest=dest)
+        except Exception:
+            translations = []
+        for text, translation in zip(missing, translations):
+            results[text] = translation.text
+            TRANSLATION_CACHE.set(_translation_key(text, dest), translation.text)
+    return [results.get(text) or text for text in texts]
 
@@ -0,0 +1,360 @@
+# qa_index.py
+# Phrase index over Q&A tables: finds the most specific question phrase
+# contained in a message, word by word, and tolerates one typo per word.
+#
+# QAIndex builds the index in memory. QAIndex.save() compiles it into a
+# flat binary file that MappedQAIndex memory-maps, so worker processes
+# share one copy of the pages and loading needs no parsing.
+
+import mmap
+import os
+import re
+import stat
+import struct
+import sys
+import tempfile
+import zlib
+from abc import ABC, abstractmethod
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional, Set, Tuple, Union
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+
+# Words shorter than this are never corrected: too many real words are one edit apart
+MIN_FUZZY_LENGTH = 4
+
+def tokenize(text: str) -> Tuple[str, ...]:
+    return tuple(_TOKEN_RE.findall(text.lower()))
+
+def _deletes(word: str) -> Set[str]:
+    return {word[:i] + word[i + 1:] for i in range(len(word))}
+
+def _correctable(word: str) -> bool:
+    """Numbers and codes are never corrected, "order 1234" is not "order 1235" """
+    return len(word) >= MIN_FUZZY_LENGTH and not any(ch.isdigit() for ch in word)
+
+def within_one_edit(a: str, b: str) -> bool:
+    """True when a and b differ by one insertion, deletion, substitution or adjacent swap"""
+    if a == b:
+        return True
+    if abs(len(a) - len(b)) > 1:
+        return False
+    if len(a) == len(b):
+        diffs = [i for i in range(len(a)) if a[i] != b[i]]
+        if len(diffs) == 1:
+            return True
+        return (len(diffs) == 2 and diffs[1] == diffs[0] + 1
+                and a[diffs[0]] == b[diffs[1]] and a[diffs[1]] == b[diffs[0]])
+    if len(a) > len(b):
+        a, b = b, a
+    i = 0
+    while i < len(a) and a[i] == b[i]:
+        i += 1
+    return a[i:] == b[i + 1:]
+
+class _PhraseIndex(ABC):
+    """Match selection shared by the in-memory and the memory-mapped index.
+
+    A phrase matches when its words appear consecutively in the message;
+    every window of known words whose length is a phrase length is probed.
+    Of all matches the earliest table wins, then the phrase with most
+    words, then the longest, then the earliest entry, so the answer never
+    depends on scan order. When nothing matches exactly, unknown words of
+    the message are corrected to vocabulary words one edit away; fuzzy
+    matches need a phrase of at least two words, at most half of them
+    corrected.
+    """
+
+    _lengths: List[int]
+
+    @abstractmethod
+    def _entry(self, words: Tuple[str, ...]) -> Optional[int]:
+        """Entry whose phrase is exactly words, or None"""
+
+    @abstractmethod
+    def _rank(self, entry: int) -> tuple:
+        """Sort key of an entry; lower ranks win"""
+
+    @abstractmethod
+    def _answer(self, entry: int) -> str:
+        """Answer text of an entry"""
+
+    @abstractmethod
+    def _known(self, word: str) -> bool:
+        """Whether word occurs in any phrase"""
+
+    @abstractmethod
+    def _spelling(self, key: str) -> Iterable[str]:
+        """Vocabulary words that have key as themselves or as a one-letter delete"""
+
+    def _corrections(self, token: str) -> Tuple[str, ...]:
+        """Vocabulary words one edit away from an unknown token"""
+        if not _correctable(token):
+            return ()
+        candidates = set()
+        for key in _deletes(token) | {token}:
+            candidates.update(self._spelling(key))
+        return tuple(sorted(word for word in candidates if within_one_edit(token, word)))
+
+    def _better(self, entry: Optional[int], best: Optional[int]) -> Optional[int]:
+        if entry is None:
+            return best
+        return entry if best is None or self._rank(entry) < self._rank(best) else best
+
+    def _best(self, tokens: Tuple[str, ...], known: List[bool]) -> Optional[int]:
+        """Best entry whose phrase occurs in tokens"""
+        best = None
+        for length in self._lengths:
+            run = 0  # known words ending at i
+            for i in range(len(tokens)):
+                run = run + 1 if known[i] else 0
+                if run >= length:
+                    best = self._better(self._entry(tokens[i + 1 - length:i + 1]), best)
+        return best
+
+    def _best_fuzzy(self, tokens: Tuple[str, ...], options: List[Tuple[str, ...]]) -> Optional[int]:
+        """Best entry whose phrase occurs in tokens after correcting some words"""
+        best = None
+        for length in self._lengths:
+            if length < 2:
+                continue
+            for start in range(len(tokens) - length + 1):
+                if not any(options[start:start + length]):
+                    continue
+                # Every variant of the window with 1..length/2 words corrected
+                variants = [((), 0)]
+                for i in range(start, start + length):
+                    variants = [(words + (word,), fixes + (word != tokens[i]))
+                                for words, fixes in variants
+                                for word in (tokens[i],) + options[i]
+                                if fixes + (word != tokens[i]) <= length // 2]
+                for words, fixes in variants:
+                    if fixes:
+                        best = self._better(self._entry(words), best)
+        return best
+
+    def lookup(self, text: str) -> Optional[str]:
+        """Answer for the most specific question phrase in text, or None"""
+        tokens = tokenize(text)
+        known = [self._known(token) for token in tokens]
+        entry = self._best(tokens, known) if any(known) else None
+        if entry is None:
+            options = [() if k else self._corrections(t) for t, k in zip(tokens, known)]
+            if any(options):
+                entry = self._best_fuzzy(tokens, options)
+        return self._answer(entry) if entry is not None else None
+
+class QAIndex(_PhraseIndex):
+    """Phrase index held in dicts, built from question -> answer tables in priority order"""
+
+    def __init__(self, tables: Iterable[Mapping[str, str]]):
+        self._answers: List[str] = []
+        self._ranks: List[tuple] = []
+        self._phrases: Dict[Tuple[str, ...], int] = {}
+        vocabulary: Dict[str, str] = {}
+        for table_rank, table in enumerate(tables):
+            for question, answer in table.items():
+                # Interned words are stored once however many phrases use them
+                tokens = tuple(vocabulary.setdefault(t, sys.intern(t)) for t in tokenize(question))
+                if not tokens:
+                    continue
+                entry = len(self._answers)
+                self._answers.append(answer)
+                self._ranks.append((table_rank, -len(tokens), -len(" ".join(tokens)), entry))
+                best = self._phrases.setdefault(tokens, entry)
+                if self._ranks[entry] < self._ranks[best]:
+                    self._phrases[tokens] = entry
+        self._lengths = sorted({len(tokens) for tokens in self._phrases}, reverse=True)
+        self._vocabulary = frozenset(vocabulary)
+        # Delete variant -> vocabulary word, or a tuple of them when several share it
+        self._spellings: Dict[str, Union[str, Tuple[str, ...]]] = {}
+        for word in sorted(self._vocabulary):
+            if _correctable(word):
+                for key in _deletes(word) | {word}:
+                    found = self._spellings.get(key)
+                    if found is None:
+                        self._spellings[key] = word
+                    else:
+                        self._spellings[key] = (found if isinstance(found, tuple) else (found,)) + (word,)
+
+    def __len__(self) -> int:
+        return len(self._answers)
+
+    def _entry(self, words: Tuple[str, ...]) -> Optional[int]:
+        return self._phrases.get(words)
+
+    def _rank(self, entry: int) -> tuple:
+        return self._ranks[entry]
+
+    def _answer(self, entry: int) -> str:
+        return self._answers[entry]
+
+    def _known(self, word: str) -> bool:
+        return word in self._vocabulary
+
+    def _spelling(self, key: str) -> Iterable[str]:
+        found = self._spellings.get(key, ())
+        return (found,) if isinstance(found, str) else found
+
+    def save(self, path: str, fingerprint: str = "") -> None:
+        """Compile the index into a file for MappedQAIndex; the file is replaced atomically"""
+        strings = bytearray()
+
+        def add(text: str) -> Tuple[int, int]:
+            data = text.encode("utf-8")
+            strings.extend(data)
+            return len(strings) - len(data), len(data)
+
+        # Entries shadowed by a better one with the same phrase are dropped;
+        # the survivors keep their order, so ranks compare the same way
+        kept = sorted(self._phrases.items(), key=lambda item: item[1])
+        entries, phrase_slots = bytearray(), []
+        for new_id, (tokens, entry) in enumerate(kept):
+            phrase = " ".join(tokens)
+            table_rank = self._ranks[entry][0]
+            entries += _ENTRY.pack(*add(phrase), *add(self._answers[entry]), len(phrase), table_rank, len(tokens))
+            phrase_slots.append((_hash(phrase), new_id))
+        words = sorted(self._vocabulary)
+        word_ids = {word: i for i, word in enumerate(words)}
+        records, vocab_slots, spelling_slots = bytearray(), [], []
+        for i, word in enumerate(words):
+            records += _WORD.pack(*add(word))
+            vocab_slots.append((_hash(word), i))
+        for key, found in self._spellings.items():
+            for word in (found,) if isinstance(found, str) else found:
+                spelling_slots.append((_hash(key), word_ids[word]))
+
+        phrase_table, vocab_table, spelling_table = (
+            _hash_table(phrase_slots), _hash_table(vocab_slots), _hash_table(spelling_slots))
+        header = _HEADER.pack(
+            _MAGIC, _VERSION, fingerprint.encode("ascii")[:16], len(kept), len(words),
+            len(phrase_table) // _SLOT.size, len(vocab_table) // _SLOT.size,
+            len(spelling_table) // _SLOT.size, len(self._lengths),
+        )
+        lengths = struct.pack(f"<{len(self._lengths)}H", *self._lengths)
+        # A fresh, unpredictable, owner-only file; nothing at a guessable name is opened for writing
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)),
+                                        prefix=os.path.basename(path) + ".", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for section in (header, lengths, entries, records, phrase_table, vocab_table, spelling_table, strings):
+                    f.write(section)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+def check_private(st: os.stat_result, path: str) -> None:
+    """Refuse an index another user could have written: answers are served from it verbatim"""
+    if not stat.S_ISREG(st.st_mode):
+        raise ValueError(f"{path} is not a regular file")
+    if hasattr(os, "geteuid") and (st.st_uid != os.geteuid() or st.st_mode & 0o022):
+        raise ValueError(f"{path} is not owned by this user or is writable by others")
+
+# File layout: header, phrase lengths, entry records, vocabulary records,
+# three open-addressing hash tables (phrases, vocabulary, spelling deletes)
+# and the UTF-8 string blob the records point into
+_MAGIC = b"MQAI"
+_VERSION = 1
+_HEADER = struct.Struct("<4sI16sIIIIII")
+_ENTRY = struct.Struct("<IIIIIHH")  # phrase offset/size, answer offset/size, phrase chars, table, words
+_WORD = struct.Struct("<II")  # offset, size
+_SLOT = struct.Struct("<II")  # crc32 of the key, value + 1 (0 = empty)
+
+def _hash(text: str) -> int:
+    return zlib.crc32(text.encode("utf-8"))
+
+def _hash_table(items: List[Tuple[int, int]]) -> bytes:
+    """Linear-probing table of (hash, value) pairs; equal hashes may repeat"""
+    size = 8
+    while size < len(items) * 2:
+        size *= 2
+    slots = [None] * size
+    for key_hash, value in items:
+        i = key_hash & (size - 1)
+        while slots[i] is not None:
+            i = (i + 1) & (size - 1)
+        slots[i] = (key_hash, value + 1)
+    table = bytearray(size * _SLOT.size)
+    for i, slot in enumerate(slots):
+        if slot is not None:
+            _SLOT.pack_into(table, i * _SLOT.size, *slot)
+    return bytes(table)
+
+class MappedQAIndex(_PhraseIndex):
+    """Read-only phrase index over a file written by QAIndex.save()"""
+
+    def __init__(self, path: str):
+        fd = os.open(path, os.O_RDONLY | getattr(os, "O_NOFOLLOW", 0))
+        with open(fd, "rb") as f:
+            check_private(os.fstat(f.fileno()), path)
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, fingerprint, self._count, words, phrase_slots, vocab_slots,
+         spelling_slots, lengths) = _HEADER.unpack_from(self._mm, 0)
+        if magic != _MAGIC or version != _VERSION:
+            self._mm.close()
+            raise ValueError(f"{path} is not a compiled Q&A index")
+        self.fingerprint = fingerprint.rstrip(b"\0").decode("ascii")
+        offset = _HEADER.size
+        self._lengths = list(struct.unpack_from(f"<{lengths}H", self._mm, offset))
+        offset += 2 * lengths
+        self._entries = offset
+        offset += self._count * _ENTRY.size
+        self._words = offset
+        offset += words * _WORD.size
+        self._tables = []
+        for slots in (phrase_slots, vocab_slots, spelling_slots):
+            self._tables.append((offset, slots - 1))
+            offset += slots * _SLOT.size
+        self._strings = offset
+
+    def __len__(self) -> int:
+        return self._count
+
+    def close(self) -> None:
+        self._mm.close()
+
+    def _probe(self, table: int, key: str) -> Iterator[int]:
+        """Values stored under the hash of key; callers verify the key itself"""
+        offset, mask = self._tables[table]
+        key_hash = _hash(key)
+        i = key_hash & mask
+        while True:
+            slot_hash, value = _SLOT.unpack_from(self._mm, offset + i * _SLOT.size)
+            if not value:
+                return
+            if slot_hash == key_hash:
+                yield value - 1
+            i = (i + 1) & mask
+
+    def _string(self, start: int, size: int) -> bytes:
+        start += self._strings
+        return self._mm[start:start + size]
+
+    def _word(self, word_id: int) -> str:
+        return self._string(*_WORD.unpack_from(self._mm, self._words + word_id * _WORD.size)).decode("utf-8")
+
+    def _record(self, entry: int) -> tuple:
+        return _ENTRY.unpack_from(self._mm, self._entries + entry * _ENTRY.size)
+
+    def _entry(self, words: Tuple[str, ...]) -> Optional[int]:
+        phrase = " ".join(words)
+        data = phrase.encode("utf-8")
+        for entry in self._probe(0, phrase):
+            record = self._record(entry)
+            if record[1] == len(data) and self._string(record[0], record[1]) == data:
+                return entry
+        return None
+
+    def _rank(self, entry: int) -> tuple:
+        record = self._record(entry)
+        return (record[5], -record[6], -record[4], entry)
+
+    def _answer(self, entry: int) -> str:
+        record = self._record(entry)
+        return self._string(record[2], record[3]).decode("utf-8")
+
+    def _known(self, word: str) -> bool:
+        return any(self._word(word_id) == word for word_id in self._probe(1, word))
+
+    def _spelling(self, key: str) -> Iterable[str]:
+        return [self._word(word_id) for word_id in self._probe(2, key)]
@@ -0,0 +1,164 @@
+# response_cache.py
+# Bounded LRU + TTL cache with an optional SQLite tier that survives restarts
+
+import hashlib
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+# Prune expired rows from the SQLite tier every this many writes
+_PRUNE_EVERY = 256
+# Seconds to wait for another process's write lock before treating it as a miss
+_BUSY_TIMEOUT = 1.0
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+def normalize_prompt(text: str) -> str:
+    """Lowercase, collapse whitespace and drop trailing punctuation"""
+    return _WHITESPACE_RE.sub(" ", text.lower()).strip().rstrip("?!. ")
+
+def make_cache_key(user_input: str, context: str = "") -> str:
+    """Cache key for a prompt: normalized input plus the context it was answered in"""
+    payload = f"{normalize_prompt(user_input)}\x00{context}"
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class ResponseCache:
+    """Thread-safe LRU cache of strings with a per-entry TTL.
+
+    When db_path is given, entries are also written to SQLite; a memory miss
+    falls through to disk and promotes the entry back into memory. Disk
+    errors are logged and counted, and the cache carries on in memory.
+    Disk access blocks, so async callers should check `persistent` and run
+    get/set in a worker thread.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = 3600, db_path: Optional[str] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.disk_errors = 0
+        self._db = None
+        self._db_lock = threading.Lock()  # memory hits never wait behind disk I/O
+        self._writes = 0
+        if db_path:
+            try:
+                self._db = sqlite3.connect(db_path, timeout=_BUSY_TIMEOUT, check_same_thread=False)
+                self._db.execute("PRAGMA journal_mode=WAL")
+                # WAL with NORMAL only syncs at checkpoints; a crash can lose the last
+                # few answers, which are only a cache
+                self._db.execute("PRAGMA synchronous=NORMAL")
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires REAL)"
+                )
+                self._db.commit()
+            except sqlite3.Error as e:
+                print(f"Warning: response cache database {db_path} unavailable, caching in memory only: {e}")
+                self._db = None
+
+    @property
+    def persistent(self) -> bool:
+        """True when get/set may touch the SQLite tier"""
+        return self._db is not None
+
+    def _disk_error(self, e: sqlite3.Error) -> None:
+        self.disk_errors += 1
+        if self.disk_errors == 1 or self.disk_errors % 100 == 0:
+            print(f"Warning: response cache database error ({self.disk_errors} so far), using memory: {e}")
+
+    def get(self, key: str) -> Optional[str]:
+        """Return a cached value, or None on a miss or expired entry"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires = entry
+                if expires is None or expires > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+        if self._db is not None:
+            try:
+                with self._db_lock:
+                    row = self._db.execute(
+                        "SELECT value, expires FROM responses WHERE key = ?", (key,)
+                    ).fetchone()
+            except sqlite3.Error as e:
+                self._disk_error(e)
+                row = None
+            if row is not None and (row[1] is None or row[1] > now):
+                with self._lock:
+                    self._store(key, row[0], row[1])
+                    self.disk_hits += 1
+                return row[0]
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, key: str, value: str, ttl: Optional[float] = None) -> None:
+        """Store a value; ttl overrides the cache default for this entry"""
+        ttl = self.ttl if ttl is None else ttl
+        expires = time.time() + ttl if ttl else None
+        with self._lock:
+            self._store(key, value, expires)
+        if self._db is None:
+            return
+        try:
+            with self._db_lock:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses (key, value, expires) VALUES (?, ?, ?)",
+                    (key, value, expires),
+                )
+                self._writes += 1
+                if self._writes % _PRUNE_EVERY == 0:
+                    self._db.execute("DELETE FROM responses WHERE expires IS NOT NULL AND expires <= ?", (time.time(),))
+                self._db.commit()
+        except sqlite3.Error as e:
+            self._disk_error(e)
+            try:
+                with self._db_lock:
+                    self._db.rollback()
+            except sqlite3.Error:
+                pass
+
+    def _store(self, key: str, value: str, expires: Optional[float]) -> None:
+        self._entries[key] = (value, expires)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        """Drop every entry, including the SQLite tier"""
+        with self._lock:
+            self._entries.clear()
+        if self._db is not None:
+            try:
+                with self._db_lock:
+                    self._db.execute("DELETE FROM responses")
+                    self._db.commit()
+            except sqlite3.Error as e:
+                self._disk_error(e)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        """Hit/miss counters and current size"""
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "disk_errors": self.disk_errors,
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+        }
@@ -0,0 +1,255 @@
+# sandbox_pool.py
+# Pool of pre-started Python workers for code_executor.run_code.
+#
+# Each worker is a warm interpreter reading JSON-lines jobs from its stdin.
+# For every job it forks a child that sets CPU/memory limits, runs the code
+# as `python -c` would and exits, so jobs never share interpreter state and
+# never pay interpreter startup. The host enforces the wall-clock limit and
+# replaces a worker after max_jobs jobs, a crash or a timeout.
+
+import json
+import os
+import select
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import traceback
+from typing import List, NamedTuple, Optional
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+class RunResult(NamedTuple):
+    returncode: int
+    stdout: str
+    stderr: str
+    timed_out: bool = False
+
+def pool_supported() -> bool:
+    """The pool needs fork() and POSIX resource limits"""
+    return resource is not None and hasattr(os, "fork")
+
+class _Worker:
+    """One warm interpreter process and its JSON-lines pipe"""
+
+    def __init__(self, memory_mb: int, cpu_seconds: int):
+        self.process = subprocess.Popen(
+            [sys.executable, "-u", os.path.abspath(__file__), str(memory_mb), str(cpu_seconds)],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            start_new_session=True,  # own process group, so a kill reaches the job child too
+        )
+        self.jobs = 0
+        self.timed_out = False
+        self._buffer = b""
+
+    def run(self, code: str, timeout: float) -> Optional[RunResult]:
+        """Send one job; None when the worker died or missed the deadline"""
+        self.jobs += 1
+        self.timed_out = False
+        try:
+            self.process.stdin.write(json.dumps({"code": code}).encode() + b"\n")
+            self.process.stdin.flush()
+        except OSError:
+            return None
+        line = self._read_line(time.monotonic() + timeout)
+        if line is None:
+            return None
+        reply = json.loads(line)
+        return RunResult(reply["returncode"], reply["stdout"], reply["stderr"], reply.get("timed_out", False))
+
+    def _read_line(self, deadline: float) -> Optional[bytes]:
+        fd = self.process.stdout.fileno()
+        while b"\n" not in self._buffer:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not select.select([fd], [], [], remaining)[0]:
+                self.timed_out = True
+                return None
+            chunk = os.read(fd, 65536)
+            if not chunk:
+                return None  # worker exited
+            self._buffer += chunk
+        line, _, self._buffer = self._buffer.partition(b"\n")
+        return line
+
+    def kill(self) -> None:
+        try:
+            os.killpg(self.process.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            pass
+        self.process.wait()
+        for stream in (self.process.stdin, self.process.stdout):
+            try:
+                stream.close()
+            except OSError:
+                pass
+
+class SandboxPool:
+    """Fixed-size pool of warm sandbox workers, safe to use from many threads"""
+
+    def __init__(self, size: int = 2, max_jobs: int = 50, timeout: float = 10,
+                 memory_mb: int = 512, cpu_seconds: Optional[int] = None):
+        self.size = size
+        self.max_jobs = max_jobs
+        self.timeout = timeout
+        self.memory_mb = memory_mb
+        # CPU limit sits just above the wall-clock limit; the host timeout fires first
+        self.cpu_seconds = cpu_seconds or int(timeout) + 1
+        self._idle: List[_Worker] = []
+        self._started = 0
+        self._cond = threading.Condition()
+        self.recycled = 0
+
+    def _spawn(self) -> _Worker:
+        return _Worker(self.memory_mb, self.cpu_seconds)
+
+    def warm_up(self) -> None:
+        """Start every worker now instead of on first use"""
+        with self._cond:
+            while self._started < self.size:
+                self._idle.append(self._spawn())
+                self._started += 1
+
+    def _acquire(self) -> _Worker:
+        with self._cond:
+            while not self._idle and self._started >= self.size:
+                self._cond.wait()
+            if self._idle:
+                return self._idle.pop()
+            self._started += 1
+        try:
+            return self._spawn()
+        except Exception:
+            with self._cond:
+                self._started -= 1
+                self._cond.notify()
+            raise
+
+    def _release(self, worker: _Worker, healthy: bool) -> None:
+        if healthy and worker.jobs < self.max_jobs and worker.process.poll() is None:
+            with self._cond:
+                self._idle.append(worker)
+                self._cond.notify()
+            return
+        # Retire the worker and start its replacement off the request path
+        with self._cond:
+            self.recycled += 1
+        threading.Thread(target=self._replace, args=(worker,), daemon=True).start()
+
+    def _replace(self, worker: _Worker) -> None:
+        worker.kill()
+        try:
+            replacement = self._spawn()
+        except Exception:
+            with self._cond:
+                self._started -= 1
+                self._cond.notify()
+            return
+        with self._cond:
+            self._idle.append(replacement)
+            self._cond.notify()
+
+    def run(self, code: str) -> RunResult:
+        """Run code in a warm worker within the pool's limits"""
+        worker = self._acquire()
+        result = None
+        try:
+            result = worker.run(code, self.timeout)
+        finally:
+            self._release(worker, result is not None and not result.timed_out)
+        if result is None:
+            if worker.timed_out:
+                return RunResult(-1, "", "", timed_out=True)
+            return RunResult(-1, "", "Sandbox worker crashed")
+        return result
+
+    def close(self) -> None:
+        with self._cond:
+            idle, self._idle = self._idle, []
+            self._started -= len(idle)
+        for worker in idle:
+            worker.kill()
+
+    def stats(self) -> dict:
+        return {"workers": self._started, "idle": len(self._idle), "recycled": self.recycled}
+
+# ---------------------------------------------------------------------------
+# Worker side: runs as `python -u sandbox_pool.py <memory_mb> <cpu_seconds>`.
+# Modules a job needs are imported at the top, once, before any fork.
+
+def _run_job(code: str, memory_mb: int, cpu_seconds: int, protocol_fd: int) -> dict:
+    """Fork a child that runs code like `python -c`, and collect its result"""
+    out = tempfile.TemporaryFile()
+    err = tempfile.TemporaryFile()
+    pid = os.fork()
+    if pid == 0:
+        try:
+            os.close(protocol_fd)  # user code must not be able to forge replies
+            resource.setrlimit(resource.RLIMIT_CPU, (cpu_seconds, cpu_seconds + 1))
+            limit = memory_mb * 1024 * 1024
+            resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+            devnull = os.open(os.devnull, os.O_RDONLY)
+            os.dup2(devnull, 0)
+            os.dup2(out.fileno(), 1)
+            os.dup2(err.fileno(), 2)
+            os._exit(_exec_code(code))
+        finally:
+            os._exit(1)
+    _, status = os.waitpid(pid, 0)
+    returncode = os.waitstatus_to_exitcode(status)
+    out.seek(0)
+    err.seek(0)
+    reply = {
+        "returncode": returncode,
+        "stdout": out.read().decode("utf-8", "replace"),
+        "stderr": err.read().decode("utf-8", "replace"),
+    }
+    out.close()
+    err.close()
+    if returncode in (-signal.SIGXCPU, -signal.SIGKILL):
+        reply["timed_out"] = True  # CPU limit reached
+    return reply
+
+def _exec_code(code: str) -> int:
+    """Run code as the __main__ module and return the process exit status"""
+    sys.argv = ["-c"]
+    status = 0
+    try:
+        exec(compile(code, "<string>", "exec"), {"__name__": "__main__", "__builtins__": __builtins__})
+    except SystemExit as e:
+        if e.code is None:
+            status = 0
+        elif isinstance(e.code, int):
+            status = e.code
+        else:
+            print(e.code, file=sys.stderr)
+            status = 1
+    except BaseException as e:
+        # Drop this frame so the traceback reads like `python -c`'s
+        tb = e.__traceback__.tb_next if not isinstance(e, SyntaxError) else None
+        traceback.print_exception(type(e), e, tb)
+        status = 1
+    try:
+        sys.stdout.flush()
+        sys.stderr.flush()
+    except Exception:
+        pass
+    return status
+
+def _worker_main(memory_mb: int, cpu_seconds: int) -> None:
+    sys.path[0] = ""  # same import path as `python -c`
+    protocol_out = os.fdopen(os.dup(1), "wb")
+    for line in sys.stdin.buffer:
+        job = json.loads(line)
+        reply = _run_job(job["code"], memory_mb, cpu_seconds, protocol_out.fileno())
+        protocol_out.write(json.dumps(reply).encode() + b"\n")
+        protocol_out.flush()
+
+if __name__ == "__main__":
+    _worker_main(int(sys.argv[1]), int(sys.argv[2]))
@@ -0,0 +1,211 @@
+# semantic_cache.py
+# Near-duplicate prompt cache: hashed n-gram vectors in a cosine-similarity
+# index, so paraphrased prompts can reuse an earlier OpenAI answer.
+# Requires NumPy; create_semantic_cache() returns None without it.
+
+import hashlib
+import re
+import threading
+import time
+from functools import lru_cache
+from typing import List, Optional
+
+# Words that carry no meaning for matching prompts, including request verbs
+# such as "give me" / "write" so phrasing variations collapse together
+_STOPWORDS = frozenset("""
+a an the and or but of to in on for with at by from about into that this these those
+is are was were be been am do does did can could would should will shall may might
+i me my you your it its we our please some any just also very really
+give show write tell make create generate want need get let help know explain describe
+what how which who whom whose
+code program script function snippet example
+""".split())
+
+# Words that negate or orient a request; two prompts only match when they
+# use the same set of them, so "is it safe" never answers "is it not safe"
+_GUARD_WORDS = frozenset("not no never nor without from vs versus than".split())
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+# Word features weigh more than the character trigrams that smooth over typos;
+# bigrams of consecutive content words keep their order ("celsius to
+# fahrenheit" is not "fahrenheit to celsius")
+_WORD_WEIGHT = 2.0
+_BIGRAM_WEIGHT = 2.0
+_TRIGRAM_WEIGHT = 0.5
+
+def _words(text: str) -> List[str]:
+    """Lowercase words, with "n't" spelled out so "isn't" carries a "not" """
+    return _WORD_RE.findall(text.lower().replace("n't", " not"))
+
+def _stem(word: str) -> str:
+    """Very light suffix stripping so "reverses"/"reversing" match "reverse" """
+    for suffix in ("ing", "es", "ed", "s", "e"):
+        if len(word) > len(suffix) + 3 and word.endswith(suffix):
+            return word[: -len(suffix)]
+    return word
+
+def _content_stems(text: str) -> List[str]:
+    """Stemmed words that carry the meaning of a prompt, in order"""
+    return [_stem(word) for word in _words(text)
+            if word not in _STOPWORDS and word not in _GUARD_WORDS and not word.isdigit()]
+
+def prompt_features(text: str) -> List[tuple]:
+    """Weighted features of a prompt: stemmed content words, their bigrams and trigrams"""
+    features = []
+    previous = None
+    for stem in _content_stems(text):
+        features.append((stem, _WORD_WEIGHT))
+        if previous is not None:
+            features.append((f"2:{previous} {stem}", _BIGRAM_WEIGHT))
+        previous = stem
+        padded = f"#{stem}#"
+        for i in range(len(padded) - 2):
+            features.append(("3:" + padded[i:i + 3], _TRIGRAM_WEIGHT))
+    return features
+
+_NUMBER_RE = re.compile(r"\d+(?:\.\d+)?")
+
+def _context_id(context: str, text: str) -> int:
+    """Partition key: the answer context, the numbers, guard words and content words of the prompt.
+
+    Numbers must match exactly ("add 2 and 3" is not "add 4 and 5"), and so
+    must negations and direction words. So must the set of content words:
+    in a long prompt one changed word ("even" for "odd") barely moves the
+    cosine, yet asks for a different answer. Similarity then only decides
+    between phrasings and word orders of the same request.
+    """
+    numbers = " ".join(_NUMBER_RE.findall(text))
+    guards = " ".join(sorted({"vs" if word == "versus" else word for word in _words(text)} & _GUARD_WORDS))
+    content = " ".join(sorted(set(_content_stems(text))))
+    payload = f"{context}\x00{numbers}\x00{guards}\x00{content}".encode("utf-8")
+    return int.from_bytes(hashlib.blake2b(payload, digest_size=7).digest(), "little")
+
+# Each feature is spread over several signed slots so one hash collision
+# cannot push two unrelated prompts over the similarity threshold
+_SLOTS_PER_FEATURE = 4
+
+@lru_cache(maxsize=65536)
+def _feature_slots(feature: str, dims: int) -> tuple:
+    """Stable (index, sign) pairs for a feature"""
+    digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=4 * _SLOTS_PER_FEATURE).digest()
+    slots = []
+    for i in range(_SLOTS_PER_FEATURE):
+        h = int.from_bytes(digest[4 * i:4 * i + 4], "little")
+        slots.append((h % dims, 1.0 if h >> 31 else -1.0))
+    return tuple(slots)
+
+class SemanticCache:
+    """Cosine-similarity cache over hashed prompt vectors.
+
+    Vectors live in a fixed ring buffer (oldest entries are overwritten).
+    Random-hyperplane LSH signatures narrow each lookup to entries sharing
+    at least one band with the query, and only those candidates are scored
+    exactly, so lookups stay sub-millisecond at tens of thousands of
+    entries. Entries only match prompts answered in the same context (model
+    and system message) that use the same content words.
+    """
+
+    def __init__(self, maxsize: int = 20000, threshold: float = 0.85, ttl: Optional[float] = 3600,
+                 dims: int = 256, tables: int = 8, bits: int = 12, seed: int = 13):
+        import numpy as np
+        self._np = np
+        self.maxsize = maxsize
+        self.threshold = threshold
+        self.ttl = ttl
+        self.dims = dims
+        self.tables = tables
+        self.bits = bits
+        rng = np.random.default_rng(seed)
+        self._planes = rng.standard_normal((dims, tables * bits)).astype(np.float32)
+        self._bit_weights = (1 << np.arange(bits, dtype=np.int64))
+        self._vectors = np.zeros((maxsize, dims), dtype=np.float32)
+        self._contexts = np.zeros(maxsize, dtype=np.int64)
+        self._expires = np.zeros(maxsize, dtype=np.float64)
+        self._signatures = np.zeros((tables, maxsize), dtype=np.int64)  # one row per band
+        self._values: List[Optional[str]] = [None] * maxsize
+        self._next = 0
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def embed(self, text: str):
+        """L2-normalised signed feature-hashing vector for a prompt"""
+        np = self._np
+        vector = np.zeros(self.dims, dtype=np.float32)
+        for feature, weight in prompt_features(text):
+            for index, sign in _feature_slots(feature, self.dims):
+                vector[index] += sign * weight
+        norm = float(np.linalg.norm(vector))
+        if norm:
+            vector /= norm
+        return vector
+
+    def _signature(self, vector):
+        bits = (vector @ self._planes > 0).reshape(self.tables, self.bits)
+        return bits.astype(self._np.int64) @ self._bit_weights
+
+    def get(self, text: str, context: str = "") -> Optional[str]:
+        """Return the answer of the most similar cached prompt above the threshold"""
+        np = self._np
+        vector = self.embed(text)
+        signature = self._signature(vector)
+        context_id = _context_id(context, text)
+        with self._lock:
+            size = self._size
+            match = self._signatures[0, :size] == signature[0]
+            for table in range(1, self.tables):
+                match |= self._signatures[table, :size] == signature[table]
+            slots = np.flatnonzero(match)
+            if slots.size:
+                valid = self._contexts[slots] == context_id
+                if self.ttl:
+                    valid &= self._expires[slots] > time.time()
+                slots = slots[valid]
+                if slots.size:
+                    scores = self._vectors[slots] @ vector
+                    best = int(np.argmax(scores))
+                    if scores[best] >= self.threshold:
+                        self.hits += 1
+                        return self._values[int(slots[best])]
+            self.misses += 1
+            return None
+
+    def set(self, text: str, value: str, context: str = "") -> None:
+        """Index a prompt and its answer, overwriting the oldest entry when full"""
+        vector = self.embed(text)
+        if not vector.any():
+            return  # nothing but stopwords; too vague to match safely
+        signature = self._signature(vector)
+        with self._lock:
+            slot = self._next
+            self._next = (slot + 1) % self.maxsize
+            if self._values[slot] is None:
+                self._size += 1
+            self._vectors[slot] = vector
+            self._contexts[slot] = _context_id(context, text)
+            self._expires[slot] = time.time() + self.ttl if self.ttl else 0.0
+            self._signatures[:, slot] = signature
+            self._values[slot] = value
+
+    def clear(self) -> None:
+        """Drop every entry"""
+        with self._lock:
+            self._values = [None] * self.maxsize
+            self._next = 0
+            self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def stats(self) -> dict:
+        """Hit/miss counters and current size"""
+        return {"hits": self.hits, "misses": self.misses, "size": self._size, "maxsize": self.maxsize}
+
+def create_semantic_cache(**kwargs) -> Optional[SemanticCache]:
+    """Create a SemanticCache, or return None when NumPy is unavailable"""
+    try:
+        return SemanticCache(**kwargs)
+    except ImportError:
+        return None
@@ -0,0 +1,355 @@
+# sessions.py
+# Per-user conversation memory: the last few exchanges of every user, so
+# OpenAI follow-ups see what came before. SessionStore keeps them in process
+# and evicts sessions least-recently-used first when idle past the TTL, when
+# there are too many of them, or when the store exceeds its memory budget.
+# SQLiteSessionStore shares them between worker processes on one host.
+
+import atexit
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections import Counter, OrderedDict, deque
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Longest text kept per side of a turn; long code output is cut here
+MAX_TURN_CHARS = 2000
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count: about four characters per token for English"""
+    return len(text) // 4 + 1
+
+class Turn:
+    """One exchange: the user's message and the answer they got"""
+    __slots__ = ("user", "assistant", "tokens", "size")
+
+    def __init__(self, user: str, assistant: str):
+        self.user = user[:MAX_TURN_CHARS]
+        self.assistant = assistant[:MAX_TURN_CHARS]
+        self.tokens = estimate_tokens(self.user) + estimate_tokens(self.assistant)
+        self.size = sys.getsizeof(self) + sys.getsizeof(self.user) + sys.getsizeof(self.assistant)
+
+class Session:
+    """Ring buffer of a user's recent turns"""
+    __slots__ = ("turns", "last_seen", "size")
+
+    def __init__(self, max_turns: int):
+        self.turns: deque = deque(maxlen=max_turns)
+        self.last_seen = time.monotonic()
+        self.size = 0
+
+# Bytes a Session and its deque cost before any turn is added
+_SESSION_OVERHEAD = sys.getsizeof(Session(1)) + sys.getsizeof(deque(maxlen=1)) + 100
+
+def _fit(turns: Iterable[Turn], budget: int) -> List[dict]:
+    """Newest turns that fit in budget tokens, as chat messages oldest first"""
+    fitted = []
+    for turn in reversed(list(turns)):
+        budget -= turn.tokens
+        if budget < 0:
+            break
+        fitted.append(turn)
+    messages = []
+    for turn in reversed(fitted):
+        messages.append({"role": "user", "content": turn.user})
+        messages.append({"role": "assistant", "content": turn.assistant})
+    return messages
+
+class SessionStore:
+    """Thread-safe LRU of sessions with an idle TTL and a global memory cap"""
+
+    # Reads never touch the disk, so async callers may use the store inline
+    persistent = False
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 1800, max_turns: int = 8,
+                 max_bytes: int = 64 * 1024 * 1024):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.max_turns = max_turns
+        self.max_bytes = max_bytes
+        self._sessions: "OrderedDict[str, Session]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.evictions: Dict[str, int] = {"lru": 0, "ttl": 0, "memory": 0}
+
+    def _drop(self, user_id: str, reason: str) -> None:
+        session = self._sessions.pop(user_id)
+        self.bytes -= session.size
+        self.evictions[reason] += 1
+
+    def _evict(self) -> None:
+        """Drop idle sessions, then the least recently used while over a limit"""
+        now = time.monotonic()
+        while self._sessions:
+            user_id, session = next(iter(self._sessions.items()))
+            if session.last_seen + self.ttl <= now:
+                self._drop(user_id, "ttl")
+            elif len(self._sessions) > self.maxsize:
+                self._drop(user_id, "lru")
+            elif self.bytes > self.max_bytes:
+                self._drop(user_id, "memory")
+            else:
+                break
+
+    def _get(self, user_id: str) -> Optional[Session]:
+        session = self._sessions.get(user_id)
+        if session is None:
+            return None
+        if session.last_seen + self.ttl <= time.monotonic():
+            self._drop(user_id, "ttl")
+            return None
+        return session
+
+    def context(self, user_id: str, budget: int) -> List[dict]:
+        """Most recent turns that fit in budget tokens, as chat messages oldest first"""
+        with self._lock:
+            session = self._get(user_id)
+            return _fit(session.turns, budget) if session is not None else []
+
+    def append(self, user_id: str, user: str, assistant: str) -> None:
+        """Record an exchange, evicting other sessions if the store is over its limits"""
+        turn = Turn(user, assistant)
+        with self._lock:
+            session = self._get(user_id)
+            if session is None:
+                session = Session(self.max_turns)
+                session.size = _SESSION_OVERHEAD
+                self._sessions[user_id] = session
+                self.bytes += session.size
+            if len(session.turns) == session.turns.maxlen:
+                dropped = session.turns[0].size
+                session.size -= dropped
+                self.bytes -= dropped
+            session.turns.append(turn)
+            session.size += turn.size
+            self.bytes += turn.size
+            session.last_seen = time.monotonic()
+            self._sessions.move_to_end(user_id)
+            self._evict()
+
+    def forget(self, user_id: str) -> None:
+        with self._lock:
+            if user_id in self._sessions:
+                session = self._sessions.pop(user_id)
+                self.bytes -= session.size
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "backend": "memory",
+                "sessions": len(self._sessions),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "evictions": dict(self.evictions),
+            }
+
+# Delete turns of idle sessions every this many flushes
+_COMPACT_EVERY = 64
+
+class SQLiteSessionStore:
+    """Sessions in a SQLite database in WAL mode, shared by all worker processes on a host.
+
+    Appends are buffered and written in batches by a background thread, at
+    most flush_interval seconds later. Reads go through an in-process LRU
+    whose entries are trusted for cache_ttl seconds, so a turn recorded by
+    another process shows up within flush_interval + cache_ttl. A cache miss
+    reads a separate connection, which WAL lets run alongside a batch write,
+    and adds the turns not yet written; reads never force a flush. Only the
+    newest max_turns turns per user are kept on disk. Misses block, so
+    async callers should run context() in a worker thread.
+    """
+
+    persistent = True
+
+    def __init__(self, db_path: str, ttl: float = 1800, max_turns: int = 8, cache_size: int = 10000,
+                 cache_ttl: float = 2.0, batch_size: int = 64, flush_interval: float = 0.1):
+        self.ttl = ttl
+        self.max_turns = max_turns
+        self.cache_size = cache_size
+        self.cache_ttl = cache_ttl
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._db = sqlite3.connect(db_path, check_same_thread=False, timeout=10)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS turns (id INTEGER PRIMARY KEY, user_id TEXT NOT NULL, "
+            "created REAL NOT NULL, user TEXT NOT NULL, assistant TEXT NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS turns_user ON turns (user_id, id)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS turns_created ON turns (created)")
+        self._db.commit()
+        self._reader = sqlite3.connect(db_path, check_same_thread=False, timeout=10)
+        # Lock order: _db_lock before _lock; _read_lock is never held with either
+        self._db_lock = threading.Lock()
+        self._read_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._cache: "OrderedDict[str, Tuple[Session, float]]" = OrderedDict()
+        self._pending: List[tuple] = []
+        self._writing: List[tuple] = []  # the batch being written, until it is committed
+        self._wake = threading.Event()
+        self._flusher: Optional[threading.Thread] = None
+        self._closed = False
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.writes = 0
+        self.batches = 0
+        self.compacted = 0
+
+    def context(self, user_id: str, budget: int) -> List[dict]:
+        """Most recent turns that fit in budget tokens, as chat messages oldest first"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._cache.get(user_id)
+            if entry is not None and entry[1] + self.cache_ttl > now:
+                self._cache.move_to_end(user_id)
+                self.cache_hits += 1
+                return _fit(entry[0].turns, budget)
+            self.cache_misses += 1
+        session = self._load(user_id)
+        return _fit(session.turns, budget)
+
+    def _load(self, user_id: str) -> Session:
+        """Read a session from disk, add the turns not written yet, and cache it"""
+        # Unwritten turns are collected first: one committed in the meantime is
+        # then both here and in the SELECT, and is kept once, rather than in neither.
+        # Each stored row cancels at most one identical unwritten turn, so two
+        # turns recorded in the same clock tick both survive.
+        with self._lock:
+            unwritten = [row[1:] for row in self._writing + self._pending if row[0] == user_id]
+        with self._read_lock:
+            rows = self._reader.execute(
+                "SELECT created, user, assistant FROM turns WHERE user_id = ? AND created > ? "
+                "ORDER BY id DESC LIMIT ?",
+                (user_id, time.time() - self.ttl, self.max_turns),
+            ).fetchall()
+        stored = Counter(rows)
+        turns = rows[::-1]  # oldest first, in insertion order
+        for row in unwritten:
+            if stored[row]:
+                stored[row] -= 1
+            else:
+                turns.append(row)
+        turns.sort(key=lambda row: row[0])  # stable, so turns of one tick keep their order
+        session = Session(self.max_turns)
+        session.turns.extend(Turn(user, assistant) for _, user, assistant in turns)
+        with self._lock:
+            self._cache_put(user_id, session)
+        return session
+
+    def _cache_put(self, user_id: str, session: Session) -> None:
+        self._cache[user_id] = (session, time.monotonic())
+        self._cache.move_to_end(user_id)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def append(self, user_id: str, user: str, assistant: str) -> None:
+        """Record an exchange; it reaches the database with the next batch"""
+        turn = Turn(user, assistant)
+        with self._lock:
+            self._pending.append((user_id, time.time(), turn.user, turn.assistant))
+            entry = self._cache.get(user_id)
+            if entry is not None:
+                entry[0].turns.append(turn)
+            if self._flusher is None:
+                self._flusher = threading.Thread(target=self._flush_loop, daemon=True)
+                self._flusher.start()
+            if len(self._pending) >= self.batch_size:
+                self._wake.set()
+
+    def _flush_loop(self) -> None:
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except sqlite3.Error as e:
+                print(f"Warning: session flush failed: {e}")
+
+    def flush(self) -> None:
+        """Write pending turns in one transaction and trim the users they belong to"""
+        with self._db_lock:
+            self._flush_locked()
+
+    def _flush_locked(self) -> None:
+        with self._lock:
+            batch, self._pending = self._pending, []
+            self._writing = batch
+        if not batch:
+            return
+        try:
+            self._write_batch(batch)
+        finally:
+            with self._lock:
+                self._writing = []
+        self.writes += len(batch)
+
+    def _write_batch(self, batch: List[tuple]) -> None:
+        with self._db:
+            self._db.executemany(
+                "INSERT INTO turns (user_id, created, user, assistant) VALUES (?, ?, ?, ?)", batch
+            )
+            for user_id in {row[0] for row in batch}:
+                self.compacted += self._db.execute(
+                    "DELETE FROM turns WHERE user_id = ? AND id NOT IN "
+                    "(SELECT id FROM turns WHERE user_id = ? ORDER BY id DESC LIMIT ?)",
+                    (user_id, user_id, self.max_turns),
+                ).rowcount
+            self.batches += 1
+            if self.batches % _COMPACT_EVERY == 0:
+                self._compact()
+
+    def _compact(self) -> None:
+        """Delete the turns of sessions idle past the TTL"""
+        self.compacted += self._db.execute("DELETE FROM turns WHERE created <= ?", (time.time() - self.ttl,)).rowcount
+
+    def forget(self, user_id: str) -> None:
+        with self._db_lock:
+            self._flush_locked()
+            with self._db:
+                self._db.execute("DELETE FROM turns WHERE user_id = ?", (user_id,))
+            with self._lock:
+                self._cache.pop(user_id, None)
+
+    def close(self) -> None:
+        """Write out pending turns and stop the flush thread"""
+        self._closed = True
+        self._wake.set()
+        self.flush()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "backend": "sqlite",
+                "cached_sessions": len(self._cache),
+                "pending": len(self._pending),
+                "writes": self.writes,
+                "batches": self.batches,
+                "cache_hits": self.cache_hits,
+                "cache_misses": self.cache_misses,
+                "compacted": self.compacted,
+            }
+
+def create_session_store():
+    """Session store chosen by MANNA_SESSION_BACKEND: "memory" (default) or "sqlite" """
+    ttl = float(os.getenv("MANNA_SESSION_TTL", "1800"))
+    max_turns = int(os.getenv("MANNA_SESSION_TURNS", "8"))
+    size = int(os.getenv("MANNA_SESSIONS_SIZE", "10000"))
+    if os.getenv("MANNA_SESSION_BACKEND", "memory") == "sqlite":
+        store = SQLiteSessionStore(
+            os.getenv("MANNA_SESSION_DB", "manna_sessions.db"),
+            ttl=ttl, max_turns=max_turns, cache_size=size,
+        )
+        atexit.register(store.close)
+        return store
+    return SessionStore(
+        maxsize=size, ttl=ttl, max_turns=max_turns,
+        max_bytes=int(float(os.getenv("MANNA_SESSION_MEMORY_MB", "64")) * 1024 * 1024),
+    )
+
+SESSION_STORE = create_session_store()
+
+# Token budget for the history sent with each OpenAI request
+CONTEXT_TOKENS = int(os.getenv("MANNA_CONTEXT_TOKENS", "1000"))
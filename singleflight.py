@@ -0,0 +1,84 @@
+# singleflight.py
+# Coalesce identical in-flight calls: concurrent callers with the same key
+# share one execution and all receive its result or its exception
+
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Awaitable, Callable, Dict, Tuple
+
+class SingleFlight:
+    """Per-key call deduplication for both threads and coroutines.
+
+    The first caller for a key (the leader) runs the work; callers arriving
+    while it is in flight wait for the same result. Nothing is remembered
+    once the call finishes, so a failure is seen by the callers that were
+    waiting for it and the next caller simply tries again.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.coalesced = 0
+
+    def _join(self, key: str) -> Tuple[Future, bool]:
+        """Return the future for key and whether the caller leads the call"""
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                self.coalesced += 1
+                return future, False
+            future = self._calls[key] = Future()
+            self.leaders += 1
+            return future, True
+
+    def _finish(self, key: str, future: Future) -> None:
+        with self._lock:
+            if self._calls.get(key) is future:
+                del self._calls[key]
+
+    def do(self, key: str, fn: Callable[[], str]) -> str:
+        """Run fn once for all concurrent callers with the same key"""
+        future, leader = self._join(key)
+        if not leader:
+            return future.result()
+        try:
+            result = fn()
+        except BaseException as e:
+            self._finish(key, future)
+            future.set_exception(e)
+            raise
+        self._finish(key, future)
+        future.set_result(result)
+        return result
+
+    async def do_async(self, key: str, fn: Callable[[], Awaitable[str]]) -> str:
+        """Async variant of do; also joins calls led by threads and other loops.
+
+        The work runs in its own task, so a cancelled leader (e.g. a client
+        that disconnected) does not cancel the call its followers wait for.
+        """
+        future, leader = self._join(key)
+        if leader:
+            task = asyncio.ensure_future(fn())
+
+            def settle(task: asyncio.Task) -> None:
+                self._finish(key, future)
+                if task.cancelled():
+                    future.cancel()
+                elif task.exception() is not None:
+                    future.set_exception(task.exception())
+                else:
+                    future.set_result(task.result())
+
+            task.add_done_callback(settle)
+        return await asyncio.shield(asyncio.wrap_future(future))
+
+    def in_flight(self) -> int:
+        """Number of keys currently being computed"""
+        return len(self._calls)
+
+    def stats(self) -> dict:
+        """Calls that ran upstream vs callers that joined one already in flight"""
+        return {"leaders": self.leaders, "coalesced": self.coalesced, "in_flight": self.in_flight()}
@@ -0,0 +1,166 @@
+# static_assets.py
+# The home page and /static files, read once at startup and kept in memory
+# with gzip (and brotli, when the package is installed) variants and strong
+# ETags, so a page load is a dict lookup and repeat visitors get a 304.
+# Shared by main.py and api/index.py.
+
+import gzip
+import hashlib
+import mimetypes
+import os
+from dataclasses import dataclass, field
+from email.utils import formatdate, parsedate_to_datetime
+from functools import lru_cache
+from typing import Dict, Mapping, Optional, Tuple
+
+from starlette.responses import Response
+
+# Unversioned URLs, so browsers revalidate the page on every visit and keep
+# other assets for MANNA_STATIC_MAX_AGE seconds; a revalidation is a 304
+PAGE_CACHE_CONTROL = "no-cache"
+ASSET_CACHE_CONTROL = f"public, max-age={int(os.getenv('MANNA_STATIC_MAX_AGE', '3600'))}"
+
+# Smaller bodies gain less from compression than the header costs
+MIN_COMPRESS_BYTES = 256
+COMPRESSIBLE_TYPES = ("text/", "application/javascript", "application/json", "application/xml", "image/svg+xml")
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+@dataclass
+class Asset:
+    """One file and its precompressed variants: encoding -> (body, ETag)"""
+    media_type: str
+    last_modified: Optional[str]  # files only; in-memory content is validated by ETag alone
+    variants: Dict[str, Tuple[bytes, str]] = field(default_factory=dict)
+
+def _compress(body: bytes) -> Dict[str, bytes]:
+    encoded = {"gzip": gzip.compress(body, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        encoded["br"] = brotli.compress(body, quality=11)
+    return encoded
+
+def make_asset(body: bytes, media_type: str, mtime: Optional[float] = None) -> Asset:
+    """Precompress body; each variant gets its own ETag, since the bytes differ"""
+    digest = hashlib.blake2b(body, digest_size=12).hexdigest()
+    last_modified = formatdate(int(mtime), usegmt=True) if mtime is not None else None
+    asset = Asset(media_type, last_modified, {"identity": (body, f'"{digest}"')})
+    if len(body) >= MIN_COMPRESS_BYTES and media_type.startswith(COMPRESSIBLE_TYPES):
+        for encoding, encoded in _compress(body).items():
+            if len(encoded) < len(body):
+                asset.variants[encoding] = (encoded, f'"{digest}-{encoding}"')
+    return asset
+
+def guess_media_type(name: str) -> str:
+    media_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+    if media_type.startswith("text/") or media_type in ("application/javascript", "application/json"):
+        media_type += "; charset=utf-8"
+    return media_type
+
+@lru_cache(maxsize=256)
+def accepted_encodings(header: str) -> Dict[str, float]:
+    """Accept-Encoding as coding -> q value; browsers send a handful of distinct headers"""
+    accepted = {}
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key.strip() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if coding:
+            accepted[coding.strip().lower()] = q
+    return accepted
+
+def etag_matches(header: str, etag: str) -> bool:
+    """If-None-Match check; it uses weak comparison, so a W/ prefix is ignored"""
+    if header.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in header.split(","))
+
+class AssetStore:
+    """Files of a directory plus any added in memory, by name.
+
+    Only what was loaded is served, so a request never touches the file
+    system and cannot reach outside the directory.
+    """
+
+    def __init__(self, cache_control: str = ASSET_CACHE_CONTROL):
+        self.cache_control = cache_control
+        self.assets: Dict[str, Asset] = {}
+
+    def load_directory(self, directory: str) -> int:
+        """Read and compress every file under directory; returns the number loaded"""
+        loaded = 0
+        for root, dirs, files in os.walk(directory):
+            dirs[:] = [name for name in dirs if not name.startswith(".")]
+            for filename in files:
+                if filename.startswith("."):
+                    continue
+                path = os.path.join(root, filename)
+                self.add_file(os.path.relpath(path, directory).replace(os.sep, "/"), path)
+                loaded += 1
+        return loaded
+
+    def add_file(self, name: str, path: str) -> None:
+        with open(path, "rb") as f:
+            body = f.read()
+        self.assets[name] = make_asset(body, guess_media_type(name), os.path.getmtime(path))
+
+    def add(self, name: str, body: bytes, media_type: Optional[str] = None) -> None:
+        self.assets[name] = make_asset(body, media_type or guess_media_type(name))
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.assets
+
+    def select(self, asset: Asset, accept_encoding: str) -> str:
+        """The smallest variant the client accepts"""
+        if len(asset.variants) == 1 or not accept_encoding:
+            return "identity"
+        accepted = accepted_encodings(accept_encoding)
+        default_q = accepted.get("*", 0.0)
+        best = "identity"
+        for encoding, (body, _) in asset.variants.items():
+            if encoding != "identity" and accepted.get(encoding, default_q) > 0 \
+                    and len(body) < len(asset.variants[best][0]):
+                best = encoding
+        return best
+
+    def response(self, name: str, headers: Mapping[str, str], method: str = "GET") -> Response:
+        """The asset in the best encoding the client accepts, a 304 when its copy is current, or a 404"""
+        asset = self.assets.get(name)
+        if asset is None:
+            return Response("Not Found", status_code=404, media_type="text/plain")
+        encoding = self.select(asset, headers.get("accept-encoding", ""))
+        body, etag = asset.variants[encoding]
+        response_headers = {"etag": etag, "cache-control": self.cache_control}
+        if asset.last_modified:
+            response_headers["last-modified"] = asset.last_modified
+        if len(asset.variants) > 1:
+            response_headers["vary"] = "Accept-Encoding"
+        if self._not_modified(asset, etag, headers):
+            return Response(status_code=304, headers=response_headers)
+        if encoding != "identity":
+            response_headers["content-encoding"] = encoding
+        if method == "HEAD":
+            response_headers["content-length"] = str(len(body))
+            body = b""
+        return Response(body, media_type=asset.media_type, headers=response_headers)
+
+    @staticmethod
+    def _not_modified(asset: Asset, etag: str, headers: Mapping[str, str]) -> bool:
+        if_none_match = headers.get("if-none-match")
+        if if_none_match is not None:
+            return etag_matches(if_none_match, etag)  # takes precedence over If-Modified-Since
+        if_modified_since = headers.get("if-modified-since")
+        if if_modified_since and asset.last_modified:
+            try:
+                return parsedate_to_datetime(asset.last_modified) <= parsedate_to_datetime(if_modified_since)
+            except (TypeError, ValueError):
+                return False
+        return False
@@ -0,0 +1,67 @@
+# streaming.py
+# Server-sent events for /chat/stream, shared by main.py and api/index.py
+
+import json
+import threading
+import time
+from collections import deque
+from typing import AsyncIterator, Callable
+
+import metrics
+
+# Time-to-first-byte of recent streamed requests, in milliseconds
+TTFB_SAMPLES: deque = deque(maxlen=1000)
+_ttfb_lock = threading.Lock()
+
+class PrefixChunk(str):
+    """Text streamed ahead of the answer, such as the mood line; it does not
+    count as the first byte, so slow upstream completions show in the TTFB"""
+
+def sse_event(event: str, data: dict) -> str:
+    """Format one server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def record_ttfb(ttfb_ms: float) -> None:
+    """Remember the time-to-first-byte of a streamed request"""
+    with _ttfb_lock:
+        TTFB_SAMPLES.append(ttfb_ms)
+    metrics.STREAM_TTFB_SECONDS.observe((), ttfb_ms / 1000)
+
+def ttfb_stats() -> dict:
+    """Summary of recent time-to-first-byte samples"""
+    with _ttfb_lock:
+        samples = sorted(TTFB_SAMPLES)
+    if not samples:
+        return {"count": 0}
+    return {
+        "count": len(samples),
+        "p50_ms": round(samples[len(samples) // 2], 2),
+        "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 2),
+        "max_ms": round(samples[-1], 2),
+    }
+
+async def chat_event_stream(stream: Callable, message: str, user_id: str, started: float) -> AsyncIterator[str]:
+    """Turn a chatbot result stream into SSE "token" events and a final "done" event.
+
+    started is the time.perf_counter() value taken when the request arrived.
+    """
+    ttfb_ms = None
+    try:
+        async for item in stream(message, user_id):
+            # Measured at the first chunk of the answer, or at the result if none came
+            if ttfb_ms is None and not isinstance(item, PrefixChunk):
+                ttfb_ms = (time.perf_counter() - started) * 1000
+                record_ttfb(ttfb_ms)
+            if isinstance(item, str):
+                yield sse_event("token", {"content": item})
+            else:
+                metrics.REQUEST_SECONDS.observe(("/chat/stream", item.intent), time.perf_counter() - started)
+                yield sse_event("done", {
+                    "response": item.response,
+                    "mood": item.mood,
+                    "mood_emoji": item.mood_emoji,
+                    "ttfb_ms": round(ttfb_ms, 2),
+                })
+    except Exception as e:
+        print(f"Chat stream error: {e}")
+        yield sse_event("error", {"response": f"Sorry, I encountered an error: {str(e)}"})